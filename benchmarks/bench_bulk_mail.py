@@ -0,0 +1,86 @@
+"""
+Compare sending a newsletter with `send_email` per recipient against
+`send_bulk_email`, with and without DKIM, to an in-process SMTP stub.
+
+    python benchmarks/bench_bulk_mail.py
+"""
+
+import os
+
+import time
+
+import base64
+
+import shutil
+
+import tempfile
+
+import nacl.signing
+
+from miscutils.bulk_mail import send_bulk_email
+
+from miscutils.mail import send_email
+
+from miscutils.smtp_pool import SMTPPool
+
+from miscutils.test_mail import SMTPStub
+
+RECIPIENTS = ["to{}@example.com".format(i) for i in range(500)]
+
+TEXT = "text " * 2000
+
+HTML = "<p>html</p>" * 1000
+
+
+def per_recipient(relay, pool, dkim):
+    for to_email in RECIPIENTS:
+        send_email(
+            to_email, "news@example.com", "news", TEXT, HTML, relay, *dkim, pool=pool
+        )
+
+
+def bulk(relay, pool, dkim, envelope_size=1):
+    send_bulk_email(
+        RECIPIENTS,
+        "news@example.com",
+        "news",
+        TEXT,
+        HTML,
+        relay,
+        *dkim,
+        envelope_size=envelope_size,
+        pool=pool
+    )
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        key_path = os.path.join(directory, "mail.key")
+        with open(key_path, "wb") as fh:
+            fh.write(base64.b64encode(bytes(nacl.signing.SigningKey.generate())))
+        for dkim in ((), (key_path, "mail")):
+            for name, send in (
+                ("send_email", per_recipient),
+                ("send_bulk_email", bulk),
+                ("envelope_size=50", lambda *a: bulk(*a, envelope_size=50)),
+            ):
+                pool = SMTPPool()
+                with SMTPStub() as stub:
+                    start = time.perf_counter()
+                    send(stub.relay, pool, dkim)
+                    seconds = time.perf_counter() - start
+                    pool.close()
+                print(
+                    "{:<8} {:<17} {:8.0f} recipients/s".format(
+                        "dkim" if dkim else "no dkim",
+                        name,
+                        len(RECIPIENTS) / seconds,
+                    )
+                )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare DKIM signing throughput of `dkim.sign` with a cached `DKIMSigner`.
+
+    python benchmarks/bench_dkim_signer.py
+
+The RSA key is generated with the openssl command line tool, the
+rsa-sha256 rows are skipped when it is not installed.
+"""
+
+import os
+
+import base64
+
+import shutil
+
+import tempfile
+
+import timeit
+
+import subprocess
+
+import dkim
+
+import nacl.signing
+
+from miscutils.dkim_signer import DKIMSigner
+
+from miscutils.mail import build_message, message_bytes
+
+
+def write_ed25519_key(directory):
+    path = os.path.join(directory, "ed25519.key")
+    with open(path, "wb") as fh:
+        fh.write(base64.b64encode(bytes(nacl.signing.SigningKey.generate())))
+    return path
+
+
+def write_rsa_key(directory):
+    path = os.path.join(directory, "rsa.pem")
+    try:
+        subprocess.check_call(
+            ["openssl", "genrsa", "-traditional", "-out", path, "2048"],
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return path
+
+
+def sign_from_file(key_path, algorithm, msg_data):
+    """What `mail.send_email` did for every message before the signer."""
+    with open(key_path) as fh:
+        privkey = fh.read()
+    return dkim.sign(
+        message=msg_data,
+        selector=b"mail",
+        domain=b"example.com",
+        privkey=privkey.encode(),
+        include_headers=[b"To", b"From", b"Subject"],
+        signature_algorithm=algorithm.encode(),
+    )
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        keys = [
+            ("ed25519-sha256", write_ed25519_key(directory)),
+            ("rsa-sha256", write_rsa_key(directory)),
+        ]
+        for size in (1, 64):
+            msg_data = message_bytes(
+                build_message(
+                    "to@example.com",
+                    "no-reply@example.com",
+                    "subject",
+                    "text " * 200 * size,
+                    "<p>html</p>" * 100 * size,
+                )
+            )
+            for algorithm, key_path in keys:
+                if key_path is None:
+                    print("{:<15} skipped, openssl is not installed".format(algorithm))
+                    continue
+                signer = DKIMSigner(key_path, "mail", "example.com", algorithm)
+                number = 2000 if algorithm.startswith("ed25519") else 200
+                for name, sign in (
+                    (
+                        "dkim.sign",
+                        lambda: sign_from_file(key_path, algorithm, msg_data),
+                    ),
+                    ("DKIMSigner", lambda: signer.sign(msg_data)),
+                ):
+                    seconds = timeit.timeit(sign, number=number)
+                    print(
+                        "{:<15} {:>5} KiB {:<11} {:10.0f} msg/s".format(
+                            algorithm, len(msg_data) // 1024, name, number / seconds
+                        )
+                    )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
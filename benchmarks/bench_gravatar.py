@@ -0,0 +1,44 @@
+"""
+Per URL cost of gravatar URLs for a comment page.
+
+    python benchmarks/bench_gravatar.py
+
+A page of 500 comments by 100 commenters, rendered again and again like
+the comment pages do. "old" hashes the email and builds the query string
+for every URL, like `gravatar_client` did before the caches.
+"""
+
+import timeit
+
+from hashlib import md5
+
+from miscutils.gravatar import gravatar_client, gravatar_many
+
+EMAILS = ["user{}@example.com".format(i % 100) for i in range(500)]
+
+
+def old_gravatar_client(
+    email, size=48, rating="g", default="retro", force_default=False
+):
+    query_params = ["s={}".format(size), "r={}".format(rating), "d={}".format(default)]
+    if force_default:
+        query_params.append("f=y")
+    uri = "https://secure.gravatar.com/avatar/{0}?{1}"
+    return uri.format(md5(email.encode("utf-8")).hexdigest(), "&".join(query_params))
+
+
+def main():
+    number = 200
+    for name, run in (
+        ("old", lambda: [old_gravatar_client(e) for e in EMAILS]),
+        ("gravatar_client", lambda: [gravatar_client(e) for e in EMAILS]),
+        ("gravatar_many", lambda: gravatar_many(EMAILS)),
+    ):
+        seconds = min(timeit.repeat(run, number=number, repeat=5))
+        print(
+            "{:<20} {:8.2f} us/url".format(name, seconds / number / len(EMAILS) * 1e6)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Dollars to cents over a million row billing export.
+
+    python benchmarks/bench_money.py
+
+"old" is `dollars_to_cents` before it was exact, `int(float(d) * 100)`,
+and "wrong" counts the rows it gets a cent short. The strings are
+converted one at a time, as a list and as a NumPy array, the floats as a
+float64 array, then the export is converted as a CSV file.
+"""
+
+import io
+
+import time
+
+import random
+
+import numpy as np
+
+from miscutils.money import (
+    cents_to_dollars_many,
+    dollars_to_cents,
+    dollars_to_cents_csv,
+    dollars_to_cents_many,
+    format_cents,
+)
+
+ROWS = 1000000
+
+
+def old_dollars_to_cents(dollars):
+    return int(float(dollars) * 100)
+
+
+def old_cents_to_dollars(cents):
+    return int(cents) / 100.0
+
+
+def timed(name, run):
+    times = []
+    for i in range(3):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    print("{:<28} {:8.1f} ms".format(name, min(times) * 1000))
+    return result
+
+
+def main():
+    rnd = random.Random(0)
+    cents = [rnd.randrange(-100000, 10000000) for i in range(ROWS)]
+    strings = [format_cents(c) for c in cents]
+    floats = np.array([float(s) for s in strings])
+    csv_data = "id,amount\n" + "".join(
+        "{},{}\n".format(i, s) for i, s in enumerate(strings)
+    )
+
+    old = timed("old", lambda: [old_dollars_to_cents(s) for s in strings])
+    print("  wrong: {} rows".format(sum(o != c for o, c in zip(old, cents))))
+    timed("dollars_to_cents", lambda: [dollars_to_cents(s) for s in strings])
+    timed("dollars_to_cents_many list", lambda: dollars_to_cents_many(strings))
+    array = np.array(strings)
+    timed("dollars_to_cents_many str[]", lambda: dollars_to_cents_many(array))
+    timed("dollars_to_cents_many f8[]", lambda: dollars_to_cents_many(floats))
+    timed(
+        "dollars_to_cents_csv",
+        lambda: dollars_to_cents_csv(io.StringIO(csv_data), io.StringIO(), ["amount"]),
+    )
+    print()
+    timed("old cents_to_dollars", lambda: [old_cents_to_dollars(c) for c in cents])
+    timed("cents_to_dollars_many list", lambda: cents_to_dollars_many(cents))
+    int_array = np.array(cents, dtype=np.int64)
+    timed("cents_to_dollars_many i8[]", lambda: cents_to_dollars_many(int_array))
+
+
+if __name__ == "__main__":
+    main()
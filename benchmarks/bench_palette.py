@@ -0,0 +1,50 @@
+"""
+Compare `hex_color` functions called per color with the `palette` batch
+functions over a 10k color palette.
+
+    python benchmarks/bench_palette.py
+"""
+
+import random
+
+import timeit
+
+from miscutils import hex_color, palette
+
+COLORS = ["#%06x" % random.randrange(1 << 24) for i in range(10000)]
+
+
+def main():
+    for name, per_color, batch in (
+        (
+            "color_scale",
+            lambda: [hex_color.color_scale(c, 1.2) for c in COLORS],
+            lambda: palette.color_scale_many(COLORS, 1.2),
+        ),
+        (
+            "lighten",
+            lambda: [hex_color.lighten(c, 0.1) for c in COLORS],
+            lambda: palette.lighten_many(COLORS, 0.1),
+        ),
+        (
+            "mix",
+            lambda: [hex_color.mix(c, "#ffffff", 0.2) for c in COLORS],
+            lambda: palette.mix_many(COLORS, "#ffffff", 0.2),
+        ),
+        (
+            "contrast_ratio",
+            lambda: [hex_color.contrast_ratio(c, "#ffffff") for c in COLORS],
+            lambda: palette.contrast_ratio_many(COLORS, "#ffffff"),
+        ),
+    ):
+        one = min(timeit.repeat(per_color, number=1, repeat=5))
+        many = min(timeit.repeat(batch, number=1, repeat=5))
+        print(
+            "{:<15} per color {:7.2f} ms  batch {:7.2f} ms  {:5.1f}x".format(
+                name, one * 1000, many * 1000, one / many
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Validate a million row synthetic contact CSV with the old per row check
+against `validate_csv` and `validate_csv_chunks`, best of 3 runs.
+
+    python benchmarks/bench_phone_numbers.py
+
+`validate_csv` builds a `PhoneResult` per row, `validate_csv_chunks` is
+the fast path. Worker processes only pay off with several free CPUs, the
+CSV is still parsed in the calling process.
+"""
+
+import os
+
+import csv
+
+import time
+
+import random
+
+import tempfile
+
+from miscutils.phone_numbers import validate_csv, validate_csv_chunks
+
+ROWS = 1000000
+
+FORMATS = ["{}-{}-{}", "({}) {}.{}", "{} {} {}", "{}{}{}", "+1 {} {} {}", "{}-{}"]
+
+
+def old_is_phone_number_valid(phone_number):
+    """`is_phone_number_valid` before bulk validation was added."""
+    phone_number = phone_number.replace("-", "")
+    phone_number = phone_number.replace(".", "")
+    phone_number = phone_number.replace(" ", "")
+    phone_number = phone_number.replace("(", "")
+    phone_number = phone_number.replace(")", "")
+    if not phone_number.isdigit():
+        return False
+    if len(phone_number) < 10:
+        return False
+    return True
+
+
+def write_contacts(path):
+    rnd = random.Random(0)
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["name", "phone"])
+        for i in range(ROWS):
+            phone_number = rnd.choice(FORMATS).format(
+                rnd.randrange(200, 999),
+                rnd.randrange(100, 999),
+                rnd.randrange(1000, 9999),
+            )
+            writer.writerow(["contact {}".format(i), phone_number])
+
+
+def old(path):
+    with open(path, newline="") as fh:
+        reader = csv.reader(fh)
+        next(reader)
+        return sum(old_is_phone_number_valid(row[1]) for row in reader)
+
+
+def new(path):
+    with open(path, newline="") as fh:
+        return sum(r.valid for r in validate_csv(fh, "phone"))
+
+
+def new_chunks(path, workers):
+    with open(path, newline="") as fh:
+        chunks = validate_csv_chunks(fh, "phone", workers=workers)
+        return sum(sum(valid) for _, _, valid in chunks)
+
+
+def main():
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_contacts(path)
+        for name, run in (
+            ("old", lambda: old(path)),
+            ("validate_csv", lambda: new(path)),
+            ("validate_csv_chunks", lambda: new_chunks(path, 0)),
+            ("chunks workers=4", lambda: new_chunks(path, 4)),
+        ):
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                valid = run()
+                times.append(time.perf_counter() - start)
+            seconds = min(times)
+            print(
+                "{:<24} {:6.2f}s {:10.0f} rows/s  {} valid".format(
+                    name, seconds, ROWS / seconds, valid
+                )
+            )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
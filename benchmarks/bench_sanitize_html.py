@@ -0,0 +1,61 @@
+"""
+Compare `clean_raw_html` with and without `single_pass` on large documents.
+
+    python benchmarks/bench_sanitize_html.py
+"""
+
+import timeit
+
+from miscutils.sanitize_html import (
+    SanitizePolicy,
+    clean_raw_html,
+    markdown_to_raw_html,
+)
+
+SECTION = """
+# Section {0}
+
+Some *emphasis*, **strong text**, a [relative link](/posts/{0}) and an
+external one https://example.com/{0}?a=1&b=2 with &copy; entities.
+
+- item one
+- item two
+
+```python
+def section_{0}(x):
+    return x < {0}
+```
+
+<script type="math/tex">x^{0}</script>
+"""
+
+TAG_ACL = {"script": [("type", "math/tex", "allow")]}
+
+
+def main():
+    two_pass = SanitizePolicy(TAG_ACL, absolute_domain="example.com")
+    single_pass = SanitizePolicy(
+        TAG_ACL, absolute_domain="example.com", single_pass=True
+    )
+
+    for sections in (10, 100, 1000):
+        raw_html = markdown_to_raw_html(
+            "".join(SECTION.format(i) for i in range(sections))
+        )
+        assert clean_raw_html(raw_html, two_pass) == clean_raw_html(
+            raw_html, single_pass
+        )
+        number = max(1, 200 // sections)
+        for name, policy in (("two pass", two_pass), ("single pass", single_pass)):
+            seconds = timeit.timeit(
+                lambda: clean_raw_html(raw_html, policy), number=number
+            )
+            print(
+                "{:>5} sections {:>8} KiB {:<12} {:8.2f} ms".format(
+                    sections, len(raw_html) // 1024, name, seconds / number * 1000
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Child section lookups over a large settings dict.
+
+    python benchmarks/bench_settings.py
+
+5000 settings in 200 sections, looking up 40 of the sections, like an app
+does at startup. `get_children_settings` scans every key for each section,
+`SettingsIndex` is built once, "cold" includes building it.
+"""
+
+import timeit
+
+from miscutils import get_children_settings
+
+from miscutils.settings import SettingsIndex
+
+SETTINGS = {
+    "section{}.key{}".format(i % 200, i): str(i) if i % 3 else "$HOME/{}".format(i)
+    for i in range(5000)
+}
+
+SECTIONS = ["section{}".format(i) for i in range(0, 200, 5)]
+
+
+def warm_index():
+    index = SettingsIndex(SETTINGS)
+    index.children(SECTIONS[0])
+    return index
+
+
+def main():
+    index = warm_index()
+    number = 20
+    for name, run in (
+        (
+            "get_children_settings",
+            lambda: [get_children_settings(SETTINGS, s) for s in SECTIONS],
+        ),
+        (
+            "SettingsIndex cold",
+            lambda: [
+                i.children(s) for i in [SettingsIndex(SETTINGS)] for s in SECTIONS
+            ],
+        ),
+        ("SettingsIndex warm", lambda: [index.children(s) for s in SECTIONS]),
+    ):
+        seconds = min(timeit.repeat(run, number=number, repeat=5))
+        print(
+            "{:<24} {:10.1f} us/section".format(
+                name, seconds / number / len(SECTIONS) * 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Per avatar cost of svgtar for a page listing 10k users.
+
+    python benchmarks/bench_svgtar.py
+
+"old" formats the whitespace heavy template and strips it per call, like
+svgtar did before the template was minified at import and memoized.
+
+The second table compares rendering one data URI, without the cache and
+the background color, through `str.format` and `quote` against the
+compiled templates.
+"""
+
+import timeit
+
+from urllib.parse import quote
+
+from miscutils.svgtar import (
+    _bg_color,
+    _options,
+    data_uri,
+    inline_svgtar,
+    svgtar_cache,
+    svgtar_many,
+)
+
+from miscutils.svgtar.svg import (
+    MINIFIED_TEMPLATE,
+    QUOTED_SVG_TEMPLATE,
+    SVG_TEMPLATE,
+    TEMPLATE,
+    reduce_whitespace,
+)
+
+USERS = [("U{}".format(i % 100), "user-{}".format(i)) for i in range(10000)]
+
+
+def old_inline_svgtar(text, h, size=55):
+    svg = TEMPLATE.format(
+        text=text,
+        size=size,
+        color="#ffffff",
+        bg=_bg_color(h=h),
+        font_size=size * 0.6,
+        font_family="Arial",
+    )
+    return "data:image/svg+xml;charset=utf-8,{}".format(quote(reduce_whitespace(svg)))
+
+
+def cold_inline_svgtar():
+    svgtar_cache.clear()
+    return [inline_svgtar(text, h) for text, h in USERS]
+
+
+def cold_svgtar_many():
+    svgtar_cache.clear()
+    return svgtar_many(USERS, inline=True)
+
+
+def main():
+    svgtar_cache.maxsize = 2 * len(USERS)
+    for name, run in (
+        ("old", lambda: [old_inline_svgtar(text, h) for text, h in USERS]),
+        ("inline_svgtar cold", cold_inline_svgtar),
+        ("svgtar_many cold", cold_svgtar_many),
+        ("svgtar_many warm", lambda: svgtar_many(USERS, inline=True)),
+        ("inline_svgtar warm", lambda: [inline_svgtar(t, h) for t, h in USERS]),
+    ):
+        seconds = min(timeit.repeat(run, number=1, repeat=5))
+        print("{:<20} {:8.2f} us/avatar".format(name, seconds / len(USERS) * 1000000))
+
+    print()
+    options = _options("RB", "russell")
+    number = 100000
+    for name, render in (
+        ("format + quote", lambda: data_uri(MINIFIED_TEMPLATE.format(**options))),
+        (
+            "compiled percent",
+            lambda: "data:image/svg+xml;charset=utf-8,"
+            + QUOTED_SVG_TEMPLATE.render(options),
+        ),
+        (
+            "format + base64",
+            lambda: data_uri(MINIFIED_TEMPLATE.format(**options), "base64"),
+        ),
+        ("compiled base64", lambda: data_uri(SVG_TEMPLATE.render(options), "base64")),
+    ):
+        seconds = min(timeit.repeat(render, number=number, repeat=5))
+        print("{:<20} {:8.2f} us/avatar".format(name, seconds / number * 1000000))
+
+
+if __name__ == "__main__":
+    main()
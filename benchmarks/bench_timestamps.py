@@ -0,0 +1,79 @@
+"""
+Date strings and "ago" strings for a 100k row activity feed.
+
+    python benchmarks/bench_timestamps.py
+
+The feed covers the last 30 days, newest first, like the activity pages.
+"old" calls the single value helpers for each row, as they were before
+`format_minute` was cached, against the batch versions in `timestamps`.
+"""
+
+import time
+
+import random
+
+from datetime import datetime
+
+from ago import human
+
+from miscutils import datetime_to_timestamp, format_minute, timestamp_to_datetime
+
+from miscutils.timestamps import (
+    datetimes_to_timestamps,
+    timestamps_to_ago_strings,
+    timestamps_to_date_strings,
+    timestamps_to_datetimes,
+)
+
+ROWS = 100000
+
+
+def old_datetime_to_timestamp(dt):
+    epoch_dt = datetime(1970, 1, 1)
+    return (dt - epoch_dt).total_seconds() * 1000
+
+
+def cold_date_strings(timestamps):
+    format_minute.cache_clear()
+    return timestamps_to_date_strings(timestamps)
+
+
+def main():
+    rnd = random.Random(0)
+    now = int(datetime_to_timestamp(datetime.now()))
+    feed = sorted(
+        (now - rnd.randrange(30 * 86400000) for i in range(ROWS)), reverse=True
+    )
+    datetimes = timestamps_to_datetimes(feed)
+    for name, run in (
+        (
+            "old date strings",
+            lambda: [
+                timestamp_to_datetime(t).strftime("%b %d, %Y %I:%M %P") for t in feed
+            ],
+        ),
+        ("date strings cold", lambda: cold_date_strings(feed)),
+        ("date strings warm", lambda: timestamps_to_date_strings(feed)),
+        (
+            "old ago strings",
+            lambda: [human(timestamp_to_datetime(t), 2, abbreviate=True) for t in feed],
+        ),
+        ("ago strings", lambda: timestamps_to_ago_strings(feed)),
+        ("old to datetimes", lambda: [timestamp_to_datetime(t) for t in feed]),
+        ("to datetimes", lambda: timestamps_to_datetimes(feed)),
+        (
+            "old to timestamps",
+            lambda: [old_datetime_to_timestamp(dt) for dt in datetimes],
+        ),
+        ("to timestamps", lambda: datetimes_to_timestamps(datetimes)),
+    ):
+        times = []
+        for i in range(3):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        print("{:<20} {:8.1f} ms".format(name, min(times) * 1000))
+
+
+if __name__ == "__main__":
+    main()
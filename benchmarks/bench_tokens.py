@@ -0,0 +1,60 @@
+"""
+Generating 100k 32 character passwords, like provisioning accounts.
+
+    python benchmarks/bench_tokens.py
+
+"old" is `generate_password` before it used `os.urandom`, one
+`random.choice` per character. "secrets.choice" is the usual secure
+version, one `secrets.choice` per character.
+"""
+
+import time
+
+import random
+
+import secrets
+
+from miscutils.tokens import generate_password, generate_passwords
+
+COUNT = 100000
+
+SIZE = 32
+
+
+def old_generate_password(size=32):
+    letters = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    digits = "0123456789"
+    pool = letters + digits
+    return "".join([random.choice(pool) for i in range(size)])
+
+
+def secrets_generate_password(size=32):
+    pool = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    return "".join([secrets.choice(pool) for i in range(size)])
+
+
+def main():
+    for name, run in (
+        ("old", lambda: [old_generate_password(SIZE) for i in range(COUNT)]),
+        (
+            "secrets.choice",
+            lambda: [secrets_generate_password(SIZE) for i in range(COUNT)],
+        ),
+        ("generate_password", lambda: [generate_password(SIZE) for i in range(COUNT)]),
+        ("generate_passwords", lambda: generate_passwords(COUNT, SIZE)),
+    ):
+        times = []
+        for i in range(3):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        seconds = min(times)
+        print(
+            "{:<20} {:8.1f} ms {:10.0f} passwords/s".format(
+                name, seconds * 1000, COUNT / seconds
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+UUID validation and log scanning throughput.
+
+    python benchmarks/bench_uuid_validation.py [--log-mb 4096]
+
+Validates 1M UUIDs with `UUID_ALL_PATTERN.fullmatch`, `is_uuid` and
+`validate_many`, then writes a synthetic access log of `--log-mb`
+megabytes, one request id in five lines, and scans the memory mapped
+file with `UUID_ALL_PATTERN.finditer` against `find_uuids`. Use a few thousand megabytes
+to measure multi gigabyte logs, the log is written to the temp directory.
+"""
+
+import os
+
+import re
+
+import mmap
+
+import time
+
+import uuid
+
+import random
+
+import argparse
+
+import tempfile
+
+from miscutils.uuid_validation import (
+    UUID_ALL_PATTERN,
+    find_uuids,
+    is_uuid,
+    validate_many,
+)
+
+LINE = (
+    "2024-05-01T12:00:{:02d}.123Z INFO app.request method=GET "
+    "path=/api/v1/items/{} status=200 request_id={} took=12ms\n"
+)
+
+
+def write_log(path, megabytes):
+    rnd = random.Random(0)
+    size = megabytes * 1000000
+    written = 0
+    with open(path, "w") as fh:
+        while written < size:
+            lines = []
+            for i in range(10000):
+                request_id = "-"
+                if i % 5 == 0:
+                    request_id = str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+                lines.append(LINE.format(i % 60, i, request_id))
+            block = "".join(lines)
+            fh.write(block)
+            written += len(block)
+    return written
+
+
+def timed(name, run, size, unit):
+    start = time.perf_counter()
+    count = run()
+    seconds = time.perf_counter() - start
+    print(
+        "{:<28} {:7.2f}s {:10.1f} {}  {} found".format(
+            name, seconds, size / seconds, unit, count
+        )
+    )
+
+
+def old_scan(path):
+    pattern = re.compile(UUID_ALL_PATTERN.pattern.encode("ascii"), re.I)
+    with open(path, "rb") as fh:
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            matches = pattern.finditer(mapped)
+            count = sum(1 for match in matches)
+            del matches
+            return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log-mb", type=int, default=200)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    values = [str(uuid.UUID(int=rnd.getrandbits(128), version=4)) for i in range(10**6)]
+    count = len(values)
+    for name, run in (
+        ("fullmatch", lambda: sum(1 for v in values if UUID_ALL_PATTERN.fullmatch(v))),
+        ("is_uuid", lambda: sum(map(is_uuid, values))),
+        ("validate_many", lambda: sum(validate_many(values))),
+    ):
+        timed(name, run, count / 1e6, "M uuids/s")
+
+    print()
+    fd, path = tempfile.mkstemp(suffix=".log")
+    os.close(fd)
+    try:
+        size = write_log(path, args.log_mb) / 1e6
+        timed("UUID_ALL_PATTERN finditer", lambda: old_scan(path), size, "MB/s")
+
+        def scan():
+            with open(path, "rb") as fh:
+                return sum(1 for u in find_uuids(fh))
+
+        timed("find_uuids mmap", scan, size, "MB/s")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,21 @@
-from ago import human
-
 from datetime import datetime
 
+from functools import lru_cache
+
+from importlib import import_module
+
+_EPOCH = datetime(1970, 1, 1)
+
+# the format of `timestamp_to_date_string`, minutes are its smallest unit.
+DATE_FORMAT = "%b %d, %Y %I:%M %P"
+
 
 def generate_password(size=32):
     """Return a system generated password"""
-    from random import choice
-    letters = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    digits = "0123456789"
-    pool = letters + digits
-    return "".join([choice(pool) for i in range(size)])
+    from .tokens import generate_password
+
+    # from os.urandom, see `tokens.generate_passwords` for many at once.
+    return generate_password(size)
 
 
 def get_int_or_bool_or_none_or_str(value):
@@ -46,6 +52,7 @@ def get_children_settings(settings, parent_key):
       >>> get_children_settings({'auth_tkt.hashalg': 'md5'}, 'auth_tkt')
       {'hashalg': 'md5'}
 
+    Use `miscutils.settings.SettingsIndex` to look up many sections.
     """
     # needed to support expanding ENV vars from ini.
     from os.path import expandvars
@@ -67,24 +74,83 @@ def timestamp_to_datetime(timestamp):
     return datetime.fromtimestamp(timestamp / 1000.0)
 
 
+@lru_cache(maxsize=1 << 16)
+def format_minute(minute, fmt=DATE_FORMAT):
+    """Returns the local time of a minute since the epoch, memoized."""
+    return datetime.fromtimestamp(minute * 60).strftime(fmt)
+
+
 def timestamp_to_date_string(timestamp):
-    return timestamp_to_datetime(timestamp).strftime("%b %d, %Y %I:%M %P")
+    # formatted once per minute, the smallest unit of the format.
+    return format_minute(int(timestamp // 60000))
 
 
 def datetime_to_timestamp(dt):
     """returns an integer timestamp in milliseconds"""
-    epoch_dt = datetime(1970, 1, 1)
-    return (dt - epoch_dt).total_seconds() * 1000
+    return (dt - _EPOCH).total_seconds() * 1000
 
 
 def timestamp_to_ago_string(timestamp):
     """Accepts a timestamp and returns a human readable string"""
+    from ago import human
+
     return human(timestamp_to_datetime(timestamp), 2, abbreviate=True)
 
 
 def dollars_to_cents(dollars):
-    return int(float(dollars) * 100)
+    from .money import dollars_to_cents
+
+    # exact, "0.29" is 29 cents, float arithmetic made it 28.
+    return dollars_to_cents(dollars)
 
 
 def cents_to_dollars(cents):
     return int(cents) / 100.0
+
+
+# submodules `__getattr__` imports on first use, like `miscutils.money`.
+_SUBMODULES = frozenset(
+    [
+        "bulk_mail",
+        "cache_backends",
+        "dkim_signer",
+        "gravatar",
+        "hex_color",
+        "highlight_cache",
+        "incremental_markdown",
+        "mail",
+        "mail_async",
+        "mail_queue",
+        "money",
+        "palette",
+        "phone_numbers",
+        "render_cache",
+        "sanitize_batch",
+        "sanitize_html",
+        "settings",
+        "smtp_pool",
+        "svgtar",
+        "timestamps",
+        "tokens",
+        "uuid_validation",
+    ]
+)
+
+
+def __getattr__(name):
+    """
+    Imports submodules and `human` the first time they are looked up,
+    so `import miscutils` stays cheap for short lived processes.
+    """
+    if name in _SUBMODULES:
+        return import_module("." + name, __name__)
+    if name == "human":
+        # importing ago loads typing, it was imported eagerly before.
+        from ago import human
+
+        return human
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES | {"human"})
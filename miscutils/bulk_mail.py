@@ -0,0 +1,203 @@
+"""
+Send one message to many recipients, building the MIME parts once.
+
+`send_email` builds, serializes and signs a new message for every call,
+though for a newsletter only the To header changes. A `MessageTemplate`
+serializes the message once and splices in the per recipient headers:
+
+    results = send_bulk_email(
+        recipients, sender_email, subject, message_text, message_html
+    )
+    failed = {to: error for to, error in results.items() if error}
+
+Recipients are addresses or (address, headers) pairs, the headers dict
+personalizes that copy, for example with a List-Unsubscribe link. Every
+copy is DKIM signed on its own since the signature covers the To header.
+
+With `envelope_size` above 1 recipients without personal headers share
+one copy, addressed To `undisclosed-recipients:;`, and up to that many
+RCPT commands are sent for it, where the relay policy allows it.
+"""
+
+import smtplib
+
+import itertools
+
+from email.message import Message
+
+from .mail import build_message_data
+
+from .smtp_pool import DISCONNECT_ERRORS, default_pool
+
+UNDISCLOSED_RECIPIENTS = "undisclosed-recipients:;"
+
+# stands in for the To header while the template is serialized.
+_PLACEHOLDER = "bulk-mail-placeholder@example.invalid"
+
+
+def header_bytes(name, value):
+    """Returns the serialized header line, the same as `msg[name] = value`."""
+    if value.isascii() and len(name) + len(value) < 76 and "\n" not in value:
+        return "{}: {}\n".format(name, value).encode("ascii")
+    msg = Message()
+    msg[name] = value
+    # drop the blank line which ends the header block.
+    return msg.as_bytes()[:-1]
+
+
+class MessageTemplate(object):
+    """A serialized message with a To header, and more, filled per recipient."""
+
+    def __init__(
+        self,
+        sender_email,
+        subject,
+        message_text,
+        message_html,
+        dkim_private_key_path="",
+        dkim_selector="",
+        dkim_signature_algorithm="ed25519-sha256",
+    ):
+        self.sender_email = sender_email
+        msg, msg_data = build_message_data(
+            _PLACEHOLDER, sender_email, subject, message_text, message_html
+        )
+        to_line = header_bytes("To", _PLACEHOLDER)
+        self.head, self.tail = msg_data.split(to_line, 1)
+        self.signer = None
+        if dkim_private_key_path and dkim_selector:
+            from .dkim_signer import get_signer
+
+            self.signer = get_signer(
+                dkim_private_key_path,
+                dkim_selector,
+                sender_email.split("@")[-1],
+                dkim_signature_algorithm,
+            )
+            # every copy has the same body, hash it once.
+            self.body_hash = self.signer.body_hash(msg_data)
+
+    def render(self, to_email, headers=None):
+        """Returns the signed message bytes addressed to `to_email`."""
+        parts = [self.head, header_bytes("To", to_email)]
+        if headers:
+            for name, value in headers.items():
+                parts.append(header_bytes(name, value))
+        parts.append(self.tail)
+        msg_data = b"".join(parts)
+        if self.signer is not None:
+            signature = self.signer.sign(
+                msg_data, linesep=b"\n", body_hash=self.body_hash
+            )
+            msg_data = signature + msg_data
+        return msg_data
+
+    def envelopes(self, recipients, envelope_size=1):
+        """
+        Yields (recipients, message bytes) pairs to send.
+
+        Recipients without personal headers are grouped `envelope_size` at
+        a time into one undisclosed copy, when `envelope_size` is above 1.
+        """
+        group = []
+        for recipient in recipients:
+            if isinstance(recipient, str):
+                to_email, headers = recipient, None
+            else:
+                to_email, headers = recipient
+            if envelope_size > 1 and not headers:
+                group.append(to_email)
+                if len(group) == envelope_size:
+                    yield group, self.render(UNDISCLOSED_RECIPIENTS)
+                    group = []
+            else:
+                yield [to_email], self.render(to_email, headers)
+        if group:
+            yield group, self.render(UNDISCLOSED_RECIPIENTS)
+
+
+def deliver_envelopes(pool, relay, sender_email, envelopes):
+    """
+    Send (recipients, message bytes) pairs over pooled connections.
+
+    Returns a dict of each recipient to None if the relay accepted it, or
+    the exception it failed with. If the connection drops a new one is
+    opened for the remaining envelopes, if connecting fails they all fail.
+    A reused connection the relay already dropped is replaced by a fresh
+    one before anything fails.
+    """
+    results = {}
+    envelopes = iter(envelopes)
+    envelope = next(envelopes, None)
+    fresh = False
+    while envelope is not None:
+        sent = 0
+        reused = False
+        try:
+            with pool.checkout(relay, fresh=fresh) as (connection, reused):
+                while envelope is not None:
+                    to_emails, msg_data = envelope
+                    try:
+                        refused = connection.sendmail(sender_email, to_emails, msg_data)
+                    except smtplib.SMTPRecipientsRefused as e:
+                        refused = e.recipients
+                    except (smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        refused = dict.fromkeys(to_emails, (e.smtp_code, e.smtp_error))
+                    sent += 1
+                    for to_email in to_emails:
+                        refusal = refused.get(to_email)
+                        if refusal is not None:
+                            refusal = smtplib.SMTPRecipientsRefused({to_email: refusal})
+                        results[to_email] = refusal
+                    envelope = None
+                    envelope = next(envelopes, None)
+        except (smtplib.SMTPException, OSError) as e:
+            if envelope is None:
+                # building the next message failed, not the connection.
+                raise
+            if reused and not sent and isinstance(e, DISCONNECT_ERRORS):
+                # the relay dropped the idle connection, try a new one once.
+                fresh = True
+                continue
+            fresh = False
+            # fail the envelope in flight, or all of them if we never sent.
+            failed = [envelope] if sent else itertools.chain([envelope], envelopes)
+            for to_emails, _ in failed:
+                results.update(dict.fromkeys(to_emails, e))
+            envelope = next(envelopes, None)
+    return results
+
+
+def send_bulk_email(
+    recipients,
+    sender_email,
+    subject,
+    message_text,
+    message_html,
+    relay="localhost",
+    dkim_private_key_path="",
+    dkim_selector="",
+    dkim_signature_algorithm="ed25519-sha256",
+    envelope_size=1,
+    pool=None,
+):
+    """
+    Send the same email to every recipient over pooled connections.
+
+    Returns a dict of each recipient address to None if the relay accepted
+    it, or the `smtplib.SMTPException` or `socket.error` it failed with.
+    """
+    template = MessageTemplate(
+        sender_email,
+        subject,
+        message_text,
+        message_html,
+        dkim_private_key_path,
+        dkim_selector,
+        dkim_signature_algorithm,
+    )
+    if pool is None:
+        pool = default_pool
+    return deliver_envelopes(
+        pool, relay, sender_email, template.envelopes(recipients, envelope_size)
+    )
@@ -0,0 +1,92 @@
+"""
+Cache backends shared by the render and highlight caches.
+
+A backend is any object with ``get(key)`` and ``set(key, value)`` methods
+where ``get`` returns None on a miss and values are strings.
+"""
+
+import os
+
+import tempfile
+
+import threading
+
+from collections import OrderedDict
+
+
+class LRUBackend(object):
+    """A bounded, thread safe, in-process least recently used backend."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DiskBackend(object):
+    """
+    An on-disk backend which may be shared by many processes.
+
+    Each entry is stored in its own file named after the key. Entries
+    are written to a temporary file and renamed into place so readers
+    never see a partially written entry.
+    """
+
+    evictions = 0
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as fh:
+                return fh.read().decode("utf-8")
+        except (IOError, OSError):
+            return None
+
+    def set(self, key, value):
+        path = self._path(key)
+        parent = os.path.dirname(path)
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # another process created it first.
+                pass
+        fd, tmp_path = tempfile.mkstemp(dir=parent)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(value.encode("utf-8"))
+            os.rename(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
@@ -0,0 +1,162 @@
+"""
+DKIM signers which load and parse their private key once.
+
+`dkim.sign` takes the PEM or base64 key text and parses it on every call,
+and `mail.send_email` used to read the key file for every message too.
+
+    signer = get_signer("/etc/dkim/mail.key", "mail", "example.com")
+    msg_data = signer.sign(msg_data) + msg_data
+
+Signers are cached per (key path, selector, domain, algorithm) and the key
+file is stat-ed before each signature, so a rotated key is reloaded as soon
+as its mtime changes.
+"""
+
+import os
+
+import time
+
+import base64
+
+import threading
+
+import dkim
+
+from dkim.canonicalization import CanonicalizationPolicy
+from dkim.crypto import parse_pem_private_key
+
+import logging
+
+log = logging.getLogger(__name__)
+
+try:
+    import nacl.encoding
+    import nacl.signing
+except ImportError:  # pragma: no cover
+    nacl = None
+
+DEFAULT_SIGN_HEADERS = (b"To", b"From", b"Subject")
+
+
+def _bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+def parse_private_key(key_data, signature_algorithm="ed25519-sha256"):
+    """Returns the private key object `dkim` signs with."""
+    if _bytes(signature_algorithm) == b"ed25519-sha256":
+        if nacl is None:  # pragma: no cover
+            raise dkim.NaClNotFoundError("pynacl is required for ed25519 signing")
+        return nacl.signing.SigningKey(
+            key_data.strip(), encoder=nacl.encoding.Base64Encoder
+        )
+    return parse_pem_private_key(key_data)
+
+
+class DKIMSigner(object):
+    """Signs messages with a cached, pre-parsed DKIM private key."""
+
+    def __init__(
+        self,
+        key_path,
+        selector,
+        domain,
+        signature_algorithm="ed25519-sha256",
+        include_headers=DEFAULT_SIGN_HEADERS,
+        canonicalize=(b"relaxed", b"simple"),
+    ):
+        self.key_path = key_path
+        self.selector = _bytes(selector)
+        self.domain = _bytes(domain)
+        self.signature_algorithm = _bytes(signature_algorithm)
+        self.include_headers = tuple(_bytes(h).lower() for h in include_headers)
+        if b"from" not in self.include_headers:
+            raise dkim.ParameterError("The From header field MUST be signed")
+        self.canon_policy = CanonicalizationPolicy.from_c_value(b"/".join(canonicalize))
+        self.loads = 0
+        self._key = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def private_key(self):
+        """Returns the parsed private key, reloaded if the file changed."""
+        mtime = os.stat(self.key_path).st_mtime_ns
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    with open(self.key_path, "rb") as fh:
+                        key_data = fh.read()
+                    self._key = parse_private_key(key_data, self.signature_algorithm)
+                    self._mtime = mtime
+                    self.loads += 1
+                    log.info("Loaded DKIM key %s", self.key_path)
+        return self._key
+
+    def body_hash(self, message):
+        """Returns the base64 bh= value of the bytes `message`."""
+        body = dkim.rfc822_parse(message)[1]
+        hasher = dkim.HASH_ALGORITHMS[self.signature_algorithm]
+        return base64.b64encode(
+            hasher(self.canon_policy.canonicalize_body(body)).digest()
+        )
+
+    def sign(self, message, linesep=b"\r\n", body_hash=None):
+        """
+        Returns the DKIM-Signature header line for the bytes `message`.
+
+        Same as `dkim.sign`, without reading or parsing the key. Only the
+        canonicalized body and the `include_headers` are hashed, messages
+        which share a body may pass its `body_hash` to skip hashing it. The
+        header is folded and terminated with `linesep`.
+        """
+        private_key = self.private_key()
+
+        signer = dkim.DKIM(
+            message, signature_algorithm=self.signature_algorithm, linesep=linesep
+        )
+        signer.hasher = dkim.HASH_ALGORITHMS[self.signature_algorithm]
+        if body_hash is None:
+            body_hash = base64.b64encode(
+                signer.hasher(self.canon_policy.canonicalize_body(signer.body)).digest()
+            )
+
+        fields = [
+            (b"v", b"1"),
+            (b"a", self.signature_algorithm),
+            (b"c", self.canon_policy.to_c_value()),
+            (b"d", self.domain),
+            (b"i", b"@" + self.domain),
+            (b"q", b"dns/txt"),
+            (b"s", self.selector),
+            (b"t", str(int(time.time())).encode("ascii")),
+            (b"h", b" : ".join(self.include_headers)),
+            (b"bh", body_hash),
+            # fold b= onto its own line, like `dkim.sign`.
+            (b"b", b"0" * 60),
+        ]
+        header_value = signer.gen_header(
+            fields,
+            self.include_headers,
+            self.canon_policy,
+            b"DKIM-Signature",
+            private_key,
+        )
+        return b"DKIM-Signature: " + header_value
+
+
+_signers = {}
+_signers_lock = threading.Lock()
+
+
+def get_signer(key_path, selector, domain, signature_algorithm="ed25519-sha256"):
+    """Returns the shared `DKIMSigner` for the given key and domain."""
+    key = (key_path, _bytes(selector), _bytes(domain), _bytes(signature_algorithm))
+    signer = _signers.get(key)
+    if signer is None:
+        with _signers_lock:
+            signer = _signers.get(key)
+            if signer is None:
+                signer = _signers[key] = DKIMSigner(*key)
+    return signer
@@ -1,10 +1,60 @@
+"""
+Gravatar URLs, with the email hashes and query strings cached.
+
+    gravatar_client("Jane@Example.com ")
+    urls = gravatar_many(comment_emails, size=32)
+"""
+
 from hashlib import md5
 
+from functools import lru_cache
 
-def gravatar_client(email, size=48, rating="g", default="retro", force_default=False):
-    """Return a gravatar API URI."""
+from .cache_backends import LRUBackend
+
+GRAVATAR_URL = "https://secure.gravatar.com/avatar/"
+
+# email hashes keyed by the email as given, before it is normalized.
+gravatar_cache = LRUBackend(maxsize=4096)
+
+
+def normalize_email(email):
+    """Returns the email stripped and lowercased, as gravatar hashes it."""
+    if isinstance(email, bytes):
+        email = email.decode("utf-8")
+    return email.strip().lower()
+
+
+def email_hash(email):
+    """Returns the gravatar md5 hex digest of an email, memoized."""
+    digest = gravatar_cache.get(email)
+    if digest is None:
+        digest = md5(normalize_email(email).encode("utf-8")).hexdigest()
+        gravatar_cache.set(email, digest)
+    return digest
+
+
+@lru_cache(maxsize=256)
+def _query_suffix(size, rating, default, force_default):
     query_params = ["s={}".format(size), "r={}".format(rating), "d={}".format(default)]
     if force_default:
         query_params.append("f=y")
-    uri = "https://secure.gravatar.com/avatar/{0}?{1}"
-    return uri.format(md5(email).hexdigest(), "&".join(query_params))
+    return "?" + "&".join(query_params)
+
+
+def gravatar_client(email, size=48, rating="g", default="retro", force_default=False):
+    """Return a gravatar API URI."""
+    suffix = _query_suffix(size, rating, default, bool(force_default))
+    return GRAVATAR_URL + email_hash(email) + suffix
+
+
+def gravatar_many(emails, size=48, rating="g", default="retro", force_default=False):
+    """
+    Return a list of gravatar API URIs, one for each email in `emails`.
+
+    The keyword arguments apply to every URI, like `gravatar_client`.
+    """
+    emails = list(emails)
+    suffix = _query_suffix(size, rating, default, bool(force_default))
+    # commenters repeat on a page, look each one up in the cache once.
+    hashes = {email: email_hash(email) for email in set(emails)}
+    return [GRAVATAR_URL + hashes[email] + suffix for email in emails]
@@ -4,6 +4,8 @@ Original Sourcecode pulled from:
 https://thadeusb.com/weblog/2010/10/10/python_scale_hex_color/
 """
 
+import colorsys
+
 
 def clamp(val, minimum=0, maximum=255):
     if val < minimum:
@@ -21,11 +23,11 @@ def color_scale(hex_str, scale_factor):
     To brighten the color, use a float value greater than 1.
 
     >>> color_scale("#DF3C3C", .5)
-    #6F1E1E
+    '#6f1e1e'
     >>> color_scale("#52D24F", 1.6)
-    #83FF7E
+    '#83ff7e'
     >>> color_scale("#4F75D2", 1)
-    #4F75D2
+    '#4f75d2'
     """
 
     hex_str = hex_str.strip("#")
@@ -41,3 +43,88 @@ def color_scale(hex_str, scale_factor):
 
     #return "#%02x%02x%02x" % (r, g, b)
     return "#%02x%02x%02x" % (r, g, b)
+
+
+def hex_to_rgb(hex_str):
+    """Returns the (r, g, b) ints of a "#rrggbb" hex string."""
+    hex_str = hex_str.strip("#")
+    if len(hex_str) != 6:
+        raise ValueError("expected a #rrggbb hex color: {!r}".format(hex_str))
+    return int(hex_str[:2], 16), int(hex_str[2:4], 16), int(hex_str[4:], 16)
+
+
+def rgb_to_hex(rgb):
+    """Returns the "#rrggbb" hex string of (r, g, b) ints."""
+    return "#%02x%02x%02x" % tuple(rgb)
+
+
+def _to_byte(value):
+    # rounds half up, 0.0 to 1.0 floats to 0 to 255 ints.
+    return int(value * 255.0 + 0.5)
+
+
+def _adjust_lightness(hex_str, amount):
+    r, g, b = hex_to_rgb(hex_str)
+    h, l, s = colorsys.rgb_to_hls(r / 255.0, g / 255.0, b / 255.0)
+    l = clamp(l + amount, 0.0, 1.0)
+    return rgb_to_hex(map(_to_byte, colorsys.hls_to_rgb(h, l, s)))
+
+
+def lighten(hex_str, amount):
+    """
+    Adds ``amount``, 0 to 1, to the HSL lightness of a hex color.
+
+    >>> lighten("#DF3C3C", .1)
+    '#e66868'
+    """
+    return _adjust_lightness(hex_str, amount)
+
+
+def darken(hex_str, amount):
+    """
+    Subtracts ``amount``, 0 to 1, from the HSL lightness of a hex color.
+
+    >>> darken("#DF3C3C", .1)
+    '#c72121'
+    """
+    return _adjust_lightness(hex_str, -amount)
+
+
+def mix(hex_a, hex_b, weight=0.5):
+    """
+    Mixes two hex colors, ``weight`` is the share of ``hex_b``.
+
+    >>> mix("#000000", "#ffffff", .25)
+    '#404040'
+    """
+    return rgb_to_hex(
+        _to_byte((a * (1.0 - weight) + b * weight) / 255.0)
+        for a, b in zip(hex_to_rgb(hex_a), hex_to_rgb(hex_b))
+    )
+
+
+# WCAG linearized sRGB value of each 8 bit channel value.
+_LINEAR = [
+    c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+    for c in (i / 255.0 for i in range(256))
+]
+
+
+def relative_luminance(hex_str):
+    """Returns the WCAG relative luminance of a hex color, 0 to 1."""
+    r, g, b = hex_to_rgb(hex_str)
+    return 0.2126 * _LINEAR[r] + 0.7152 * _LINEAR[g] + 0.0722 * _LINEAR[b]
+
+
+def contrast_ratio(hex_a, hex_b):
+    """
+    Returns the WCAG contrast ratio of two hex colors, 1 to 21.
+
+    >>> round(contrast_ratio("#000000", "#ffffff"), 2)
+    21.0
+    """
+    l1 = relative_luminance(hex_a)
+    l2 = relative_luminance(hex_b)
+    if l1 < l2:
+        l1, l2 = l2, l1
+    return (l1 + 0.05) / (l2 + 0.05)
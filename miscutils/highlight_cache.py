@@ -0,0 +1,331 @@
+"""
+Cache for Pygments highlighted code blocks.
+
+Lexer lookup, language guessing and highlighting dominate the render time
+of code heavy posts, and most code blocks are rendered many times. The
+`HighlightCacheExtension` markdown extension, which `markdown_extensions`
+enables unless one is passed in, caches highlighted blocks keyed on the
+language, the formatter options and a hash of the code.
+
+Preload lexers once per worker process, before the first request:
+
+    warm_up(["python", "bash", "javascript"])
+
+Cap the time spent guessing the language of unlabeled blocks by only
+guessing from their first characters:
+
+    markdown_to_raw_html(data, [HighlightCacheExtension(guess_max_chars=2048)])
+
+Highlighting time of each block is recorded to find pathological blocks:
+
+    for timing in highlight_cache.slowest(10):
+        print(timing.lang, timing.chars, timing.seconds)
+"""
+
+import json
+
+import time
+
+import hashlib
+
+from collections import deque, namedtuple
+
+from functools import partial
+
+from markdown.extensions import Extension
+from markdown.extensions.attr_list import get_attrs_and_remainder
+from markdown.extensions.codehilite import (
+    CodeHilite,
+    CodeHiliteExtension,
+    HiliteTreeprocessor,
+    parse_hl_lines,
+)
+from markdown.extensions.fenced_code import FencedBlockPreprocessor
+
+from .cache_backends import LRUBackend
+
+import logging
+
+log = logging.getLogger(__name__)
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name, guess_lexer
+    from pygments.util import ClassNotFound
+except ImportError:  # pragma: no cover
+    highlight = None
+
+DEFAULT_LEXERS = ("python", "bash", "javascript", "html", "css", "json", "sql")
+
+BlockTiming = namedtuple("BlockTiming", ["lang", "chars", "seconds", "guessed"])
+
+
+class HighlightCache(object):
+    """Caches highlighted code blocks and records highlighting time."""
+
+    def __init__(self, backend=None, max_timings=1024):
+        self.backend = LRUBackend() if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+        self.timings = deque(maxlen=max_timings)
+
+    def record(self, timing):
+        self.timings.append(timing)
+        log.debug(
+            "Highlighted %s block of %s chars in %.4fs",
+            timing.lang,
+            timing.chars,
+            timing.seconds,
+        )
+
+    def slowest(self, count=10):
+        """Returns the `count` slowest recently highlighted blocks."""
+        return sorted(self.timings, key=lambda t: t.seconds, reverse=True)[:count]
+
+    def stats(self):
+        """Returns a dict of hit, miss and eviction counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": getattr(self.backend, "evictions", 0),
+        }
+
+
+# shared by every markdown render in this process.
+highlight_cache = HighlightCache()
+
+
+def warm_up(languages=DEFAULT_LEXERS, guess=False):
+    """
+    Import the Pygments lexers for `languages` and the HTML formatter.
+
+    Set `guess` to also import every lexer, which guessing the language
+    of unlabeled code blocks does on first use.
+
+    Returns the list of languages with a lexer.
+    """
+    if highlight is None:
+        return []
+    formatter = HtmlFormatter()
+    loaded = []
+    for language in languages:
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            log.warning("No Pygments lexer for %s", language)
+            continue
+        highlight("", lexer, formatter)
+        loaded.append(language)
+    if guess:
+        guess_lexer("")
+    return loaded
+
+
+def _has_lexer(lang):
+    if lang is None:
+        return False
+    try:
+        get_lexer_by_name(lang)
+    except ClassNotFound:
+        return False
+    return True
+
+
+class CachedCodeHilite(CodeHilite):
+    """A `CodeHilite` which caches highlighted code blocks."""
+
+    def __init__(self, src, cache=None, guess_max_chars=0, **options):
+        super().__init__(src, **options)
+        self.cache = highlight_cache if cache is None else cache
+        self.guess_max_chars = guess_max_chars
+
+    def cache_key(self):
+        config = json.dumps(
+            [
+                self.lang,
+                self.guess_lang,
+                self.guess_max_chars,
+                self.use_pygments,
+                self.lang_prefix,
+                repr(self.pygments_formatter),
+                sorted((k, repr(v)) for k, v in self.options.items()),
+            ]
+        )
+        digest = hashlib.sha256(config.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(self.src.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _guess_lang(self):
+        """Guess the language from the first `guess_max_chars` of code."""
+        try:
+            lexer = guess_lexer(self.src[: self.guess_max_chars], **self.options)
+        except ClassNotFound:
+            lexer = get_lexer_by_name("text", **self.options)
+        self.lang = lexer.aliases[0]
+
+    def hilite(self, shebang=True):
+        self.src = self.src.strip("\n")
+        if self.lang is None and shebang:
+            self._parseHeader()
+
+        key = self.cache_key()
+        html = self.cache.backend.get(key)
+        if html is not None:
+            self.cache.hits += 1
+            return html
+        self.cache.misses += 1
+
+        start = time.perf_counter()
+        guessed = highlight is not None and not _has_lexer(self.lang)
+        if (
+            guessed
+            and self.guess_lang
+            and self.use_pygments
+            and self.guess_max_chars
+            and len(self.src) > self.guess_max_chars
+        ):
+            self._guess_lang()
+        html = super().hilite(shebang=False)
+        seconds = time.perf_counter() - start
+
+        self.cache.record(BlockTiming(self.lang, len(self.src), seconds, guessed))
+        self.cache.backend.set(key, html)
+        return html
+
+
+class CachedFencedBlockPreprocessor(FencedBlockPreprocessor):
+    """
+    A fenced_code preprocessor which highlights with `CachedCodeHilite`.
+
+    Blocks codehilite highlights are handled here, the rest are left for
+    `FencedBlockPreprocessor`, placeholders never match a fence.
+    """
+
+    def __init__(self, md, config, code_hilite=CachedCodeHilite):
+        super().__init__(md, config)
+        self.code_hilite = code_hilite
+
+    def _codehilite_conf(self):
+        for extension in self.md.registeredExtensions:
+            if isinstance(extension, CodeHiliteExtension):
+                return extension.getConfigs()
+        return {}
+
+    def run(self, lines):
+        conf = self._codehilite_conf()
+        if not conf or not conf["use_pygments"]:
+            return super().run(lines)
+
+        text = "\n".join(lines)
+        index = 0
+        while True:
+            m = self.FENCED_BLOCK_RE.search(text, index)
+            if m is None:
+                break
+            lang, classes, config = None, [], {}
+            if m.group("attrs"):
+                attrs, remainder = get_attrs_and_remainder(m.group("attrs"))
+                if remainder:
+                    # unbalanced braces, not a fenced block.
+                    index = m.end("attrs")
+                    continue
+                block_id, classes, config = self.handle_attrs(attrs)
+                if classes:
+                    lang = classes.pop(0)
+            else:
+                lang = m.group("lang") or None
+                if m.group("hl_lines"):
+                    config["hl_lines"] = parse_hl_lines(m.group("hl_lines"))
+
+            if not config.get("use_pygments", True):
+                index = m.end()
+                continue
+
+            local_config = dict(conf, **config)
+            if classes:
+                # pygments may append a suffix, keep css_class at the end.
+                local_config["css_class"] = "{} {}".format(
+                    " ".join(classes), local_config["css_class"]
+                )
+            highliter = self.code_hilite(
+                m.group("code"),
+                lang=lang,
+                style=local_config.pop("pygments_style", "default"),
+                **local_config
+            )
+            placeholder = self.md.htmlStash.store(highliter.hilite(shebang=False))
+            text = "{}\n{}\n{}".format(text[: m.start()], placeholder, text[m.end() :])
+            index = m.start() + 1 + len(placeholder)
+        return super().run(text.split("\n"))
+
+
+class CachedHiliteTreeprocessor(HiliteTreeprocessor):
+    """A codehilite treeprocessor which highlights with `CachedCodeHilite`."""
+
+    def __init__(self, md, config, code_hilite=CachedCodeHilite):
+        super().__init__(md)
+        self.config = config
+        self.code_hilite = code_hilite
+
+    def run(self, root):
+        for block in root.iter("pre"):
+            if len(block) != 1 or block[0].tag != "code":
+                continue
+            text = block[0].text
+            if text is None:
+                continue
+            local_config = self.config.copy()
+            code = self.code_hilite(
+                self.code_unescape(text),
+                tab_length=self.md.tab_length,
+                style=local_config.pop("pygments_style", "default"),
+                **local_config
+            )
+            placeholder = self.md.htmlStash.store(code.hilite())
+            # the p is removed when the stashed html is inserted.
+            block.clear()
+            block.tag = "p"
+            block.text = placeholder
+
+
+class HighlightCacheExtension(Extension):
+    """
+    Highlight fenced and indented code blocks with `CachedCodeHilite`.
+
+    Must be loaded after the codehilite and fenced_code extensions.
+    """
+
+    def __init__(self, cache=None, **kwargs):
+        self.config = {
+            "guess_max_chars": [
+                0,
+                "Guess the language of unlabeled blocks from this many chars, "
+                "0 guesses from all of the code.",
+            ],
+        }
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md):
+        code_hilite = partial(
+            CachedCodeHilite,
+            cache=self.cache,
+            guess_max_chars=self.getConfig("guess_max_chars"),
+        )
+        # replace the fenced_code and codehilite processors, at the names
+        # and priorities those extensions register them with.
+        if "fenced_code_block" in md.preprocessors:
+            config = md.preprocessors["fenced_code_block"].config
+            md.preprocessors.register(
+                CachedFencedBlockPreprocessor(md, config, code_hilite),
+                "fenced_code_block",
+                25,
+            )
+        if "hilite" in md.treeprocessors:
+            config = md.treeprocessors["hilite"].config
+            md.treeprocessors.register(
+                CachedHiliteTreeprocessor(md, config, code_hilite), "hilite", 30
+            )
+        md.registerExtension(self)
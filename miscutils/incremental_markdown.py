@@ -0,0 +1,248 @@
+"""
+Incremental markdown rendering for large, frequently edited documents.
+
+The markdown is split into top level blocks (paragraphs, fenced code,
+headings, tables, lists) and the sanitized HTML of each block is cached by
+content hash, so a small edit only re-renders the blocks it touched:
+
+    renderer = IncrementalRenderer(policy)
+    html = renderer.render(page.body)
+
+Documents whose blocks depend on each other, for example reference-style
+links or an unclosed fence, are rendered in full.
+"""
+
+import re
+
+from markdown import Markdown
+
+from markdown.postprocessors import Postprocessor
+
+from .render_cache import LRUBackend, RenderCache, render_cache_key
+
+from .sanitize_html import (
+    SanitizePolicy,
+    clean_raw_html,
+    markdown_extensions,
+)
+
+FENCE_RE = re.compile(r"^(?P<fence>`{3,}|~{3,})")
+
+# reference-style link, footnote or abbreviation definitions.
+DEFINITION_RE = re.compile(r"^ {0,3}\*?\[[^\]]+\]:")
+
+# a list or blockquote line, which a following list or blockquote continues.
+CONTAINER_RE = re.compile(r"^ {0,3}(?:[*+-]\s|\d+\.\s|>)")
+
+HTML_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)")
+
+# html5lib treats the start of a document differently from the middle,
+# for example leading whitespace and <head> tags, so blocks after the
+# first are sanitized behind this tag.
+BODY_SENTINEL = "<br/>"
+
+VOID_TAGS = frozenset(["br", "hr", "img", "input", "link", "meta", "wbr"])
+
+# markdown extensions which keep state across the whole document.
+DOCUMENT_EXTENSIONS = frozenset(["abbr", "extra", "footnotes", "toc"])
+
+
+def _extension_name(extension):
+    if not isinstance(extension, str):
+        extension = extension.__class__.__module__
+    return extension.split(".")[-1].split(":")[0]
+
+
+def _html_closed(lines):
+    """Returns False if raw HTML in the block is left open."""
+    block = "\n".join(lines).lower()
+    if block.count("<!--") > block.count("-->"):
+        return False
+    # inline tags are checked too, markdown keeps an unclosed <b> open
+    # into the blocks after it.
+    opened = {}
+    for closing, tag_name in HTML_TAG_RE.findall(block):
+        if tag_name in VOID_TAGS:
+            continue
+        opened[tag_name] = opened.get(tag_name, 0) + (-1 if closing else 1)
+    return all(count <= 0 for count in opened.values())
+
+
+def split_blocks(data):
+    """
+    Returns a list of independent top level markdown blocks.
+
+    Returns None if the blocks depend on each other and the document
+    must be rendered in full.
+    """
+    data = data.replace("\r\n", "\n").replace("\r", "\n")
+
+    # list of (blank lines before the block, lines of the block).
+    blocks = []
+    blank = []
+    lines = []
+    fence = None
+
+    for line in data.split("\n"):
+        if fence is not None:
+            lines.append(line)
+            if line.rstrip(" ") == fence:
+                fence = None
+            continue
+
+        if DEFINITION_RE.match(line):
+            return None
+
+        if not line.strip():
+            if lines:
+                blocks.append((blank, lines))
+                blank, lines = [], []
+            blank.append(line)
+            continue
+
+        match = FENCE_RE.match(line)
+        if match:
+            fence = match.group("fence")
+        lines.append(line)
+
+    if fence is not None:
+        # unclosed fence, it runs to the end of the document.
+        return None
+
+    if lines:
+        blocks.append((blank, lines))
+
+    merged = []
+    for blank, lines in blocks:
+        first = lines[0]
+        if merged and (
+            first[0] in " \t"
+            or (
+                CONTAINER_RE.match(first)
+                and any(CONTAINER_RE.match(line) for line in merged[-1])
+            )
+        ):
+            # indented continuation, loose list item or blockquote.
+            merged[-1].extend(blank + lines)
+            continue
+        merged.append(lines)
+
+    for lines in merged:
+        if not _html_closed(lines):
+            # raw HTML which may continue past a blank line.
+            return None
+
+    return ["\n".join(lines) for lines in merged]
+
+
+class _TrailingWhitespace(Postprocessor):
+    """
+    Records the whitespace markdown strips from the end of its output.
+
+    Raw HTML and highlighted code blocks end with a newline, so markdown
+    separates them from the next block with a blank line.
+    """
+
+    tail = ""
+
+    def run(self, text):
+        self.tail = text[len(text.rstrip()) :]
+        return text
+
+
+def render_block(block, cleaner, extra_extensions=None, in_body=False):
+    """
+    Returns the sanitized HTML of a markdown block.
+
+    The whitespace markdown would have put after the block is appended
+    to the document, after the closing </html> tag. Set `in_body` to
+    sanitize the block as if it followed other content in the <body>,
+    the body then starts with a `BODY_SENTINEL` <br/> tag.
+    """
+    md = Markdown(extensions=markdown_extensions(extra_extensions))
+    trailing = _TrailingWhitespace(md)
+    md.postprocessors.register(trailing, "trailing_whitespace", 0)
+    raw_html = md.convert(block)
+    if in_body:
+        raw_html = "<br>" + raw_html
+    return clean_raw_html(raw_html, cleaner) + trailing.tail
+
+
+def _split_document(html):
+    """Returns the (head, body, tail) of a sanitized block or None."""
+    prefix = "<html><head>"
+    html, separator, tail = html.rpartition("</body></html>")
+    if not separator or not html.startswith(prefix):
+        return None
+    head, separator, body = html[len(prefix) :].partition("</head><body>")
+    if not separator:
+        return None
+    return head, body, tail
+
+
+class IncrementalRenderer(object):
+    """Renders markdown to sanitized HTML, re-rendering only changed blocks."""
+
+    def __init__(self, cleaner=None, extra_extensions=None, cache=None):
+        self.cleaner = SanitizePolicy() if cleaner is None else cleaner
+        self.extra_extensions = extra_extensions
+        self.cache = RenderCache(LRUBackend(maxsize=4096)) if cache is None else cache
+        self.full_renders = 0
+        self._extensions = markdown_extensions(extra_extensions)
+        self._document_extensions = any(
+            _extension_name(extension) in DOCUMENT_EXTENSIONS
+            for extension in extra_extensions or []
+        )
+
+    def render_full(self, data):
+        """Returns the sanitized HTML of the whole document."""
+        self.full_renders += 1
+        return self.cache.render(data, self.cleaner, self.extra_extensions)
+
+    def render_block(self, block, in_body=False):
+        """Returns the cached (head, body, tail) of a block or None."""
+        kind = "markdown-body-block" if in_body else "markdown-block"
+        key = render_cache_key(block, self.cleaner, [kind] + self._extensions)
+        html = self.cache.get_or_build(
+            key,
+            lambda: render_block(
+                block, self.cleaner, self.extra_extensions, in_body=in_body
+            ),
+        )
+        parts = _split_document(html)
+        if parts is None or not in_body:
+            return parts
+        head, body, tail = parts
+        if head or not body.startswith(BODY_SENTINEL):
+            # the cleaner does not allow <br> tags.
+            return None
+        return head, body[len(BODY_SENTINEL) :], tail
+
+    def render(self, data):
+        """Returns the sanitized HTML of `data`, same as `render_full`."""
+        blocks = None if self._document_extensions else split_blocks(data)
+        if blocks is None:
+            return self.render_full(data)
+
+        head = None
+        body = []
+        separator = ""
+
+        for block in blocks:
+            parts = self.render_block(block, in_body=head is not None)
+            if parts is None:
+                # the parser backend or cleaner can not render by block.
+                return self.render_full(data)
+            block_head, block_body, tail = parts
+            if head is None:
+                if not block_body:
+                    # only <head> tags or extracted tags, the blocks
+                    # after it may also belong in the <head>.
+                    return self.render_full(data)
+                head = block_head
+            body.append(separator + block_body)
+            separator = "\n" + tail
+
+        return "<html><head>{}</head><body>{}</body></html>".format(
+            head or "", "".join(body)
+        )
@@ -1,28 +1,32 @@
-import dkim
-
-import smtplib
-
 from email.mime.multipart import MIMEMultipart
 
 from email.mime.text import MIMEText
 
 from datetime import datetime
 
-# catch socket errors when postfix isn't running...
-from socket import error as socket_error
+from .smtp_pool import default_pool
 
 
-def send_email(
+def message_bytes(msg):
+    try:
+        # Python 3 libraries expect bytes.
+        return msg.as_bytes()
+    except:
+        # Python 2 libraries expect strings.
+        return msg.as_string()
+
+
+def build_message_data(
     to_email,
     sender_email,
     subject,
     message_text,
     message_html,
-    relay="localhost",
     dkim_private_key_path="",
     dkim_selector="",
     dkim_signature_algorithm="ed25519-sha256",
 ):
+    """Returns a (message, message bytes) pair, see `build_message`."""
 
     # the `email` library assumes it is working with string objects.
     # the `dkim` library assumes it is working with byte objects.
@@ -44,48 +48,94 @@ def send_email(
     msg["From"] = sender_email
     msg["Subject"] = subject
 
-    try:
-        # Python 3 libraries expect bytes.
-        msg_data = msg.as_bytes()
-    except:
-        # Python 2 libraries expect strings.
-        msg_data = msg.as_string()
+    msg_data = message_bytes(msg)
 
     if dkim_private_key_path and dkim_selector:
-        # the dkim library uses regex on byte strings so everything
-        # needs to be encoded from strings to bytes.
-        with open(dkim_private_key_path) as fh:
-            dkim_private_key = fh.read()
-        headers = [b"To", b"From", b"Subject"]
-        sig = dkim.sign(
-            message=msg_data,
-            selector=str(dkim_selector).encode(),
-            domain=sender_domain.encode(),
-            privkey=dkim_private_key.encode(),
-            include_headers=headers,
-            signature_algorithm=dkim_signature_algorithm.encode(),
+        # importing dkim is slow, only unsigned mail is sent without it.
+        from .dkim_signer import get_signer
+
+        # the signer caches the parsed key and the dkim library works
+        # with bytes, so sign the serialized message and prepend the
+        # signature instead of serializing the message again.
+        signer = get_signer(
+            dkim_private_key_path,
+            dkim_selector,
+            sender_domain,
+            dkim_signature_algorithm,
         )
-        # add the dkim signature to the email message headers.
-        # decode the signature back to string_type because later on
-        # the call to msg.as_string() performs it's own bytes encoding...
-        msg["DKIM-Signature"] = sig[len("DKIM-Signature: ") :].decode()
-
-        try:
-            # Python 3 libraries expect bytes.
-            msg_data = msg.as_bytes()
-        except:
-            # Python 2 libraries expect strings.
-            msg_data = msg.as_string()
-
-    # TODO: react if connecting to relay (localhost postfix) is a socket error.
-    s = smtplib.SMTP(relay)
-    s.sendmail(sender_email, [to_email], msg_data)
-    s.quit()
+        sig = signer.sign(msg_data, linesep=b"\n")
+        msg_data = sig + msg_data
+        # keep the returned message object signed too.
+        msg["DKIM-Signature"] = sig[len("DKIM-Signature: ") :].decode().rstrip()
+
+    return msg, msg_data
+
+
+def build_message(
+    to_email,
+    sender_email,
+    subject,
+    message_text,
+    message_html,
+    dkim_private_key_path="",
+    dkim_selector="",
+    dkim_signature_algorithm="ed25519-sha256",
+):
+    """Returns a multipart email message, DKIM signed if a key is given."""
+    msg, msg_data = build_message_data(
+        to_email,
+        sender_email,
+        subject,
+        message_text,
+        message_html,
+        dkim_private_key_path,
+        dkim_selector,
+        dkim_signature_algorithm,
+    )
+    return msg
+
+
+def send_email(
+    to_email,
+    sender_email,
+    subject,
+    message_text,
+    message_html,
+    relay="localhost",
+    dkim_private_key_path="",
+    dkim_selector="",
+    dkim_signature_algorithm="ed25519-sha256",
+    pool=None,
+):
+    """
+    Build and send an email over a pooled connection to `relay`.
+
+    Raises `smtplib.SMTPException` or `socket.error` if the relay can not
+    be reached or refuses the message.
+    """
+    msg, msg_data = build_message_data(
+        to_email,
+        sender_email,
+        subject,
+        message_text,
+        message_html,
+        dkim_private_key_path,
+        dkim_selector,
+        dkim_signature_algorithm,
+    )
+    if pool is None:
+        pool = default_pool
+    pool.sendmail(relay, sender_email, [to_email], msg_data)
     return msg
 
 
 def send_pyramid_email(request, to_email, subject, message_text, message_html):
-    """Thin wrapper around `send_email` to customise settings using request object."""
+    """
+    Thin wrapper around `send_email` to customise settings using request object.
+
+    If the app has a `mail_queue.MailQueue` under "email.queue" the message
+    is queued for background delivery instead of sent right away.
+    """
     default_sender = "no-reply@{}".format(request.domain)
     sender_email = request.app.get("email.sender", default_sender)
     minute = datetime.now().strftime("%M")
@@ -95,9 +145,13 @@ def send_pyramid_email(request, to_email, subject, message_text, message_html):
     relay = request.app.get("email.relay", "localhost")
     dkim_private_key_path = request.app.get("email.dkim_private_key_path", "")
     dkim_selector = request.app.get("email.dkim_selector", "")
-    dkim_signature_algorithm = request.app.get("email.dkim_signature_algorithm", "ed25519-sha256")
+    dkim_signature_algorithm = request.app.get(
+        "email.dkim_signature_algorithm", "ed25519-sha256"
+    )
 
-    send_email(
+    queue = request.app.get("email.queue")
+    send = send_email if queue is None else queue.send_email
+    send(
         to_email,
         sender_email,
         subject,
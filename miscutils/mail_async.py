@@ -0,0 +1,380 @@
+"""
+asyncio versions of `mail.send_email` and `bulk_mail.send_bulk_email`.
+
+Messages are built and signed by the same code as the blocking functions
+and sent by a small native asyncio SMTP client, so a coroutine never ties
+up a thread waiting on the relay:
+
+    msg = await send_email_async(to_email, sender_email, subject, text, html)
+    results = await send_bulk_email_async(recipients, sender_email, ...)
+
+The client speaks plain SMTP, EHLO, MAIL, RCPT and DATA, the same subset
+`mail.send_email` uses, and raises the `smtplib` exceptions. Connections
+are pooled per relay and event loop, with at most `size` open at once.
+"""
+
+import re
+
+import time
+
+import asyncio
+
+import smtplib
+
+import weakref
+
+from collections import defaultdict, deque
+
+from contextlib import asynccontextmanager
+
+from .bulk_mail import MessageTemplate
+
+from .mail import build_message_data
+
+from .smtp_pool import REFUSED_ERRORS
+
+import logging
+
+log = logging.getLogger(__name__)
+
+CRLF = b"\r\n"
+
+_EOL_RE = re.compile(rb"(?:\r\n|\n|\r(?!\n))")
+
+_DOT_RE = re.compile(rb"(?m)^\.")
+
+
+def split_relay(relay, default_port=smtplib.SMTP_PORT):
+    """Returns the (host, port) of a "host" or "host:port" relay string."""
+    host, sep, port = relay.rpartition(":")
+    if sep and port.isdigit():
+        return host, int(port)
+    return relay, default_port
+
+
+class AsyncSMTP(object):
+    """A minimal asyncio SMTP client, see `smtplib.SMTP`."""
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, relay):
+        host, port = split_relay(relay)
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), self.timeout
+        )
+        code, message = await self.getreply()
+        if code != 220:
+            self.close()
+            raise smtplib.SMTPConnectError(code, message)
+        return code, message
+
+    async def getreply(self):
+        """Returns the (code, message) reply, joining multi-line replies."""
+        lines = []
+        while True:
+            try:
+                line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            except asyncio.TimeoutError:
+                self.close()
+                raise smtplib.SMTPServerDisconnected("Timed out reading reply")
+            if not line:
+                self.close()
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            lines.append(line[4:].rstrip(b"\r\n"))
+            if line[3:4] != b"-":
+                break
+        try:
+            code = int(line[:3])
+        except ValueError:
+            code = -1
+        return code, b"\n".join(lines)
+
+    async def command(self, line):
+        """Send one command line and return its (code, message) reply."""
+        if self.writer is None:
+            raise smtplib.SMTPServerDisconnected("please run connect() first")
+        self.writer.write(line.encode("ascii") + CRLF)
+        return await self.getreply()
+
+    async def ehlo_or_helo(self):
+        code, message = await self.command("EHLO localhost")
+        if code != 250:
+            code, message = await self.command("HELO localhost")
+            if code != 250:
+                raise smtplib.SMTPHeloError(code, message)
+        return code, message
+
+    async def noop(self):
+        return await self.command("NOOP")
+
+    async def rset(self):
+        return await self.command("RSET")
+
+    async def sendmail(self, from_addr, to_addrs, msg):
+        """
+        Same as `smtplib.SMTP.sendmail`, `msg` must be bytes.
+
+        Returns a dict of the refused recipients.
+        """
+        code, message = await self.command("MAIL FROM:<{}>".format(from_addr))
+        if code != 250:
+            await self.rset()
+            raise smtplib.SMTPSenderRefused(code, message, from_addr)
+        refused = {}
+        for to_addr in to_addrs:
+            code, message = await self.command("RCPT TO:<{}>".format(to_addr))
+            if code not in (250, 251):
+                refused[to_addr] = (code, message)
+        if len(refused) == len(to_addrs):
+            await self.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        code, message = await self.command("DATA")
+        if code != 354:
+            await self.rset()
+            raise smtplib.SMTPDataError(code, message)
+        data = _DOT_RE.sub(b"..", _EOL_RE.sub(CRLF, msg))
+        if not data.endswith(CRLF):
+            data += CRLF
+        self.writer.write(data + b"." + CRLF)
+        code, message = await self.getreply()
+        if code != 250:
+            await self.rset()
+            raise smtplib.SMTPDataError(code, message)
+        return refused
+
+    async def quit(self):
+        try:
+            return await self.command("QUIT")
+        finally:
+            self.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class AsyncSMTPPool(object):
+    """An asyncio pool of SMTP connections, see `smtp_pool.SMTPPool`."""
+
+    def __init__(self, size=4, idle_timeout=60.0, check_interval=5.0, timeout=30.0):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.opened = 0
+        self.reused = 0
+        self.reconnects = 0
+        # relay to deque of (connection, last used time) pairs.
+        self._idle = defaultdict(deque)
+        self._slots = {}
+
+    def _slot(self, relay):
+        slot = self._slots.get(relay)
+        if slot is None:
+            slot = self._slots[relay] = asyncio.BoundedSemaphore(self.size)
+        return slot
+
+    async def _connect(self, relay):
+        connection = AsyncSMTP(timeout=self.timeout)
+        await connection.connect(relay)
+        await connection.ehlo_or_helo()
+        self.opened += 1
+        return connection
+
+    async def _close(self, connection):
+        try:
+            await connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    async def _healthy(self, connection):
+        try:
+            return (await connection.noop())[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    async def _checkout(self, relay):
+        """Returns a (connection, reused) pair for `relay`."""
+        idle_connections = self._idle[relay]
+        while idle_connections:
+            connection, last_used = idle_connections.pop()
+            idle = time.monotonic() - last_used
+            if idle > self.idle_timeout:
+                await self._close(connection)
+                continue
+            if idle > self.check_interval and not await self._healthy(connection):
+                connection.close()
+                continue
+            self.reused += 1
+            return connection, True
+        return await self._connect(relay), False
+
+    def _checkin(self, relay, connection):
+        self._idle[relay].append((connection, time.monotonic()))
+
+    @asynccontextmanager
+    async def _connection(self, relay):
+        async with self._slot(relay):
+            connection, reused = await self._checkout(relay)
+            try:
+                yield connection, reused
+            except REFUSED_ERRORS:
+                # `AsyncSMTP.sendmail` already sent RSET.
+                self._checkin(relay, connection)
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            else:
+                self._checkin(relay, connection)
+
+    @asynccontextmanager
+    async def connection(self, relay):
+        """Async context manager which checks out a connection to `relay`."""
+        async with self._connection(relay) as (connection, reused):
+            yield connection
+
+    async def sendmail(self, relay, from_addr, to_addrs, msg):
+        """
+        Send `msg` over a pooled connection, same as `SMTP.sendmail`.
+
+        Raises `smtplib.SMTPException` or `OSError` if the relay can not
+        be reached or refuses the message.
+        """
+        while True:
+            reused = False
+            try:
+                async with self._connection(relay) as (connection, reused):
+                    return await connection.sendmail(from_addr, to_addrs, msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                if not reused:
+                    raise
+                # the relay closed the idle connection, use another one.
+                log.info("Reconnecting to %s", relay)
+                self.reconnects += 1
+
+    async def close(self):
+        """Close every idle connection."""
+        idle = [connection for pairs in self._idle.values() for connection, _ in pairs]
+        self._idle.clear()
+        for connection in idle:
+            await self._close(connection)
+
+    def stats(self):
+        """Returns a dict of connection counters."""
+        return {
+            "opened": self.opened,
+            "reused": self.reused,
+            "reconnects": self.reconnects,
+            "idle": sum(len(pairs) for pairs in self._idle.values()),
+        }
+
+
+# connections belong to an event loop, so each loop has its own pool.
+_default_pools = weakref.WeakKeyDictionary()
+
+
+def get_default_pool():
+    """Returns the shared `AsyncSMTPPool` of the running event loop."""
+    loop = asyncio.get_running_loop()
+    pool = _default_pools.get(loop)
+    if pool is None:
+        pool = _default_pools[loop] = AsyncSMTPPool()
+    return pool
+
+
+async def send_email_async(
+    to_email,
+    sender_email,
+    subject,
+    message_text,
+    message_html,
+    relay="localhost",
+    dkim_private_key_path="",
+    dkim_selector="",
+    dkim_signature_algorithm="ed25519-sha256",
+    pool=None,
+):
+    """
+    Build and send an email over a pooled connection to `relay`.
+
+    Same as `mail.send_email`, raises `smtplib.SMTPException` or
+    `socket.error` if the relay can not be reached or refuses the message.
+    """
+    msg, msg_data = build_message_data(
+        to_email,
+        sender_email,
+        subject,
+        message_text,
+        message_html,
+        dkim_private_key_path,
+        dkim_selector,
+        dkim_signature_algorithm,
+    )
+    if pool is None:
+        pool = get_default_pool()
+    await pool.sendmail(relay, sender_email, [to_email], msg_data)
+    return msg
+
+
+async def _deliver(pool, relay, sender_email, envelopes, results):
+    """Send envelopes from the shared iterator until it runs out."""
+    for to_emails, msg_data in envelopes:
+        try:
+            refused = await pool.sendmail(relay, sender_email, to_emails, msg_data)
+        except smtplib.SMTPRecipientsRefused as e:
+            refused = e.recipients
+        except (smtplib.SMTPException, OSError) as e:
+            results.update(dict.fromkeys(to_emails, e))
+            continue
+        for to_email in to_emails:
+            refusal = refused.get(to_email)
+            if refusal is not None:
+                refusal = smtplib.SMTPRecipientsRefused({to_email: refusal})
+            results[to_email] = refusal
+
+
+async def send_bulk_email_async(
+    recipients,
+    sender_email,
+    subject,
+    message_text,
+    message_html,
+    relay="localhost",
+    dkim_private_key_path="",
+    dkim_selector="",
+    dkim_signature_algorithm="ed25519-sha256",
+    envelope_size=1,
+    pool=None,
+):
+    """
+    Send the same email to every recipient, see `bulk_mail.send_bulk_email`.
+
+    Up to the pool `size` connections to `relay` send at once. Returns a
+    dict of each recipient address to None if the relay accepted it, or
+    the `smtplib.SMTPException` or `socket.error` it failed with.
+    """
+    template = MessageTemplate(
+        sender_email,
+        subject,
+        message_text,
+        message_html,
+        dkim_private_key_path,
+        dkim_selector,
+        dkim_signature_algorithm,
+    )
+    if pool is None:
+        pool = get_default_pool()
+    envelopes = template.envelopes(recipients, envelope_size)
+    results = {}
+    await asyncio.gather(
+        *(
+            _deliver(pool, relay, sender_email, envelopes, results)
+            for i in range(pool.size)
+        )
+    )
+    return results
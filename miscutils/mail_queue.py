@@ -0,0 +1,417 @@
+"""
+Outbound mail queue, delivered in the background by worker threads.
+
+Enqueueing a message only builds it, so request handlers never wait on
+the relay and a relay that is down does not raise in the handler:
+
+    queue = MailQueue(spool_dir="/var/spool/myapp-mail").start()
+    queue.send_email(to_email, sender_email, subject, text, html)
+    ...
+    queue.stop()
+
+Workers take up to `batch_size` messages for one relay at a time and send
+them over a single pooled connection. Temporary failures are retried with
+exponential backoff, permanent (5xx) failures and messages out of
+attempts are dropped and logged.
+
+With a `spool_dir` each message is also written to disk, maildir style,
+until it is delivered, and messages left over from a previous process are
+queued again on start up.
+"""
+
+import os
+
+import json
+
+import time
+
+import uuid
+
+import heapq
+
+import smtplib
+
+import tempfile
+
+import threading
+
+from collections import OrderedDict, deque
+
+from .mail import build_message_data
+
+from .smtp_pool import DISCONNECT_ERRORS, default_pool
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class QueuedMessage(object):
+    """A message and its envelope waiting for delivery."""
+
+    __slots__ = (
+        "id",
+        "relay",
+        "sender",
+        "recipients",
+        "data",
+        "enqueued_at",
+        "attempts",
+    )
+
+    def __init__(self, relay, sender, recipients, data, id=None, enqueued_at=None):
+        self.id = id or uuid.uuid4().hex
+        self.relay = relay
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.data = data
+        self.enqueued_at = time.time() if enqueued_at is None else enqueued_at
+        self.attempts = 0
+
+
+def _permanent(error):
+    """Returns True if retrying `error` can not succeed."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(code >= 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+def _session_closed(error):
+    """Returns True if the relay closed the session with 421."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code == 421 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421
+    return False
+
+
+class MailQueue(object):
+    """A thread safe mail queue with background delivery."""
+
+    def __init__(
+        self,
+        pool=None,
+        workers=2,
+        batch_size=20,
+        max_attempts=8,
+        backoff=2.0,
+        max_backoff=600.0,
+        spool_dir=None,
+    ):
+        self.pool = default_pool if pool is None else pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.spool_dir = spool_dir
+
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+        # relay to deque of messages ready for delivery.
+        self._ready = OrderedDict()
+        # heap of (next attempt time, sequence, message) waiting to retry.
+        self._delayed = []
+        self._sequence = 0
+        self._in_flight = 0
+        self._threads = []
+        self._stopping = False
+        self._condition = threading.Condition()
+
+        if spool_dir is not None:
+            for name in ("tmp", "new", "failed"):
+                path = os.path.join(spool_dir, name)
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+            self._load_spool()
+
+    # spool.
+
+    def _spool_path(self, message, name="new"):
+        return os.path.join(self.spool_dir, name, message.id)
+
+    def _spool(self, message):
+        envelope = {
+            "relay": message.relay,
+            "sender": message.sender,
+            "recipients": message.recipients,
+            "enqueued_at": message.enqueued_at,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.spool_dir, "tmp"))
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(json.dumps(envelope).encode("utf-8") + b"\n")
+            fh.write(message.data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.rename(tmp_path, self._spool_path(message))
+
+    def _unspool(self, message, failed=False):
+        if self.spool_dir is None:
+            return
+        try:
+            if failed:
+                os.rename(
+                    self._spool_path(message), self._spool_path(message, "failed")
+                )
+            else:
+                os.unlink(self._spool_path(message))
+        except OSError:
+            log.exception("Could not remove %s from the mail spool", message.id)
+
+    def _load_spool(self):
+        directory = os.path.join(self.spool_dir, "new")
+        for name in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, name), "rb") as fh:
+                envelope = json.loads(fh.readline().decode("utf-8"))
+                data = fh.read()
+            message = QueuedMessage(
+                envelope["relay"],
+                envelope["sender"],
+                envelope["recipients"],
+                data,
+                id=name,
+                enqueued_at=envelope["enqueued_at"],
+            )
+            self._ready.setdefault(message.relay, deque()).append(message)
+
+    # enqueue.
+
+    def put(self, relay, sender, recipients, data):
+        """Queue the message bytes `data` for delivery, returns its id."""
+        message = QueuedMessage(relay, sender, recipients, data)
+        if self.spool_dir is not None:
+            self._spool(message)
+        with self._condition:
+            self._ready.setdefault(relay, deque()).append(message)
+            self._condition.notify()
+        return message.id
+
+    def send_email(
+        self,
+        to_email,
+        sender_email,
+        subject,
+        message_text,
+        message_html,
+        relay="localhost",
+        dkim_private_key_path="",
+        dkim_selector="",
+        dkim_signature_algorithm="ed25519-sha256",
+    ):
+        """Same as `mail.send_email` but returns once the message is queued."""
+        msg, msg_data = build_message_data(
+            to_email,
+            sender_email,
+            subject,
+            message_text,
+            message_html,
+            dkim_private_key_path,
+            dkim_selector,
+            dkim_signature_algorithm,
+        )
+        self.put(relay, sender_email, [to_email], msg_data)
+        return msg
+
+    # delivery.
+
+    def _next_batch(self):
+        """Returns (relay, messages) ready for delivery, or None to stop."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, message = heapq.heappop(self._delayed)
+                    self._ready.setdefault(message.relay, deque()).append(message)
+
+                for relay, messages in self._ready.items():
+                    if messages:
+                        break
+                else:
+                    relay = None
+
+                if relay is not None:
+                    # round robin between relays.
+                    self._ready.move_to_end(relay)
+                    batch = deque()
+                    while messages and len(batch) < self.batch_size:
+                        batch.append(messages.popleft())
+                    self._in_flight += len(batch)
+                    return relay, batch
+
+                if self._stopping:
+                    return None
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._condition.wait(timeout)
+
+    def _delivered(self, message):
+        latency = time.time() - message.enqueued_at
+        self._unspool(message)
+        with self._condition:
+            self._in_flight -= 1
+            self.sent += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self._condition.notify_all()
+
+    def _failed(self, message, error):
+        message.attempts += 1
+        if _permanent(error) or message.attempts >= self.max_attempts:
+            log.error(
+                "Dropping mail %s to %s after %s attempts: %r",
+                message.id,
+                message.recipients,
+                message.attempts,
+                error,
+            )
+            self._unspool(message, failed=True)
+            with self._condition:
+                self._in_flight -= 1
+                self.failed += 1
+                self._condition.notify_all()
+            return
+
+        delay = min(self.max_backoff, self.backoff * 2 ** (message.attempts - 1))
+        log.warning(
+            "Retrying mail %s to %s in %.1fs: %r",
+            message.id,
+            message.recipients,
+            delay,
+            error,
+        )
+        self._requeue(message, delay)
+
+    def _requeue(self, message, delay=0):
+        with self._condition:
+            self._in_flight -= 1
+            if delay:
+                self.retries += 1
+                self._sequence += 1
+                heapq.heappush(
+                    self._delayed, (time.monotonic() + delay, self._sequence, message)
+                )
+            else:
+                self._ready.setdefault(message.relay, deque()).appendleft(message)
+            self._condition.notify_all()
+
+    def _deliver(self, relay, batch):
+        """Send a batch of messages over one connection to `relay`."""
+        fresh = False
+        while batch:
+            reused = used = False
+            try:
+                with self.pool.checkout(relay, fresh=fresh) as (connection, reused):
+                    while batch:
+                        message = batch[0]
+                        try:
+                            refused = connection.sendmail(
+                                message.sender, message.recipients, message.data
+                            )
+                        except (
+                            smtplib.SMTPResponseException,
+                            smtplib.SMTPRecipientsRefused,
+                        ) as e:
+                            if _session_closed(e):
+                                raise
+                            # the relay refused this message, not the session,
+                            # smtplib already sent RSET.
+                            used = True
+                            batch.popleft()
+                            self._failed(message, e)
+                            continue
+                        used = True
+                        batch.popleft()
+                        if refused:
+                            log.error("Mail %s refused for %r", message.id, refused)
+                        self._delivered(message)
+            except (smtplib.SMTPException, OSError) as e:
+                if (
+                    reused
+                    and not used
+                    and (isinstance(e, DISCONNECT_ERRORS) or _session_closed(e))
+                ):
+                    # the relay dropped or closed the idle connection, the message was
+                    # never at fault, resend without counting an attempt.
+                    fresh = True
+                    continue
+                # the session failed, retry the rest of the batch.
+                self._failed(batch.popleft(), e)
+                for message in batch:
+                    self._requeue(message)
+                batch.clear()
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._deliver(*batch)
+            except Exception:
+                log.exception("Mail queue worker error")
+
+    def start(self):
+        """Start the worker threads, returns the queue."""
+        with self._condition:
+            self._stopping = False
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name="mail-queue-{}".format(i), daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def join(self, timeout=None):
+        """Wait until every message is delivered or dropped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self.depth() or self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker threads once the ready messages are delivered.
+
+        Messages waiting to be retried stay in the spool, if there is one.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # metrics.
+
+    def depth(self):
+        """Returns the number of messages waiting for delivery."""
+        with self._condition:
+            ready = sum(len(messages) for messages in self._ready.values())
+            return ready + len(self._delayed)
+
+    def stats(self):
+        """Returns a dict of queue depth, delivery and latency metrics."""
+        with self._condition:
+            return {
+                "depth": self.depth(),
+                "in_flight": self._in_flight,
+                "delayed": len(self._delayed),
+                "sent": self.sent,
+                "failed": self.failed,
+                "retries": self.retries,
+                "latency_avg": self.latency_total / self.sent if self.sent else 0.0,
+                "latency_max": self.latency_max,
+            }
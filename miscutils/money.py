@@ -0,0 +1,196 @@
+"""
+Exact money conversions between dollars and integer cents.
+
+    dollars_to_cents("0.29")  # 29, not 28
+    cents = dollars_to_cents_many(amounts)
+    dollars_to_cents_csv(src, dst, columns=["amount"])
+
+Dollar strings are parsed straight to integer cents, floats by their
+shortest repr, like "1.15", and Decimals exactly, never through float
+arithmetic. Sub cent digits are dropped, rounding toward zero like
+`int` did before, unless another `decimal` rounding mode is given.
+"""
+
+import csv
+
+import sys
+
+from decimal import ROUND_DOWN, Decimal, InvalidOperation
+
+# above this a float is not precise to the cent, so is converted alone.
+_MAX_EXACT_FLOAT = 1e13
+
+
+def _numpy(values):
+    """
+    Returns numpy if `values` is a NumPy array, otherwise None. An array
+    means numpy was already imported, so lists never pay for importing it.
+    """
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(values, np.ndarray):
+        return np
+    return None
+
+
+def _decimal_to_cents(value, rounding):
+    if not value.is_finite():
+        raise ValueError("cannot convert {} to cents".format(value))
+    return int((value * 100).to_integral_value(rounding=rounding))
+
+
+def _str_to_cents(text, rounding):
+    whole, cents = text[:-3], text[-2:]
+    if whole[:1] in ("-", "+"):
+        whole = whole[1:]
+    if text[-3:-2] == "." and whole.isdecimal() and cents.isdecimal():
+        # "12.34" is the common case, its digits are the cents.
+        return int(text[:-3] + cents)
+    text = text.strip()
+    digits = text
+    if digits[:1] in ("-", "+"):
+        digits = digits[1:]
+    whole, dot, fraction = digits.partition(".")
+    if (
+        (whole or fraction)
+        and (whole.isdecimal() or not whole)
+        and (fraction.isdecimal() or not fraction)
+        and (rounding == ROUND_DOWN or not fraction[2:].strip("0"))
+    ):
+        # plain digits are parsed without Decimal.
+        cents = int(whole or "0") * 100 + int((fraction + "00")[:2])
+        return -cents if text[0] == "-" else cents
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        raise ValueError("invalid dollar amount: {!r}".format(text))
+    return _decimal_to_cents(value, rounding)
+
+
+def dollars_to_cents(dollars, rounding=ROUND_DOWN):
+    """
+    Returns the exact integer cents of a dollar str, int, float or Decimal.
+
+    `rounding` is a `decimal` rounding mode for sub cent digits.
+    """
+    if type(dollars) is str:
+        return _str_to_cents(dollars, rounding)
+    if isinstance(dollars, int):
+        return dollars * 100
+    if isinstance(dollars, Decimal):
+        return _decimal_to_cents(dollars, rounding)
+    if isinstance(dollars, float):
+        # repr is the shortest string which reads back as the same float.
+        return _str_to_cents(repr(dollars), rounding)
+    return _str_to_cents(str(dollars), rounding)
+
+
+def cents_to_decimal(cents):
+    """Returns the exact Decimal dollars of integer cents."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_cents(cents):
+    """Returns integer cents as an exact dollar string, like "-3.42"."""
+    cents = int(cents)
+    sign = "-" if cents < 0 else ""
+    dollars, cents = divmod(abs(cents), 100)
+    return "{}{}.{:02d}".format(sign, dollars, cents)
+
+
+def _float_array_to_cents(np, values, rounding):
+    cents = np.round(values * 100.0)
+    # a float which is the nearest float to a whole number of cents has
+    # that number as its repr, the rest are converted one at a time.
+    with np.errstate(invalid="ignore", over="ignore"):
+        exact = (np.abs(values) < _MAX_EXACT_FLOAT) & (cents / 100.0 == values)
+    cents = np.where(exact, cents, 0).astype(np.int64)
+    for i in np.flatnonzero(~exact).tolist():
+        cents[i] = dollars_to_cents(float(values[i]), rounding)
+    return cents
+
+
+def dollars_to_cents_many(values, rounding=ROUND_DOWN):
+    """
+    Returns `dollars_to_cents` of each value.
+
+    A NumPy array gives an int64 array, integer and float arrays are
+    converted as arrays. Anything else gives a list.
+    """
+    np = _numpy(values)
+    if np is not None:
+        if values.dtype.kind in "iu":
+            return values.astype(np.int64) * 100
+        if values.dtype.kind == "f":
+            return _float_array_to_cents(np, values, rounding)
+        return np.array(
+            dollars_to_cents_many(values.tolist(), rounding), dtype=np.int64
+        )
+    if rounding == ROUND_DOWN:
+        parse = _str_to_cents
+        return [
+            parse(value, rounding) if type(value) is str else dollars_to_cents(value)
+            for value in values
+        ]
+    return [dollars_to_cents(value, rounding) for value in values]
+
+
+def cents_to_dollars_many(values):
+    """
+    Returns the float dollars of each integer cents, like
+    `miscutils.cents_to_dollars`, an array for a NumPy array.
+    """
+    np = _numpy(values)
+    if np is not None:
+        return values.astype(np.int64) / 100.0
+    return [int(cents) / 100.0 for cents in values]
+
+
+def format_cents_many(values):
+    """Returns `format_cents` of each integer cents, as a list."""
+    if _numpy(values) is not None:
+        values = values.tolist()
+    return [format_cents(cents) for cents in values]
+
+
+def _convert_csv(src, dst, columns, convert, header, csv_kwargs):
+    reader = csv.reader(src, **csv_kwargs)
+    writer = csv.writer(dst, **csv_kwargs)
+    columns = list(columns)
+    if header is None:
+        header = any(isinstance(column, str) for column in columns)
+    if header:
+        names = next(reader)
+        writer.writerow(names)
+        columns = [c if isinstance(c, int) else names.index(c) for c in columns]
+    count = 0
+    for row in reader:
+        for column in columns:
+            # empty and missing cells are left as they are.
+            if column < len(row) and row[column].strip():
+                row[column] = convert(row[column])
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def dollars_to_cents_csv(
+    src, dst, columns, rounding=ROUND_DOWN, header=None, **csv_kwargs
+):
+    """
+    Copy a CSV file from `src` to `dst`, converting dollars to cents.
+
+    `columns` are column indexes, or header names when the first row is a
+    header, `header` defaults to whether any column is a name. The rows are
+    streamed, returns how many were copied. The csv keyword arguments are
+    passed to `csv.reader` and `csv.writer`.
+    """
+
+    def convert(value):
+        return str(_str_to_cents(value, rounding))
+
+    return _convert_csv(src, dst, columns, convert, header, csv_kwargs)
+
+
+def cents_to_dollars_csv(src, dst, columns, header=None, **csv_kwargs):
+    """Copy a CSV file from `src` to `dst`, formatting cents as dollars."""
+    return _convert_csv(src, dst, columns, format_cents, header, csv_kwargs)
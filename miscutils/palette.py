@@ -0,0 +1,208 @@
+"""
+Vectorized `hex_color` operations over whole palettes.
+
+    hover = color_scale_many(palette, 1.2)
+    borders = darken_many(palette, 0.1)
+    ratios = contrast_ratio_many(palette, "#ffffff")
+
+Colors are parsed, transformed, clamped and formatted as NumPy arrays
+when NumPy is installed, otherwise each color goes through the matching
+`hex_color` function. Both give exactly the same results. Arguments other
+than the palette may be a single value or one value per color.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .hex_color import (
+    _LINEAR,
+    color_scale,
+    contrast_ratio,
+    darken,
+    lighten,
+    mix,
+    relative_luminance,
+)
+
+if np is not None:
+    # hex digit value of each ascii byte, -1 for a non hex digit.
+    _HEX_VALUES = np.full(256, -1, dtype=np.int16)
+    for _i, _c in enumerate(b"0123456789abcdef"):
+        _HEX_VALUES[_c] = _i
+        _HEX_VALUES[ord(chr(_c).upper())] = _i
+    _LINEAR_ARRAY = np.array(_LINEAR)
+
+
+def _broadcast(value, count):
+    """Returns a list of `count` values, repeating a single value."""
+    if isinstance(value, (str, bytes)) or not hasattr(value, "__len__"):
+        return [value] * count
+    if len(value) != count:
+        raise ValueError("expected {} values, got {}".format(count, len(value)))
+    return list(value)
+
+
+def _parse_hex_array(hex_strs):
+    """Returns an (n, 3) int array of "#rrggbb" hex strings."""
+    stripped = [hex_str.strip("#") for hex_str in hex_strs]
+    for hex_str in stripped:
+        if len(hex_str) != 6:
+            raise ValueError("expected a #rrggbb hex color: {!r}".format(hex_str))
+    try:
+        data = "".join(stripped).encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError("expected #rrggbb hex colors")
+    digits = _HEX_VALUES[np.frombuffer(data, dtype=np.uint8)]
+    if (digits < 0).any():
+        raise ValueError("expected #rrggbb hex colors")
+    digits = digits.astype(np.int64).reshape(-1, 3, 2)
+    return digits[:, :, 0] * 16 + digits[:, :, 1]
+
+
+def _format_hex_array(rgb):
+    """Returns "#rrggbb" hex strings of an (n, 3) int array."""
+    packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    return ["#%06x" % value for value in packed.tolist()]
+
+
+def _to_bytes(values):
+    # same rounding as `hex_color._to_byte`.
+    return (values * 255.0 + 0.5).astype(np.int64)
+
+
+def color_scale_many(hex_strs, scale_factor):
+    """
+    Returns `hex_color.color_scale` of each hex string.
+
+    Like `color_scale`, a hex string which is not 6 digits, or a negative
+    scale factor, is returned without its "#".
+    """
+    hex_strs = list(hex_strs)
+    factors = _broadcast(scale_factor, len(hex_strs))
+    if np is None:
+        return [color_scale(c, f) for c, f in zip(hex_strs, factors)]
+
+    results = [hex_str.strip("#") for hex_str in hex_strs]
+    valid = [
+        i for i, hex_str in enumerate(results) if len(hex_str) == 6 and factors[i] >= 0
+    ]
+    if valid:
+        rgb = _parse_hex_array([results[i] for i in valid])
+        scale = np.array([factors[i] for i in valid], dtype=np.float64)[:, None]
+        scaled = np.clip(rgb * scale, 0, 255).astype(np.int64)
+        for i, hex_str in zip(valid, _format_hex_array(scaled)):
+            results[i] = hex_str
+    return results
+
+
+def _rgb_to_hls(rgb):
+    """`colorsys.rgb_to_hls` of an (n, 3) array of 0 to 1 floats."""
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    sumc = maxc + minc
+    rangec = maxc - minc
+    l = sumc / 2.0
+    grey = rangec == 0
+    # avoid dividing by zero for greys, their h and s are 0.
+    rangec = np.where(grey, 1.0, rangec)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(l <= 0.5, rangec / sumc, rangec / (2.0 - maxc - minc))
+    rc = (maxc - r) / rangec
+    gc = (maxc - g) / rangec
+    bc = (maxc - b) / rangec
+    h = np.where(r == maxc, bc - gc, np.where(g == maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = (h / 6.0) % 1.0
+    return np.where(grey, 0.0, h), l, np.where(grey, 0.0, s)
+
+
+def _hls_value(m1, m2, hue):
+    hue = hue % 1.0
+    return np.where(
+        hue < 1.0 / 6.0,
+        m1 + (m2 - m1) * hue * 6.0,
+        np.where(
+            hue < 0.5,
+            m2,
+            np.where(hue < 2.0 / 3.0, m1 + (m2 - m1) * (2.0 / 3.0 - hue) * 6.0, m1),
+        ),
+    )
+
+
+def _hls_to_rgb(h, l, s):
+    """`colorsys.hls_to_rgb`, returns an (n, 3) array of 0 to 1 floats."""
+    m2 = np.where(l <= 0.5, l * (1.0 + s), l + s - (l * s))
+    m1 = 2.0 * l - m2
+    rgb = np.stack(
+        [
+            _hls_value(m1, m2, h + 1.0 / 3.0),
+            _hls_value(m1, m2, h),
+            _hls_value(m1, m2, h - 1.0 / 3.0),
+        ],
+        axis=1,
+    )
+    grey = (s == 0.0)[:, None]
+    return np.where(grey, l[:, None], rgb)
+
+
+def _adjust_lightness_many(hex_strs, amounts):
+    h, l, s = _rgb_to_hls(_parse_hex_array(hex_strs) / 255.0)
+    l = np.clip(l + np.array(amounts, dtype=np.float64), 0.0, 1.0)
+    return _format_hex_array(_to_bytes(_hls_to_rgb(h, l, s)))
+
+
+def lighten_many(hex_strs, amount):
+    """Returns `hex_color.lighten` of each hex string."""
+    hex_strs = list(hex_strs)
+    amounts = _broadcast(amount, len(hex_strs))
+    if np is None:
+        return [lighten(c, a) for c, a in zip(hex_strs, amounts)]
+    return _adjust_lightness_many(hex_strs, amounts)
+
+
+def darken_many(hex_strs, amount):
+    """Returns `hex_color.darken` of each hex string."""
+    hex_strs = list(hex_strs)
+    amounts = _broadcast(amount, len(hex_strs))
+    if np is None:
+        return [darken(c, a) for c, a in zip(hex_strs, amounts)]
+    return _adjust_lightness_many(hex_strs, [-a for a in amounts])
+
+
+def mix_many(hex_strs, others, weight=0.5):
+    """Returns `hex_color.mix` of each hex string with `others`."""
+    hex_strs = list(hex_strs)
+    others = _broadcast(others, len(hex_strs))
+    weights = _broadcast(weight, len(hex_strs))
+    if np is None:
+        return [mix(a, b, w) for a, b, w in zip(hex_strs, others, weights)]
+    weights = np.array(weights, dtype=np.float64)[:, None]
+    mixed = _parse_hex_array(hex_strs) * (1.0 - weights)
+    mixed = mixed + _parse_hex_array(others) * weights
+    return _format_hex_array(_to_bytes(mixed / 255.0))
+
+
+def _relative_luminance(hex_strs):
+    linear = _LINEAR_ARRAY[_parse_hex_array(hex_strs)]
+    return 0.2126 * linear[:, 0] + 0.7152 * linear[:, 1] + 0.0722 * linear[:, 2]
+
+
+def relative_luminance_many(hex_strs):
+    """Returns `hex_color.relative_luminance` of each hex string."""
+    hex_strs = list(hex_strs)
+    if np is None:
+        return [relative_luminance(c) for c in hex_strs]
+    return _relative_luminance(hex_strs).tolist()
+
+
+def contrast_ratio_many(hex_strs, others):
+    """Returns `hex_color.contrast_ratio` of each hex string with `others`."""
+    hex_strs = list(hex_strs)
+    others = _broadcast(others, len(hex_strs))
+    if np is None:
+        return [contrast_ratio(a, b) for a, b in zip(hex_strs, others)]
+    l1 = _relative_luminance(hex_strs)
+    l2 = _relative_luminance(others)
+    return ((np.maximum(l1, l2) + 0.05) / (np.minimum(l1, l2) + 0.05)).tolist()
@@ -0,0 +1,137 @@
+"""
+Content-addressed cache for rendered and sanitized HTML.
+
+Rendering markdown and sanitizing the result is the expensive part of
+displaying user posts, and most posts never change between page views.
+
+    cache = RenderCache(LRUBackend(maxsize=4096))
+    html = cache.render(post.body, cleaner)
+
+Cache keys are a hash of the input text, the markdown extensions and the
+cleaner configuration, so changing the cleaner (tags, attrs, tag_acl,
+whitelist_domains, link_protection, absolute_domain) changes the key and
+stale sanitized output is never served.
+
+A backend is any object with ``get(key)`` and ``set(key, value)`` methods
+where ``get`` returns None on a miss, so memcached or redis clients may be
+wrapped and shared between processes.
+"""
+
+import json
+
+import hashlib
+
+from .cache_backends import DiskBackend, LRUBackend  # noqa: F401
+
+from .sanitize_html import (
+    default_cleaner,
+    markdown_extensions,
+    markdown_to_raw_html,
+    clean_raw_html,
+)
+
+
+def _extension_key(extension):
+    """Returns a json friendly representation of a markdown extension."""
+    if isinstance(extension, str):
+        return extension
+    cls = extension.__class__
+    name = "{}.{}".format(cls.__module__, cls.__name__)
+    configs = getattr(extension, "getConfigs", dict)()
+    return [name, sorted((k, repr(v)) for k, v in configs.items())]
+
+
+def cleaner_config(cleaner):
+    """
+    Returns the cleaner configuration which affects sanitized output.
+
+    Any change to this configuration results in a new cache key.
+    """
+    attributes = cleaner.attributes
+    if hasattr(attributes, "items"):
+        attributes = sorted(
+            (tag_name, sorted(set(attrs))) for tag_name, attrs in attributes.items()
+        )
+    return {
+        "tags": sorted(set(cleaner.tags)),
+        "attrs": attributes,
+        "tag_acl": sorted(
+            (tag_name, [list(rule) for rule in rules])
+            for tag_name, rules in cleaner.tag_acl.items()
+        ),
+        "whitelist_domains": sorted(
+            cleaner.whitelist_domains, key=lambda domain: (domain is not None, domain)
+        ),
+        "link_protection": bool(cleaner.link_protection),
+        "absolute_domain": cleaner.absolute_domain,
+        "parser_backend": getattr(cleaner, "parser_backend", "html5lib"),
+    }
+
+
+def render_cache_key(data, cleaner, extensions=None):
+    """Returns a hex digest key for `data` rendered with the given config."""
+    if extensions is None:
+        extensions = []
+    config = json.dumps(
+        [[_extension_key(e) for e in extensions], cleaner_config(cleaner)],
+        sort_keys=True,
+        default=repr,
+    )
+    digest = hashlib.sha256(config.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(data.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RenderCache(object):
+    """Caches sanitized HTML keyed on content and configuration."""
+
+    def __init__(self, backend=None):
+        self.backend = LRUBackend() if backend is None else backend
+        self.hits = 0
+        self.misses = 0
+        self._default_cleaner = None
+
+    def _cleaner(self, cleaner):
+        if cleaner is not None:
+            return cleaner
+        if self._default_cleaner is None:
+            self._default_cleaner = default_cleaner()
+        return self._default_cleaner
+
+    def get_or_build(self, key, build):
+        """Returns the cached value of `key`, calls `build()` on a miss."""
+        html = self.backend.get(key)
+        if html is not None:
+            self.hits += 1
+            return html
+        self.misses += 1
+        html = build()
+        self.backend.set(key, html)
+        return html
+
+    def render(self, data, cleaner=None, extra_extensions=None):
+        """Returns sanitized HTML for the markdown string `data`."""
+        cleaner = self._cleaner(cleaner)
+        extensions = markdown_extensions(extra_extensions)
+        key = render_cache_key(data, cleaner, ["markdown"] + extensions)
+        return self.get_or_build(
+            key,
+            lambda: clean_raw_html(
+                markdown_to_raw_html(data, extra_extensions), cleaner
+            ),
+        )
+
+    def clean(self, raw_html, cleaner=None):
+        """Returns sanitized HTML for the raw HTML string `raw_html`."""
+        cleaner = self._cleaner(cleaner)
+        key = render_cache_key(raw_html, cleaner, ["html"])
+        return self.get_or_build(key, lambda: clean_raw_html(raw_html, cleaner))
+
+    def stats(self):
+        """Returns a dict of hit, miss and eviction counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": getattr(self.backend, "evictions", 0),
+        }
@@ -0,0 +1,121 @@
+"""
+Batch and parallel sanitization for re-rendering many documents at once.
+
+Sanitization is pure Python CPU work so documents are spread over a pool
+of worker processes:
+
+    for result in render_markdown_many(posts, policy, workers=8):
+        if result.error is None:
+            save(result.index, result.html)
+
+The policy is sent to each worker process once, results are yielded in
+input order and only a bounded number of chunks are in flight, so memory
+stays flat no matter how long the input iterable is.
+"""
+
+import os
+
+from collections import deque, namedtuple
+
+from itertools import islice
+
+from .sanitize_html import SanitizePolicy, clean_raw_html, markdown_to_raw_html
+
+# error is None on success, otherwise a "ExceptionName: message" string.
+BatchResult = namedtuple("BatchResult", ["index", "html", "error"])
+
+# per worker process state, set once by `_init_worker`.
+_worker_state = None
+
+
+def _init_worker(policy, render, extra_extensions):
+    global _worker_state
+    _worker_state = (policy, render, extra_extensions)
+
+
+def _clean_chunk(chunk, state=None):
+    """Sanitize a list of (index, data) pairs, never raises for a document."""
+    policy, render, extra_extensions = _worker_state if state is None else state
+    results = []
+    for index, data in chunk:
+        try:
+            if render:
+                data = markdown_to_raw_html(data, extra_extensions)
+            results.append(BatchResult(index, clean_raw_html(data, policy), None))
+        except Exception as e:
+            error = "{}: {}".format(e.__class__.__name__, e)
+            results.append(BatchResult(index, None, error))
+    return results
+
+
+def _chunks(iterable, chunksize):
+    iterator = enumerate(iterable)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _as_policy(cleaner):
+    if cleaner is None:
+        return SanitizePolicy()
+    if isinstance(cleaner, SanitizePolicy):
+        return cleaner
+    # bleach Cleaner objects can not be pickled, so send a policy instead.
+    return SanitizePolicy.from_cleaner(cleaner)
+
+
+def _run(iterable, cleaner, workers, chunksize, render, extra_extensions):
+    state = (_as_policy(cleaner), render, extra_extensions)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for chunk in _chunks(iterable, chunksize):
+            for result in _clean_chunk(chunk, state):
+                yield result
+        return
+
+    from multiprocessing import Pool
+
+    pool = Pool(workers, initializer=_init_worker, initargs=state)
+    try:
+        # bound the number of chunks in flight to bound memory.
+        max_pending = workers * 2
+        pending = deque()
+        for chunk in _chunks(iterable, chunksize):
+            pending.append(pool.apply_async(_clean_chunk, (chunk,)))
+            if len(pending) >= max_pending:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def clean_many(iterable, cleaner=None, workers=None, chunksize=16):
+    """
+    Sanitize an iterable of raw HTML strings, yields `BatchResult` tuples.
+
+    `workers` defaults to the number of CPUs, use 0 or 1 to sanitize in
+    the calling process.
+    """
+    return _run(iterable, cleaner, workers, chunksize, False, None)
+
+
+def render_markdown_many(
+    iterable, cleaner=None, workers=None, chunksize=16, extra_extensions=None
+):
+    """
+    Render and sanitize an iterable of markdown strings, yields `BatchResult`.
+
+    `workers` defaults to the number of CPUs, use 0 or 1 to render in
+    the calling process.
+    """
+    return _run(iterable, cleaner, workers, chunksize, True, extra_extensions)
@@ -1,23 +1,46 @@
-from markdown import markdown
-
-from functools import partial
+from functools import partial, lru_cache
 
 from collections import defaultdict
 
+from types import MappingProxyType
+
+import threading
+
+from html import unescape
+
 from bleach.sanitizer import Cleaner
 from bleach.linkifier import LinkifyFilter
+from bleach.html5lib_shim import Filter
 from bleach.callbacks import nofollow, target_blank
 
 from bleach_allowlist import markdown_tags, markdown_attrs, all_styles
 
-from bs4 import BeautifulSoup
-
-import miniuri
+from importlib import import_module
 
 import logging
 
 log = logging.getLogger(__name__)
 
+# names this module used to import eagerly, `__getattr__` imports them on
+# first use. markdown, BeautifulSoup and pygments are slow to import.
+_LAZY_IMPORTS = {
+    "markdown": ("markdown", "markdown"),
+    "BeautifulSoup": ("bs4", "BeautifulSoup"),
+    "HTMLTreeBuilder": ("bs4.builder", "HTMLTreeBuilder"),
+    "miniuri": ("miniuri", None),
+    "HighlightCacheExtension": (".highlight_cache", "HighlightCacheExtension"),
+}
+
+
+def __getattr__(name):
+    if name == "MULTI_VALUED_ATTRS":
+        return _multi_valued_attrs()
+    if name in _LAZY_IMPORTS:
+        module_name, attr = _LAZY_IMPORTS[name]
+        module = import_module(module_name, __package__)
+        return module if attr is None else getattr(module, attr)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
 
 def default_tag_acl():
     return defaultdict(list)
@@ -50,10 +73,43 @@ def default_cleaner(tag_acl=None):
     if tag_acl is None:
         tag_acl = {}
 
+    tags, attrs = cleaner_tags_and_attrs(tag_acl)
+
+    cleaner = Cleaner(tags=tags, attributes=attrs)
+
+    # doesn't do anything, but i used to be able to pass it via constructor.
+    # https://github.com/yourcelf/bleach-allowlist/blob/main/bleach_allowlist/bleach_allowlist.py
+    #cleaner.all_styles=all_styles
+
+    # disable link_protection by default.
+    cleaner.link_protection = False
+    # an None signifies a relative URI, which should always be whitelisted.
+    cleaner.whitelist_domains = [None]
+    # absolute domain, used for turning relative paths into absolute.
+    cleaner.absolute_domain = ""
+    # add conditional_whitelist_tags to cleaner object.
+    cleaner.tag_acl = tag_acl
+    # filter tags and links while bleach streams, see `single_pass_cleaner`.
+    cleaner.single_pass = False
+    # log each tag extracted by the tag_acl.
+    cleaner.log_acl = False
+    # BeautifulSoup tree builder, one of PARSER_BACKENDS.
+    cleaner.parser_backend = "html5lib"
+
+    return cleaner
+
+
+def cleaner_tags_and_attrs(tag_acl):
+    """
+    Returns the allowed tags list and attrs dict for the given `tag_acl`.
+
+    The attrs dict is a fresh copy, the module-global `markdown_attrs`
+    from bleach_allowlist is never mutated.
+    """
     maybe_safe_tags = ["pre", "table", "tr", "td"]
 
     tags = maybe_safe_tags + list(tag_acl.keys()) + markdown_tags
-    attrs = markdown_attrs
+    attrs = {tag_name: list(names) for tag_name, names in markdown_attrs.items()}
 
     attrs["img"].append("width")
     attrs["span"] = ["class"]
@@ -78,103 +134,290 @@ def default_cleaner(tag_acl=None):
 
                 # append the attr_name to the map of approved
                 # attributes for the given tag_name.
-                attrs[tag_name].append(attr_name)
+                if attr_name not in attrs[tag_name]:
+                    attrs[tag_name].append(attr_name)
 
-    cleaner = Cleaner(tags=tags, attributes=attrs)
+    return tags, attrs
 
-    # doesn't do anything, but i used to be able to pass it via constructor.
-    # https://github.com/yourcelf/bleach-allowlist/blob/main/bleach_allowlist/bleach_allowlist.py
-    #cleaner.all_styles=all_styles
 
-    # disable link_protection by default.
-    cleaner.link_protection = False
-    # an None signifies a relative URI, which should always be whitelisted.
-    cleaner.whitelist_domains = [None]
-    # absolute domain, used for turning relative paths into absolute.
-    cleaner.absolute_domain = ""
-    # add conditional_whitelist_tags to cleaner object.
-    cleaner.tag_acl = tag_acl
+def compile_tag_acl(tag_acl):
+    """
+    Compiles a `tag_acl` into a lookup index of allowed attribute values.
 
-    return cleaner
+    For example:
 
+      >>> compile_tag_acl({"script": [("type", "math/tex", "allow")]})
+      {'script': {'type': frozenset({'math/tex'})}}
+
+    Only "allow" rules are indexed, a tag in the `tag_acl` is extracted
+    unless one of its attr_name/attr_value pairs is whitelisted.
+    """
+    index = {}
+    for tag_name, rules in tag_acl.items():
+        allowed = {}
+        for attr_name, attr_value, allow_or_deny in rules:
+            if allow_or_deny == "allow":
+                allowed.setdefault(attr_name, set()).add(attr_value)
+        index[tag_name] = {name: frozenset(values) for name, values in allowed.items()}
+    return index
+
+
+@lru_cache(maxsize=None)
+def _multi_valued_attrs():
+    """
+    Returns the attributes BeautifulSoup splits into lists, these never
+    equal an attr_value.
+    """
+    from bs4.builder import HTMLTreeBuilder
+
+    return HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES
+
+
+def tag_acl_allows(allowed, tag_name, attrs):
+    """
+    Returns True if one of the tag's attr_name/attr_value pairs is in the
+    compiled `allowed` index for the tag, see `compile_tag_acl`.
+    """
+    for attr_name, values in allowed.items():
+        value = attrs.get(attr_name)
+        if not isinstance(value, str) or value not in values:
+            continue
+        multi_valued_attrs = _multi_valued_attrs()
+        if attr_name in multi_valued_attrs["*"]:
+            continue
+        if attr_name in multi_valued_attrs.get(tag_name, ()):
+            continue
+        return True
+    return False
+
+
+# BeautifulSoup tree builders a cleaner may use to filter tags and links.
+# html5lib is the default, lxml and html.parser are much faster, see
+# test_sanitize_parsers.py for the XSS corpus each backend must pass.
+PARSER_BACKENDS = ("html5lib", "lxml", "html.parser")
+
+
+# a single shared filter so cleaners can tell if linkify was already added.
+linkify_filter = partial(
+    LinkifyFilter,
+    callbacks=[nofollow, target_blank],
+    skip_tags=["pre", "code"],
+)
+
+
+class SanitizePolicy(object):
+    """
+    A compiled, immutable sanitizer policy.
+
+    Build a policy once at startup and share it across threads and requests,
+    it may be passed anywhere a cleaner from `default_cleaner` is accepted:
+
+      policy = SanitizePolicy(tag_acl, link_protection=True)
+      html = clean_raw_html(raw_html, policy)
+
+    All lookup tables are computed up front so hot path calls do no setup
+    work. bleach Cleaner objects are not thread safe so each thread lazily
+    builds its own from the frozen configuration.
+    """
+
+    __slots__ = (
+        "tags",
+        "attributes",
+        "tag_acl",
+        "tag_acl_index",
+        "link_protection",
+        "whitelist_domains",
+        "absolute_domain",
+        "filters",
+        "single_pass",
+        "log_acl",
+        "parser_backend",
+        "_local",
+    )
+
+    def __init__(
+        self,
+        tag_acl=None,
+        link_protection=False,
+        whitelist_domains=(None,),
+        absolute_domain="",
+        tags=None,
+        attributes=None,
+        single_pass=False,
+        log_acl=False,
+        parser_backend="html5lib",
+    ):
+        if tag_acl is None:
+            tag_acl = {}
+
+        if parser_backend not in PARSER_BACKENDS:
+            raise ValueError(
+                "parser_backend must be one of {}, not {!r}".format(
+                    PARSER_BACKENDS, parser_backend
+                )
+            )
+
+        default_tags, default_attrs = cleaner_tags_and_attrs(tag_acl)
+        if tags is None:
+            tags = default_tags
+        if attributes is None:
+            attributes = default_attrs
+
+        frozen_acl = {
+            tag_name: tuple(tuple(rule) for rule in rules)
+            for tag_name, rules in tag_acl.items()
+        }
+        frozen_attrs = {
+            tag_name: frozenset(names) for tag_name, names in attributes.items()
+        }
+
+        filters = ()
+        if link_protection == False:
+            filters = (linkify_filter,)
+
+        setattr_ = super(SanitizePolicy, self).__setattr__
+        setattr_("tags", frozenset(tags))
+        setattr_("attributes", MappingProxyType(frozen_attrs))
+        setattr_("tag_acl", MappingProxyType(frozen_acl))
+        setattr_("tag_acl_index", MappingProxyType(compile_tag_acl(frozen_acl)))
+        setattr_("link_protection", bool(link_protection))
+        setattr_("whitelist_domains", frozenset(whitelist_domains))
+        setattr_("absolute_domain", absolute_domain)
+        setattr_("filters", filters)
+        setattr_("single_pass", bool(single_pass))
+        setattr_("log_acl", bool(log_acl))
+        setattr_("parser_backend", parser_backend)
+        setattr_("_local", threading.local())
+
+    @classmethod
+    def from_cleaner(cls, cleaner):
+        """Returns a policy with the same configuration as `cleaner`."""
+        return cls(
+            tag_acl=cleaner.tag_acl,
+            link_protection=cleaner.link_protection,
+            whitelist_domains=cleaner.whitelist_domains,
+            absolute_domain=cleaner.absolute_domain,
+            tags=cleaner.tags,
+            attributes=cleaner.attributes,
+            single_pass=getattr(cleaner, "single_pass", False),
+            log_acl=getattr(cleaner, "log_acl", False),
+            parser_backend=getattr(cleaner, "parser_backend", "html5lib"),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SanitizePolicy is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("SanitizePolicy is immutable")
+
+    def __reduce__(self):
+        # rebuild from plain config so policies may be sent to other processes.
+        return (
+            self.__class__,
+            (
+                {tag_name: list(rules) for tag_name, rules in self.tag_acl.items()},
+                self.link_protection,
+                tuple(self.whitelist_domains),
+                self.absolute_domain,
+                self.tags,
+                {tag_name: names for tag_name, names in self.attributes.items()},
+                self.single_pass,
+                self.log_acl,
+                self.parser_backend,
+            ),
+        )
+
+    @property
+    def cleaner(self):
+        """Returns the bleach Cleaner owned by the calling thread."""
+        cleaner = getattr(self._local, "cleaner", None)
+        if cleaner is None:
+            cleaner = Cleaner(
+                tags=self.tags,
+                attributes=dict(self.attributes),
+                filters=list(self.filters),
+            )
+            self._local.cleaner = cleaner
+        return cleaner
+
+    @property
+    def single_pass_cleaner(self):
+        """Returns the single pass bleach Cleaner owned by the calling thread."""
+        cleaner = getattr(self._local, "single_pass_cleaner", None)
+        if cleaner is None:
+            cleaner = single_pass_cleaner(self)
+            self._local.single_pass_cleaner = cleaner
+        return cleaner
+
+    def clean(self, text):
+        return self.cleaner.clean(text)
+
+
+def markdown_extensions(extra_extensions=None):
+    """Returns the list of markdown extensions used to render markdown"""
+    from .highlight_cache import HighlightCacheExtension
 
-def markdown_to_raw_html(data, extra_extensions=None):
-    """Accepts a markdown string, returns raw unsanitized HTML"""
     extensions = [
         "markdown.extensions.codehilite",
         "markdown.extensions.fenced_code",
     ]
-    if extra_extensions is not None:
-        extensions.extend(extra_extensions)
+    extra_extensions = list(extra_extensions or [])
+    # a HighlightCacheExtension passed in replaces the default one.
+    if not any(isinstance(e, HighlightCacheExtension) for e in extra_extensions):
+        extensions.append(HighlightCacheExtension())
+    extensions.extend(extra_extensions)
+    return extensions
 
-    return markdown(data, extensions=extensions)
+
+def markdown_to_raw_html(data, extra_extensions=None):
+    """Accepts a markdown string, returns raw unsanitized HTML"""
+    from markdown import markdown
+
+    return markdown(data, extensions=markdown_extensions(extra_extensions))
 
 
 def conditional_tag_filter(soup, cleaner):
     """
     Use BeautifulSoup `Soup` object to filter out non-whitelisted tags.
+
+    The tag_acl is compiled into an index of tag_name to attr_name to the
+    set of allowed attr_values, see `compile_tag_acl`, and the DOM is walked
+    once, finding the tags of every tag_name in the tag_acl together.
+
+    Set `cleaner.log_acl = True` to log each extracted tag.
     """
 
     # bleach does not have a way to conditionally accept tags whitelists.
     # so we built our own way.
 
-    log.info(cleaner.tag_acl)
-
-    # for each tag_name in the tag_acl ...
-    for tag_name in cleaner.tag_acl.keys():
-
-        # find all the tags in the DOM that match the tag_name, for example "script".
-        for tag in soup.find_all(tag_name):
-
-            # tag is a BeautifulSoup tag object.
-
-            # by default, assume we will extract tag (remove it from the DOM).
-            extract_tag = True
-
-            for attr_name, attr_value, allow_or_deny in cleaner.tag_acl[tag_name]:
-
-                # tag attr_name:
-                #
-                #   * "type"
-                #   * "id"
-                #   * "class"
-                #   * ect
-                #
-                # tag attr_value:
-                #
-                #   * "math/tex; mode=display"
-                #   * "<uuid>"
-                #   * ect
-                #
-                # allow_or_deny:
-                #
-                #  * "allow"
-                #  * "deny"
-
-                log.info("{} {} {}".format(attr_name, attr_value, allow_or_deny))
-
-                if allow_or_deny == "allow":
-
-                    if tag.attrs.get(attr_name) == attr_value:
-                        # this tag attr_name/attr_value is whitelisted.
-                        # do not extract tag (remove it from the DOM)
-                        extract_tag = False
-                        break
-
-            if extract_tag:
-                log.info(
-                    "Extracting {} tag with attr_name {} and attr_value {}".format(
-                        tag_name, attr_name, attr_value
-                    )
-                )
-                # remove this tag.
-                # this tag attr_name:attr_value is _not_ whitelisted.
-                tag.extract()
+    index = getattr(cleaner, "tag_acl_index", None)
+    if index is None:
+        index = compile_tag_acl(cleaner.tag_acl)
+
+    if not index:
+        return soup
+
+    log_acl = getattr(cleaner, "log_acl", False)
+
+    # find all the tags in the DOM that match a tag_name, for example "script".
+    for tag in soup.find_all(list(index)):
+
+        if tag_acl_allows(index[tag.name], tag.name, tag.attrs):
+            # this tag attr_name/attr_value is whitelisted.
+            continue
+
+        if log_acl:
+            log.info("Extracting %s tag with attrs %s", tag.name, tag.attrs)
+
+        # remove this tag.
+        # this tag attr_name:attr_value is _not_ whitelisted.
+        tag.extract()
 
     return soup
 
 
 def protect_links(soup, cleaner):
+    import miniuri
 
     for a_tag in soup.find_all("a"):
         uri = miniuri.Uri(a_tag.attrs.get("href", ""))
@@ -197,26 +440,474 @@ def protect_links(soup, cleaner):
     return soup
 
 
+# tags html5lib moves into <head> when they start a document.
+HEAD_TAGS = frozenset(
+    [
+        "base",
+        "basefont",
+        "bgsound",
+        "link",
+        "meta",
+        "noframes",
+        "script",
+        "style",
+        "template",
+        "title",
+    ]
+)
+
+# tags whose text BeautifulSoup keeps exactly as bleach serialized it.
+RAW_TEXT_TAGS = frozenset(["script", "style"])
+
+# tags where html5lib drops a newline directly after the start tag.
+NEWLINE_TAGS = frozenset(["listing", "pre", "textarea"])
+
+# tags where html5lib foster parents text out of the table.
+TABLE_CONTEXT_TAGS = frozenset(["table", "tbody", "tfoot", "thead", "tr"])
+
+# tags where html5lib implies a <tr> before a <td>.
+TABLE_SECTION_TAGS = frozenset(["table", "tbody", "tfoot", "thead"])
+
+SPACE_CHARACTERS = " \t\n\r\f"
+
+
+def _token_attrs(token):
+    """Returns a dict of attr_name to resolved attr_value for a tag token."""
+    return {name: value for (namespace, name), value in token["data"].items()}
+
+
+def _escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _quote_attr(value):
+    """Quotes an attribute value the way BeautifulSoup does."""
+    value = _escape(value)
+    if '"' in value:
+        if "'" in value:
+            return '"{}"'.format(value.replace('"', "&quot;"))
+        return "'{}'".format(value)
+    return '"{}"'.format(value)
+
+
+class ReparseFilter(Filter):
+    """
+    Applies the changes reparsing bleach output with html5lib used to make.
+
+    Attributes are sorted, entities outside of <script> and <style> are
+    resolved and the newline following a <pre> start tag is dropped, so the
+    `SoupSerializer` output matches.
+    """
+
+    def __iter__(self):
+        after_pre = False
+        raw_text = False
+        stack = []
+        for token in Filter.__iter__(self):
+            token_type = token["type"]
+            if token_type in ("StartTag", "EmptyTag"):
+                name = token["name"]
+                if raw_text or _reparse_required(name, stack):
+                    raise ReparseRequired(name)
+                if token_type == "StartTag":
+                    stack.append(name)
+                    raw_text = name in RAW_TEXT_TAGS
+            elif token_type == "EndTag":
+                stack.pop()
+                raw_text = False
+            elif token_type == "Entity" and not raw_text:
+                token = {
+                    "type": "Characters",
+                    "data": unescape("&{};".format(token["name"])),
+                }
+                token_type = "Characters"
+            if after_pre and token_type in ("Characters", "SpaceCharacters"):
+                if token["data"].startswith("\n"):
+                    token = {"type": token_type, "data": token["data"][1:]}
+            after_pre = token_type == "StartTag" and token["name"] in NEWLINE_TAGS
+            if token_type in ("StartTag", "EmptyTag") and token["data"]:
+                token["data"] = {
+                    key: unescape(value) if "&" in value else value
+                    for key, value in sorted(
+                        token["data"].items(), key=lambda item: item[0][1]
+                    )
+                }
+            yield token
+
+
+class TagACLFilter(Filter):
+    """Token stream version of `conditional_tag_filter`."""
+
+    def __init__(self, source, tag_acl_index, log_acl=False):
+        Filter.__init__(self, source)
+        self.tag_acl_index = tag_acl_index
+        self.log_acl = log_acl
+
+    def __iter__(self):
+        index = self.tag_acl_index
+        # number of open elements inside an extracted tag.
+        extracting = 0
+        for token in Filter.__iter__(self):
+            token_type = token["type"]
+            if extracting:
+                if token_type == "StartTag":
+                    extracting += 1
+                elif token_type == "EndTag":
+                    extracting -= 1
+                continue
+            if token_type in ("StartTag", "EmptyTag") and token["name"] in index:
+                if not tag_acl_allows(
+                    index[token["name"]], token["name"], _token_attrs(token)
+                ):
+                    if self.log_acl:
+                        log.info(
+                            "Extracting %s tag with attrs %s",
+                            token["name"],
+                            _token_attrs(token),
+                        )
+                    if token_type == "StartTag":
+                        extracting = 1
+                    # the serializer still needs to know where the tag was.
+                    yield {"type": "Extracted", "name": token["name"]}
+                    continue
+            yield token
+
+
+class LinkProtectionFilter(Filter):
+    """Token stream version of `protect_links`."""
+
+    def __init__(self, source, whitelist_domains, link_protection, absolute_domain):
+        Filter.__init__(self, source)
+        self.whitelist_domains = whitelist_domains
+        self.link_protection = link_protection
+        self.absolute_domain = absolute_domain
+
+    def __iter__(self):
+        import miniuri
+
+        # number of open elements inside a removed link.
+        removing = 0
+        for token in Filter.__iter__(self):
+            token_type = token["type"]
+            if removing:
+                if token_type == "StartTag":
+                    removing += 1
+                elif token_type == "EndTag":
+                    removing -= 1
+                    if not removing:
+                        yield {"type": "Characters", "data": "[link removed]"}
+                continue
+
+            if token_type != "StartTag" or token["name"] != "a":
+                yield token
+                continue
+
+            attrs = token["data"]
+            uri = miniuri.Uri(attrs.get((None, "href"), ""))
+
+            if uri.hostname in self.whitelist_domains:
+                # domain in whitelist or relative URI so remove rel="nofollow".
+                attrs.pop((None, "rel"), None)
+                if uri.hostname is None and self.absolute_domain:
+                    # make relative path absolute, assume https like protect_links.
+                    uri.scheme = "https"
+                    uri.hostname = self.absolute_domain
+                    added = (None, "href") not in attrs
+                    attrs[(None, "href")] = str(uri)
+                    if added:
+                        # BeautifulSoup writes attributes sorted, keep them so.
+                        token["data"] = dict(
+                            sorted(attrs.items(), key=lambda item: item[0][1])
+                        )
+
+            elif self.link_protection:
+                # domain not in whitelist, replace a_tag with "[link removed]".
+                removing = 1
+                continue
+
+            yield token
+
+
+class ReparseRequired(Exception):
+    """Raised when html5lib would restructure a document if it was reparsed."""
+
+
+# tags html5lib keeps in place inside a table.
+TABLE_TAGS = frozenset(
+    ["caption", "col", "colgroup", "script", "style", "table", "tbody", "td"]
+    + ["template", "tfoot", "th", "thead", "tr"]
+)
+
+
+HEADING_TAGS = frozenset(["h1", "h2", "h3", "h4", "h5", "h6"])
+
+# start tags which close an open <p>, html5lib's "close a p element" rule.
+P_CLOSING_TAGS = frozenset(
+    ["address", "article", "aside", "blockquote", "center", "dd", "details"]
+    + ["dialog", "dir", "div", "dl", "dt", "fieldset", "figcaption", "figure"]
+    + ["footer", "form", "header", "hgroup", "hr", "li", "listing", "main"]
+    + ["menu", "nav", "ol", "p", "plaintext", "pre", "section", "summary"]
+    + ["table", "ul", "xmp"]
+    + list(HEADING_TAGS)
+)
+
+# start tags which close an open element of their group, up to the list.
+LIST_ITEM_TAGS = {
+    "li": (frozenset(["li"]), frozenset(["ol", "ul"])),
+    "dd": (frozenset(["dd", "dt"]), frozenset(["dl"])),
+    "dt": (frozenset(["dd", "dt"]), frozenset(["dl"])),
+}
+
+# start tags which close an open element of the same name.
+SELF_CLOSING_TAGS = frozenset(["button", "form", "nobr"])
+
+# tags html5lib parses with rules of their own, never handled in one pass.
+SPECIAL_PARSE_TAGS = frozenset(
+    ["body", "frame", "frameset", "head", "html", "iframe", "image", "isindex"]
+    + ["math", "noembed", "noframes", "noscript", "optgroup", "option"]
+    + ["plaintext", "rb", "rp", "rt", "rtc", "select", "svg", "textarea"]
+    + ["template", "title", "xmp"]
+)
+
+
+def _reparse_required(name, stack):
+    """
+    Returns True if html5lib would move or close elements around a start tag.
+
+    html5lib does not always produce a tree which survives a round trip,
+    for example nested <a> tags, elements directly inside a <table> or a
+    <dd> inside a <dt>. The checks are conservative, a False is exact but
+    a True may only mean the document takes the two pass path.
+    """
+    if name in SPECIAL_PARSE_TAGS:
+        return True
+    current = stack[-1] if stack else None
+    if current in TABLE_CONTEXT_TAGS and name not in TABLE_TAGS:
+        return True
+    if current in HEADING_TAGS and name in HEADING_TAGS:
+        return True
+    if name in P_CLOSING_TAGS and "p" in stack:
+        return True
+    if (name == "a" or name in SELF_CLOSING_TAGS) and name in stack:
+        return True
+    if name in LIST_ITEM_TAGS:
+        closes, scope = LIST_ITEM_TAGS[name]
+        for open_name in reversed(stack):
+            if open_name in closes:
+                return True
+            if open_name in scope:
+                break
+    return False
+
+
+class SoupSerializer(object):
+    """
+    Serializes a bleach token stream the way BeautifulSoup decodes a document.
+
+    `clean_raw_html` historically reparsed bleach output with html5lib and
+    returned `soup.decode()`, so this reproduces the <html> wrapper, <head>
+    placement, implied <tbody> tags, text foster parented out of tables,
+    attribute quoting, escaping and void tags of that round trip.
+    """
+
+    def render(self, tokens):
+        before, head, body = [], [], []
+        # where top level tokens go, None until the first content is seen.
+        target = None
+        # open elements, implied elements are stored as (name,) tuples.
+        stack = []
+        # index in body of each open table, text is foster parented there.
+        tables = []
+        # escaped text waiting to find out if it belongs in a table.
+        pending = []
+        pending_text = False
+
+        for token in tokens:
+            token_type = token["type"]
+            text_token = token_type in ("Characters", "SpaceCharacters")
+
+            if target is not body and not stack:
+                if text_token:
+                    text = token["data"]
+                    stripped = text.lstrip(SPACE_CHARACTERS)
+                    if target is head:
+                        head.append(text[: len(text) - len(stripped)])
+                    if not stripped:
+                        continue
+                    token = {"type": "Characters", "data": stripped}
+                    target = body
+                elif token_type in ("StartTag", "EmptyTag", "Extracted"):
+                    target = head if token["name"] in HEAD_TAGS else body
+                elif token_type == "Comment" and target is None:
+                    before.append("<!--{}-->".format(token["data"]))
+                    continue
+
+            out = body if target is None else target
+            current = stack[-1] if stack else None
+            if isinstance(current, tuple):
+                current = current[0]
+
+            if text_token and current in TABLE_CONTEXT_TAGS:
+                pending.append(_escape(token["data"]))
+                pending_text = pending_text or bool(
+                    token["data"].strip(SPACE_CHARACTERS)
+                )
+                continue
+
+            if pending:
+                if pending_text:
+                    # html5lib moves text out of tables to before the table.
+                    out.insert(tables[-1], "".join(pending))
+                    tables[-1] += 1
+                else:
+                    out.append("".join(pending))
+                pending, pending_text = [], False
+
+            if token_type in ("StartTag", "EmptyTag"):
+                name = token["name"]
+                if name == "tr" and current == "table":
+                    out.append("<tbody>")
+                    stack.append(("tbody",))
+                elif name in ("td", "th") and current in TABLE_SECTION_TAGS:
+                    if current == "table":
+                        out.append("<tbody>")
+                        stack.append(("tbody",))
+                    out.append("<tr>")
+                    stack.append(("tr",))
+                attrs = "".join(
+                    " {}={}".format(attr_name, _quote_attr(value))
+                    for (namespace, attr_name), value in token["data"].items()
+                )
+                if token_type == "EmptyTag":
+                    out.append("<{}{}/>".format(name, attrs))
+                    continue
+                if name == "table" and out is body:
+                    tables.append(len(body))
+                out.append("<{}{}>".format(name, attrs))
+                stack.append(name)
+            elif token_type == "EndTag":
+                while stack and isinstance(stack[-1], tuple):
+                    out.append("</{}>".format(stack.pop()[0]))
+                out.append("</{}>".format(token["name"]))
+                if stack:
+                    stack.pop()
+                if token["name"] == "table" and out is body:
+                    tables.pop()
+            elif text_token:
+                out.append(_escape(token["data"]))
+            elif token_type == "Entity":
+                # only left unresolved inside <script> and <style>.
+                out.append("&{};".format(token["name"]))
+            elif token_type == "Comment":
+                out.append("<!--{}-->".format(token["data"]))
+
+        if pending:
+            body.append("".join(pending))
+
+        return "{}<html><head>{}</head><body>{}</body></html>".format(
+            "".join(before), "".join(head), "".join(body)
+        )
+
+
+def single_pass_cleaner(cleaner):
+    """
+    Returns a bleach Cleaner which applies the tag_acl and link protection
+    while bleach streams tokens, so HTML is parsed and serialized only once.
+
+    Documents html5lib would restructure when reparsed raise
+    `ReparseRequired`, `clean_raw_html` then falls back to two passes.
+    """
+    if isinstance(cleaner, SanitizePolicy):
+        tag_acl_index = cleaner.tag_acl_index
+        base = cleaner.cleaner
+    else:
+        tag_acl_index = compile_tag_acl(cleaner.tag_acl)
+        base = cleaner
+
+    filters = list(base.filters)
+    if cleaner.link_protection == False and linkify_filter not in filters:
+        filters.append(linkify_filter)
+    filters.append(ReparseFilter)
+    filters.append(
+        partial(
+            TagACLFilter,
+            tag_acl_index=tag_acl_index,
+            log_acl=getattr(cleaner, "log_acl", False),
+        )
+    )
+    filters.append(
+        partial(
+            LinkProtectionFilter,
+            whitelist_domains=cleaner.whitelist_domains,
+            link_protection=cleaner.link_protection,
+            absolute_domain=cleaner.absolute_domain,
+        )
+    )
+
+    single_pass = Cleaner(
+        tags=base.tags,
+        attributes=base.attributes,
+        protocols=base.protocols,
+        strip=base.strip,
+        strip_comments=base.strip_comments,
+        filters=filters,
+        css_sanitizer=base.css_sanitizer,
+    )
+    single_pass.serializer = SoupSerializer()
+    return single_pass
+
+
+def _cached_single_pass_cleaner(cleaner):
+    """
+    Returns `single_pass_cleaner(cleaner)` for a plain cleaner, built once
+    and kept on the cleaner until a setting it was built from changes.
+    """
+    key = (
+        repr(cleaner.tag_acl),
+        cleaner.link_protection,
+        tuple(cleaner.whitelist_domains),
+        cleaner.absolute_domain,
+        getattr(cleaner, "log_acl", False),
+        tuple(cleaner.filters),
+    )
+    cached = getattr(cleaner, "_single_pass_cache", None)
+    if cached is None or cached[0] != key:
+        cached = (key, single_pass_cleaner(cleaner))
+        cleaner._single_pass_cache = cached
+    return cached[1]
+
+
 def clean_raw_html(raw_html, cleaner=None):
     """
     Accepts raw HTML and a cleaner object
     Returns sanitized HTML as bytes.
+
+    `cleaner.parser_backend` picks the BeautifulSoup tree builder used to filter
+    tags and links. It is ignored in `single_pass` mode, which only reparses
+    documents html5lib would restructure, with the same output.
     """
     if cleaner is None:
         cleaner = default_cleaner()
 
-    if cleaner.link_protection == False:
-        cleaner.filters.append(
-            partial(
-                LinkifyFilter,
-                callbacks=[nofollow, target_blank],
-                skip_tags=["pre", "code"],
-            )
-        )
+    if getattr(cleaner, "single_pass", False):
+        if isinstance(cleaner, SanitizePolicy):
+            single_pass = cleaner.single_pass_cleaner
+        else:
+            single_pass = _cached_single_pass_cleaner(cleaner)
+        try:
+            return single_pass.clean(raw_html) or SoupSerializer().render([])
+        except ReparseRequired:
+            # rare malformed documents, fall back to parsing twice.
+            pass
+
+    if cleaner.link_protection == False and linkify_filter not in cleaner.filters:
+        cleaner.filters.append(linkify_filter)
 
     cleaned_html = cleaner.clean(raw_html)
 
-    soup = BeautifulSoup(cleaned_html, "html5lib")
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(cleaned_html, getattr(cleaner, "parser_backend", "html5lib"))
 
     # conditionally accept whitelisted tags, filter out the rest.
     soup = conditional_tag_filter(soup, cleaner)
@@ -0,0 +1,148 @@
+"""
+An index of a settings dict for fast child section lookups.
+
+    index = SettingsIndex(settings)
+    index.children("auth_tkt")  # {"hashalg": "md5", "timeout": 3600}
+
+The dotted keys are indexed once into a prefix tree. Each value is
+expanded with `os.path.expandvars` and typed with
+`get_int_or_bool_or_none_or_str` once, the first time it is looked up.
+A child section lookup walks the tree to the section and copies its
+values, it does not scan the other settings.
+"""
+
+import os
+
+import re
+
+from . import get_int_or_bool_or_none_or_str
+
+# the variable syntax of `os.path.expandvars`.
+_ENV_VARIABLE = re.compile(r"\$(\w+|\{[^}]*\})", re.ASCII)
+
+_MISSING = object()
+
+
+class _Node(object):
+    __slots__ = ("raw", "value", "children")
+
+    def __init__(self):
+        self.raw = _MISSING
+        self.value = _MISSING
+        self.children = {}
+
+    def get_value(self):
+        # values are parsed on first use, most sections are never read.
+        if self.value is _MISSING and self.raw is not _MISSING:
+            self.value = parse_setting(self.raw)
+        return self.value
+
+
+def parse_setting(value):
+    """Returns a settings value with ENV vars expanded and typed."""
+    if not isinstance(value, str):
+        return value
+    return get_int_or_bool_or_none_or_str(os.path.expandvars(value))
+
+
+class SettingsIndex(object):
+    """
+    A dotted key prefix tree of a settings dict, with typed values.
+
+    Unlike `get_children_settings`, which matches any key containing the
+    parent key, `children("a")` only returns the "a.*" settings. Lookups
+    never check the environment, call `refresh` after changing ENV vars
+    and `invalidate` after changing the settings dict.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._root = None
+        self._sections = {}
+        self._variables = {}
+
+    def invalidate(self):
+        """Drop the index, it is built again on the next lookup."""
+        self._root = None
+        self._sections = {}
+        self._variables = {}
+
+    def is_stale(self):
+        """Test if an ENV var used by the settings has changed."""
+        for name, value in self._variables.items():
+            if os.environ.get(name) != value:
+                return True
+        return False
+
+    def refresh(self):
+        """Drop the index if an ENV var used by the settings has changed."""
+        if self.is_stale():
+            self.invalidate()
+            return True
+        return False
+
+    def _build(self):
+        root = _Node()
+        variables = {}
+        for key, value in self.settings.items():
+            if isinstance(value, str) and "$" in value:
+                for name in _ENV_VARIABLE.findall(value):
+                    name = name.strip("{}")
+                    variables[name] = os.environ.get(name)
+            node = root
+            for part in key.split("."):
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = _Node()
+                node = child
+            node.raw = value
+        self._root = root
+        self._sections = {}
+        self._variables = variables
+
+    def _tree(self):
+        if self._root is None:
+            self._build()
+        return self._root
+
+    def _find(self, key):
+        node = self._tree()
+        for part in key.split("."):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def get(self, key, default=None):
+        """Returns the typed value of the setting `key`, or `default`."""
+        node = self._find(key)
+        if node is None or node.raw is _MISSING:
+            return default
+        return node.get_value()
+
+    def children(self, parent_key):
+        """
+        Returns a dict of the settings under `parent_key`, without the
+        "parent_key." prefix, like `get_children_settings`.
+        """
+        self._tree()
+        section = self._sections.get(parent_key)
+        if section is None:
+            section = self._sections[parent_key] = self._flatten(parent_key)
+        return dict(section)
+
+    def _flatten(self, parent_key):
+        node = self._find(parent_key)
+        section = {}
+        if node is None:
+            return section
+        stack = [("", node)]
+        while stack:
+            prefix, node = stack.pop()
+            for part, child in node.children.items():
+                key = prefix + part
+                if child.raw is not _MISSING:
+                    section[key] = child.get_value()
+                if child.children:
+                    stack.append((key + ".", child))
+        return section
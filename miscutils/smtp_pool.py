@@ -0,0 +1,213 @@
+"""
+Pool of persistent SMTP connections, keyed by relay.
+
+Opening a connection to the relay costs a TCP handshake and an EHLO, so
+connections are kept open between messages and shared between threads:
+
+    pool = SMTPPool(size=4, idle_timeout=60)
+    pool.sendmail("localhost", sender_email, [to_email], msg_data)
+
+Each relay has at most `size` connections open at once. Idle connections
+older than `idle_timeout` seconds are closed, a connection idle for more
+than `check_interval` seconds is checked with NOOP before it is reused,
+and a reused connection the relay already dropped is replaced by a new
+one and the message is sent again.
+
+Batches of messages share one connection. `connection` checks a reused
+connection with NOOP before handing it out, `checkout` says if the
+connection was reused so the caller can resend on a fresh one:
+
+    with pool.checkout(relay) as (connection, reused):
+        connection.sendmail(sender_email, [to_email], msg_data)
+"""
+
+import time
+
+import smtplib
+
+import threading
+
+from collections import defaultdict, deque
+
+from contextlib import contextmanager
+
+import logging
+
+log = logging.getLogger(__name__)
+
+# the connection is still usable after these, the relay refused a command.
+REFUSED_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+# a reused connection failing with these was dropped by the relay.
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class SMTPPool(object):
+    """A thread safe pool of SMTP connections."""
+
+    def __init__(
+        self,
+        size=4,
+        idle_timeout=60.0,
+        check_interval=5.0,
+        timeout=30.0,
+        smtp_class=smtplib.SMTP,
+    ):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.smtp_class = smtp_class
+        self.opened = 0
+        self.reused = 0
+        self.reconnects = 0
+        # relay to deque of (connection, last used time) pairs.
+        self._idle = defaultdict(deque)
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, relay):
+        with self._lock:
+            slot = self._slots.get(relay)
+            if slot is None:
+                slot = self._slots[relay] = threading.BoundedSemaphore(self.size)
+            return slot
+
+    def _connect(self, relay):
+        connection = self.smtp_class(relay, timeout=self.timeout)
+        connection.ehlo_or_helo_if_needed()
+        with self._lock:
+            self.opened += 1
+        return connection
+
+    def _close(self, connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def _healthy(self, connection):
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self, relay, fresh, check):
+        """Returns a (connection, reused) pair for `relay`."""
+        while not fresh:
+            with self._lock:
+                if not self._idle[relay]:
+                    break
+                connection, last_used = self._idle[relay].pop()
+            idle = time.monotonic() - last_used
+            if idle > self.idle_timeout:
+                self._close(connection)
+                continue
+            if (check or idle > self.check_interval) and not self._healthy(connection):
+                connection.close()
+                continue
+            with self._lock:
+                self.reused += 1
+            return connection, True
+        return self._connect(relay), False
+
+    def _checkin(self, relay, connection):
+        with self._lock:
+            self._idle[relay].append((connection, time.monotonic()))
+
+    @contextmanager
+    def checkout(self, relay, fresh=False, check=False):
+        """
+        Context manager which checks out a (connection, reused) pair.
+
+        `reused` is True for a connection which waited in the pool, the
+        relay may have dropped it since. Set `fresh` to open a new
+        connection, to resend what failed on a reused one, and `check` to
+        check a reused connection with NOOP first.
+        """
+        if fresh:
+            log.info("Reconnecting to %s", relay)
+            with self._lock:
+                self.reconnects += 1
+        slot = self._slot(relay)
+        slot.acquire()
+        try:
+            connection, reused = self._checkout(relay, fresh, check)
+            try:
+                yield connection, reused
+            except REFUSED_ERRORS:
+                try:
+                    connection.rset()
+                except (smtplib.SMTPException, OSError):
+                    connection.close()
+                else:
+                    self._checkin(relay, connection)
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            else:
+                self._checkin(relay, connection)
+        finally:
+            slot.release()
+
+    @contextmanager
+    def connection(self, relay):
+        """
+        Context manager which checks out a connection to `relay`.
+
+        A reused connection is checked with NOOP before it is handed out,
+        the block can not be run again if the relay already dropped it.
+        Use `checkout` to resend on a new connection instead.
+        """
+        with self.checkout(relay, check=True) as (connection, reused):
+            yield connection
+
+    def sendmail(self, relay, from_addr, to_addrs, msg):
+        """
+        Send `msg` over a pooled connection, same as `SMTP.sendmail`.
+
+        Raises `smtplib.SMTPException` or `OSError` if the relay can not
+        be reached or refuses the message.
+        """
+        while True:
+            reused = False
+            try:
+                with self.checkout(relay) as (connection, reused):
+                    return connection.sendmail(from_addr, to_addrs, msg)
+            except DISCONNECT_ERRORS:
+                if not reused:
+                    raise
+                # the relay closed the idle connection, use another one.
+                log.info("Reconnecting to %s", relay)
+                with self._lock:
+                    self.reconnects += 1
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle = [
+                connection for pairs in self._idle.values() for connection, _ in pairs
+            ]
+            self._idle.clear()
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self):
+        """Returns a dict of connection counters."""
+        with self._lock:
+            idle = sum(len(pairs) for pairs in self._idle.values())
+        return {
+            "opened": self.opened,
+            "reused": self.reused,
+            "reconnects": self.reconnects,
+            "idle": idle,
+        }
+
+
+# shared by `mail.send_email` in this process.
+default_pool = SMTPPool()
@@ -1,8 +1,29 @@
+import base64
+
 import hashlib
 
-from svg import make_svg
+from .svg import (  # noqa: F401
+    QUOTED_SVG_TEMPLATE,
+    SVG_TEMPLATE,
+    make_svg,
+    reduce_whitespace,
+)
+
+from ..cache_backends import LRUBackend
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    # Python 2.
+    from urllib import quote
+
+DATA_URI_PREFIXES = {
+    "percent": "data:image/svg+xml;charset=utf-8,",
+    "base64": "data:image/svg+xml;base64,",
+}
 
-from urllib import quote
+# memoizes svgtar and inline_svgtar results, keyed by their arguments.
+svgtar_cache = LRUBackend(maxsize=4096)
 
 
 def _bg_color(colors=None, text=u"", h=u"salty-salt"):
@@ -23,26 +44,72 @@ def _bg_color(colors=None, text=u"", h=u"salty-salt"):
 
 
 def _reduce_whitespace(text):
-    return " ".join(map(str.strip, map(str, text.splitlines())))
-
-
-def inline_svgtar(*args, **kwargs):
-    quoted_svgtar = quote(_reduce_whitespace(svgtar(*args, **kwargs)))
-    return "data:image/svg+xml;charset=utf-8,{}".format(quoted_svgtar)
+    return reduce_whitespace(text)
 
 
-def svgtar(
+def _options(
     text, h, size=55, color="#ffffff", bg=None, font_size=None, font_family="Arial"
 ):
-    """Return an multiline svg string."""
-    bg = _bg_color(h=h) if bg is None else bg
-    font_size = size * 0.6 if font_size is None else font_size
-    options = {
+    """Returns the template values for the svgtar arguments."""
+    return {
         "text": text,
         "size": size,
         "color": color,
-        "bg": bg,
-        "font_size": font_size,
+        "bg": _bg_color(h=h) if bg is None else bg,
+        "font_size": size * 0.6 if font_size is None else font_size,
         "font_family": font_family,
     }
-    return make_svg(**options)
+
+
+def data_uri(svg, encoding="percent"):
+    """Returns the svg string as a "percent" or "base64" encoded data URI."""
+    if encoding == "percent":
+        return DATA_URI_PREFIXES[encoding] + quote(svg)
+    if encoding == "base64":
+        b64 = base64.b64encode(svg.encode("utf-8")).decode("ascii")
+        return DATA_URI_PREFIXES[encoding] + b64
+    raise ValueError("encoding should be percent or base64.")
+
+
+def inline_svgtar(*args, **kwargs):
+    """
+    Return an svgtar data URI, takes the same arguments as `svgtar`.
+
+    The `encoding` keyword is "percent", the default, or "base64" which
+    gives a shorter URI for this template.
+    """
+    encoding = kwargs.pop("encoding", "percent")
+    key = ("inline", encoding, args, tuple(sorted(kwargs.items())))
+    uri = svgtar_cache.get(key)
+    if uri is None:
+        if encoding == "percent":
+            # only the values are quoted, the template text was at import.
+            options = _options(*args, **kwargs)
+            uri = DATA_URI_PREFIXES[encoding] + QUOTED_SVG_TEMPLATE.render(options)
+        else:
+            uri = data_uri(svgtar(*args, **kwargs), encoding)
+        svgtar_cache.set(key, uri)
+    return uri
+
+
+def svgtar(
+    text, h, size=55, color="#ffffff", bg=None, font_size=None, font_family="Arial"
+):
+    """Return an svg string, memoized in `svgtar_cache`."""
+    key = (text, h, size, color, bg, font_size, font_family)
+    svg = svgtar_cache.get(key)
+    if svg is None:
+        svg = SVG_TEMPLATE.render(_options(*key))
+        svgtar_cache.set(key, svg)
+    return svg
+
+
+def svgtar_many(items, inline=False, **kwargs):
+    """
+    Return a list of svgtars, one for each (text, h) pair in `items`.
+
+    The keyword arguments apply to every svgtar, `inline` returns data
+    URIs like `inline_svgtar`. Repeated users are served from the cache.
+    """
+    render = inline_svgtar if inline else svgtar
+    return [render(text, h, **kwargs) for text, h in items]
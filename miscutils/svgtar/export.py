@@ -0,0 +1,309 @@
+"""
+Export svgtar avatars to static files the web tier can serve directly.
+
+    python -m miscutils.svgtar.export avatars/ < users.tsv
+    python -m miscutils.svgtar.export --sprite avatars/ < users.tsv
+
+The input has one `text<TAB>hash` record per line, the same arguments as
+`svgtar(text, h)`. Each avatar is written to `<directory>/ab/abcdef....svg`,
+named after the sha256 of its svg, so identical avatars share a file and a
+changed avatar gets a new URL. With `--sprite` the avatars are written to
+one `sprite.svg` of `<symbol>` elements instead, used as:
+
+    <svg width="55" height="55"><use href="/avatars/sprite.svg#a1b2c3"/></svg>
+
+`<directory>/index.json` maps each hash to its file, or sprite fragment,
+and to a digest of the inputs it was rendered from. Records with the same
+inputs as the last run are skipped. Files are written to a temporary name
+and renamed into place, so a reader never sees a partial file.
+
+The files are served from the site's own origin, unlike the data URIs of
+`inline_svgtar` in an <img>, so the text and the other values are XML
+escaped before they are rendered. Malformed input lines are reported on
+stderr and skipped.
+"""
+
+import os
+
+import csv
+
+import sys
+
+import json
+
+import hashlib
+
+import argparse
+
+import tempfile
+
+from collections import deque
+
+from itertools import islice
+
+from multiprocessing import Pool
+
+from xml.sax.saxutils import escape
+
+from . import svgtar
+
+from .svg import MINIFIED_TEMPLATE
+
+INDEX_NAME = "index.json"
+
+SPRITE_NAME = "sprite.svg"
+
+# changes to the template change every input digest.
+_TEMPLATE_DIGEST = hashlib.sha256(MINIFIED_TEMPLATE.encode("utf-8")).hexdigest()
+
+# bumped when the same inputs render differently, 2 escapes the values.
+_RENDER_VERSION = 2
+
+
+def write_atomic(path, data):
+    """Write the bytes `data` to `path` through a temporary file and rename."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        # mkstemp files are private, the web server has to read these.
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def input_digest(text, h, svgtar_kwargs):
+    """Returns a digest of everything an avatar is rendered from."""
+    inputs = [
+        _TEMPLATE_DIGEST,
+        _RENDER_VERSION,
+        text,
+        h,
+        sorted(svgtar_kwargs.items()),
+    ]
+    return hashlib.sha256(json.dumps(inputs).encode("utf-8")).hexdigest()
+
+
+def _escaped(value):
+    """XML escapes a str value for element text and attribute values."""
+    if isinstance(value, str):
+        return escape(value, {'"': "&quot;", "'": "&apos;"})
+    return value
+
+
+def _symbol(svg, symbol_id, size):
+    # the symbol takes the contents of the root <svg> element.
+    inner = svg[svg.index(">") + 1 : svg.rindex("</svg>")].strip()
+    return '<symbol id="{}" viewBox="0 0 {} {}">{}</symbol>'.format(
+        symbol_id, size, size, inner
+    )
+
+
+def _render_chunk(chunk, directory, sprite, svgtar_kwargs):
+    """
+    Render a list of (text, h, digest) records.
+
+    Returns (h, digest, path, data) tuples, data is the sprite symbol, the
+    svg if its file was written, or None if the file already existed.
+    """
+    results = []
+    # h only picks the background color, it is never written.
+    escaped_kwargs = {key: _escaped(value) for key, value in svgtar_kwargs.items()}
+    for text, h, digest in chunk:
+        svg = svgtar(_escaped(text), h, **escaped_kwargs)
+        content = hashlib.sha256(svg.encode("utf-8")).hexdigest()
+        if sprite:
+            symbol_id = "a" + content[:16]
+            size = svgtar_kwargs.get("size", 55)
+            path = "{}#{}".format(SPRITE_NAME, symbol_id)
+            results.append((h, digest, path, _symbol(svg, symbol_id, size)))
+            continue
+        path = "{}/{}.svg".format(content[:2], content)
+        full_path = os.path.join(directory, path)
+        if os.path.exists(full_path):
+            results.append((h, digest, path, None))
+            continue
+        parent = os.path.dirname(full_path)
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # another worker made it first.
+                pass
+        write_atomic(full_path, svg.encode("utf-8"))
+        results.append((h, digest, path, svg))
+    return results
+
+
+def _chunks(iterable, chunksize):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run(chunks, directory, sprite, svgtar_kwargs, workers):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for chunk in chunks:
+            for result in _render_chunk(chunk, directory, sprite, svgtar_kwargs):
+                yield result
+        return
+
+    pool = Pool(workers)
+    try:
+        # bound the number of chunks in flight to bound memory.
+        max_pending = workers * 2
+        pending = deque()
+        for chunk in chunks:
+            args = (chunk, directory, sprite, svgtar_kwargs)
+            pending.append(pool.apply_async(_render_chunk, args))
+            if len(pending) >= max_pending:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def load_index(directory):
+    """Returns the index of the last export to `directory`, or {}."""
+    try:
+        with open(os.path.join(directory, INDEX_NAME)) as fh:
+            return json.load(fh)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _export_sprite(records, directory, old_index, workers, chunksize, svgtar_kwargs):
+    digests = [(text, h, input_digest(text, h, svgtar_kwargs)) for text, h in records]
+    sprite_path = os.path.join(directory, SPRITE_NAME)
+    unchanged = os.path.exists(sprite_path) and len(old_index) == len(digests)
+    for text, h, digest in digests:
+        entry = old_index.get(h)
+        if entry is None or entry["digest"] != digest:
+            unchanged = False
+            break
+    if unchanged:
+        return old_index, {"written": 0, "reused": 0, "skipped": len(old_index)}
+
+    # the sprite is one file, so any change renders it all again.
+    index = {}
+    symbols = {}
+    chunks = _chunks(digests, chunksize)
+    for h, digest, path, symbol in _run(
+        chunks, directory, True, svgtar_kwargs, workers
+    ):
+        index[h] = {"digest": digest, "path": path}
+        symbols[path] = symbol
+    sprite_svg = '<svg xmlns="http://www.w3.org/2000/svg">{}</svg>'.format(
+        "".join(symbols[path] for path in sorted(symbols))
+    )
+    write_atomic(sprite_path, sprite_svg.encode("utf-8"))
+    stats = {"written": len(symbols), "reused": len(index) - len(symbols)}
+    stats["skipped"] = 0
+    return index, stats
+
+
+def _export_files(records, directory, old_index, workers, chunksize, svgtar_kwargs):
+    index = {}
+    stats = {"written": 0, "reused": 0, "skipped": 0}
+
+    def changed():
+        for text, h in records:
+            digest = input_digest(text, h, svgtar_kwargs)
+            entry = old_index.get(h)
+            if (
+                entry is not None
+                and entry["digest"] == digest
+                and os.path.exists(os.path.join(directory, entry["path"]))
+            ):
+                index[h] = entry
+                stats["skipped"] += 1
+            else:
+                yield text, h, digest
+
+    chunks = _chunks(changed(), chunksize)
+    for h, digest, path, svg in _run(chunks, directory, False, svgtar_kwargs, workers):
+        index[h] = {"digest": digest, "path": path}
+        stats["reused" if svg is None else "written"] += 1
+    return index, stats
+
+
+def export_avatars(
+    records, directory, sprite=False, workers=None, chunksize=256, **svgtar_kwargs
+):
+    """
+    Write the avatars of an iterable of (text, h) records to `directory`.
+
+    The keyword arguments are passed to `svgtar`. `workers` defaults to
+    the number of CPUs, use 0 or 1 to render in the calling process.
+    Returns a dict of how many records were written, reused, an identical
+    avatar already existed, or skipped, unchanged since the last export.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    old_index = load_index(directory)
+    export = _export_sprite if sprite else _export_files
+    index, stats = export(
+        records, directory, old_index, workers, chunksize, svgtar_kwargs
+    )
+    if index != old_index:
+        data = json.dumps(index, sort_keys=True, indent=0).encode("utf-8")
+        write_atomic(os.path.join(directory, INDEX_NAME), data)
+    return stats
+
+
+def _records(reader):
+    """Yields the (text, h) records of a csv reader, skipping malformed rows."""
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            sys.stderr.write(
+                "line {}: expected text<TAB>hash, skipped\n".format(reader.line_num)
+            )
+            continue
+        yield row[0], row[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", help="directory to export the avatars to")
+    parser.add_argument(
+        "--input",
+        type=argparse.FileType("r"),
+        default=sys.stdin,
+        help="text<TAB>hash records, one per line, defaults to stdin",
+    )
+    parser.add_argument("--sprite", action="store_true", help="write one sprite.svg")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--size", type=int, default=55)
+    parser.add_argument("--font-family", default="Arial")
+    args = parser.parse_args(argv)
+
+    records = _records(csv.reader(args.input, delimiter="\t", quoting=csv.QUOTE_NONE))
+    stats = export_avatars(
+        records,
+        args.directory,
+        sprite=args.sprite,
+        workers=args.workers,
+        size=args.size,
+        font_family=args.font_family,
+    )
+    print("written {written}, reused {reused}, skipped {skipped}".format(**stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,15 @@
+from string import Formatter
+
+from collections import ChainMap
+
+from functools import lru_cache
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    # Python 2.
+    from urllib import quote
+
 defaults = {
     "size": 100,
     "font_size": 60,
@@ -8,24 +20,11 @@ defaults = {
 }
 
 
-def make_svg(**options):
-    """Builds a simple SVG text square with a centered text.
-
-    options: size, font_size, font_family, bg, color, text
-
-    :return (str)
-    """
-    if options is not None and not isinstance(options, dict):
-        raise ValueError("options should be None or a type of dict.")
-
-    if "size" in options and "font_size" not in options:
-        options["font_size"] = int(options["size"] * 0.6)
+def reduce_whitespace(text):
+    return " ".join(map(str.strip, map(str, text.splitlines())))
 
-    dc = defaults.copy()
-    dc.update(options)
-    options = dc
 
-    svg = u"""
+TEMPLATE = u"""
     <svg xmlns="http://www.w3.org/2000/svg"
          width="{size}px" height="{size}px">
       <g>
@@ -38,8 +37,69 @@ def make_svg(**options):
         </text>
       </g>
     </svg>
-    """.format(
-        **options
-    )
+    """
+
+# whitespace is stripped from the template once instead of every svg.
+MINIFIED_TEMPLATE = reduce_whitespace(TEMPLATE)
+
+
+class CompiledTemplate(object):
+    """
+    A `str.format` template compiled once to a printf style format string.
+
+    Rendering looks each field up in the values mapping, then the defaults,
+    without copying and updating a dict of defaults. With `escape` the
+    literal text is escaped at compile time and only the values are escaped
+    per render, which gives the same result as escaping the whole rendered
+    string for a per character escape like `quote`.
+    """
+
+    def __init__(self, template, escape=None):
+        self.escape = escape
+        pieces = []
+        fields = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if escape is not None:
+                literal = escape(literal)
+            pieces.append(literal.replace("%", "%%"))
+            if field is not None:
+                if spec or conversion:
+                    raise ValueError("format specs are not supported")
+                pieces.append("%s")
+                fields.append(field)
+        self.format = "".join(pieces)
+        self.fields = tuple(fields)
+        self.unique_fields = tuple(sorted(set(fields)))
+
+    def render(self, values, defaults=None):
+        if defaults:
+            values = ChainMap(values, defaults)
+        if self.escape is not None:
+            escape = self.escape
+            values = {name: escape(str(values[name])) for name in self.unique_fields}
+        return self.format % tuple([values[name] for name in self.fields])
+
+
+SVG_TEMPLATE = CompiledTemplate(MINIFIED_TEMPLATE)
+
+# sizes, fonts and colors repeat between avatars, quote each value once.
+_quote_value = lru_cache(maxsize=4096)(quote)
+
+# renders `quote(svg)` without quoting the template text every time.
+QUOTED_SVG_TEMPLATE = CompiledTemplate(MINIFIED_TEMPLATE, escape=_quote_value)
+
+
+def make_svg(**options):
+    """Builds a simple SVG text square with a centered text.
+
+    options: size, font_size, font_family, bg, color, text
+
+    :return (str)
+    """
+    if options is not None and not isinstance(options, dict):
+        raise ValueError("options should be None or a type of dict.")
+
+    if "size" in options and "font_size" not in options:
+        options["font_size"] = int(options["size"] * 0.6)
 
-    return svg
+    return SVG_TEMPLATE.render(options, defaults)
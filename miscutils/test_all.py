@@ -1,20 +1,75 @@
-from .phone_numbers import is_phone_number_valid
+from .phone_numbers import (
+    PhoneResult,
+    is_phone_number_valid,
+    validate_csv,
+    validate_many,
+)
 
 from . import dollars_to_cents, cents_to_dollars
 
+import io
+
 import unittest
 
+PHONE_NUMBERS = [
+    "4",
+    "",
+    "555-123-4567",
+    "(555) 123.4567",
+    "555 123 456",
+    "555-123-456x",
+    "+1 555 123 4567",
+    "\u0665\u0665\u0665\u0661\u0662\u0663\u0664\u0665\u0666\u0667",
+    "5551234567\n",
+]
+
+
+def _old_is_phone_number_valid(phone_number):
+    """is_phone_number_valid before bulk validation was added."""
+    for separator in "-. ()":
+        phone_number = phone_number.replace(separator, "")
+    return phone_number.isdigit() and len(phone_number) >= 10
+
 
 class TestPhoneNumber(unittest.TestCase, object):
     def test_is_phone_number_valid_4(self):
         phone_number = "4"
         self.assertFalse(is_phone_number_valid(phone_number))
 
+    def test_same_as_chained_replace(self):
+        for phone_number in PHONE_NUMBERS:
+            self.assertEqual(
+                is_phone_number_valid(phone_number),
+                _old_is_phone_number_valid(phone_number),
+            )
+
+    def test_validate_many(self):
+        expected = [
+            PhoneResult(n, n.translate({ord(c): None for c in "-. ()"}), v)
+            for n, v in zip(PHONE_NUMBERS, map(is_phone_number_valid, PHONE_NUMBERS))
+        ]
+        self.assertEqual(list(validate_many(PHONE_NUMBERS, chunksize=2)), expected)
+        self.assertEqual(
+            list(validate_many(PHONE_NUMBERS * 3, workers=2, chunksize=4)),
+            expected * 3,
+        )
+        self.assertEqual(expected[3].digits, "5551234567")
+
+    def test_validate_csv(self):
+        fh = io.StringIO("name,phone\nann,555-123-4567\nbob\ncat,123\n")
+        self.assertEqual(
+            [(r.digits, r.valid) for r in validate_csv(fh, column="phone")],
+            [("5551234567", True), ("", False), ("123", False)],
+        )
+
 
 class TestDollarCentConversions(unittest.TestCase, object):
     def test_dollars_to_cents(self):
         self.assertEqual(342, dollars_to_cents(3.42))
         self.assertEqual(342, dollars_to_cents("3.42"))
+        # one cent short through float arithmetic.
+        self.assertEqual(29, dollars_to_cents("0.29"))
+        self.assertEqual(115, dollars_to_cents(1.15))
 
     def test_cents_to_dollars(self):
         self.assertEqual(3.42, cents_to_dollars(342))
@@ -0,0 +1,144 @@
+from .bulk_mail import MessageTemplate, header_bytes, send_bulk_email
+
+from .mail import build_message_data
+
+from .smtp_pool import SMTPPool
+
+from .test_mail import SMTPStub
+
+from .test_dkim_signer import _dns_record
+
+import nacl.signing
+
+import tempfile
+
+import base64
+
+import shutil
+
+import dkim
+
+import os
+
+import unittest
+
+import re
+
+SENDER = "news@example.com"
+
+
+def _boundaries(msg_data):
+    """The MIME boundary is random, replace it with a fixed one."""
+    return re.sub(rb"=+\d+==", b"==boundary==", msg_data)
+
+
+class TestMessageTemplate(unittest.TestCase, object):
+    def test_header_bytes(self):
+        for value in ("to@example.com", "Ünïcode <to@example.com>", "x" * 100):
+            msg, msg_data = build_message_data(value, SENDER, "s", "t", "h")
+            self.assertIn(header_bytes("To", value), msg_data)
+
+    def test_render_same_as_build_message_data(self):
+        template = MessageTemplate(SENDER, "news", "text", "<p>html</p>")
+        for to_email in ("a@example.com", "Bob <b@example.com>"):
+            msg, msg_data = build_message_data(
+                to_email, SENDER, "news", "text", "<p>html</p>"
+            )
+            self.assertEqual(
+                _boundaries(template.render(to_email)), _boundaries(msg_data)
+            )
+
+    def test_render_signs_each_copy(self):
+        directory = tempfile.mkdtemp()
+        try:
+            key_path = os.path.join(directory, "mail.key")
+            signing_key = nacl.signing.SigningKey.generate()
+            with open(key_path, "wb") as fh:
+                fh.write(base64.b64encode(bytes(signing_key)))
+            template = MessageTemplate(
+                SENDER, "news", "text", "<p>html</p>", key_path, "mail"
+            )
+            msg_data = template.render(
+                "a@example.com", {"List-Unsubscribe": "<https://example.com/u/a>"}
+            )
+        finally:
+            shutil.rmtree(directory)
+        self.assertIn(b"\nTo: a@example.com\nList-Unsubscribe:", msg_data)
+        self.assertTrue(
+            dkim.verify(
+                msg_data, dnsfunc=lambda name, timeout=5: _dns_record(signing_key)
+            )
+        )
+
+
+class TestSendBulkEmail(unittest.TestCase, object):
+    def test_send_bulk_email(self):
+        recipients = ["to{}@example.com".format(i) for i in range(10)]
+        recipients[3] = ("to3@example.com", {"X-Campaign": "3"})
+        pool = SMTPPool()
+        with SMTPStub() as stub:
+            stub.refuse.add("to5@example.com")
+            results = send_bulk_email(
+                recipients, SENDER, "news", "text", "html", stub.relay, pool=pool
+            )
+            pool.close()
+        self.assertEqual(stub.connections, 1)
+        self.assertEqual(len(stub.messages), 9)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(
+            [to for to, error in results.items() if error], ["to5@example.com"]
+        )
+        self.assertIn(b"X-Campaign: 3", stub.messages[3][2])
+
+    def test_envelope_size_groups_recipients(self):
+        recipients = ["to{}@example.com".format(i) for i in range(10)]
+        recipients[0] = ("to0@example.com", {"X-Campaign": "0"})
+        pool = SMTPPool()
+        with SMTPStub() as stub:
+            results = send_bulk_email(
+                recipients,
+                SENDER,
+                "news",
+                "text",
+                "html",
+                stub.relay,
+                envelope_size=4,
+                pool=pool,
+            )
+            pool.close()
+        self.assertFalse(any(results.values()))
+        self.assertEqual(
+            [len(rcpt_tos) for _, rcpt_tos, _ in stub.messages], [1, 4, 4, 1]
+        )
+        self.assertIn(b"To: undisclosed-recipients:;", stub.messages[1][2])
+
+    def test_dropped_idle_connection_is_replaced(self):
+        pool = SMTPPool(check_interval=60)
+        recipients = ["a@example.com", "b@example.com", "c@example.com"]
+        with SMTPStub() as stub:
+            send_bulk_email(
+                recipients[:1], SENDER, "news", "t", "h", stub.relay, pool=pool
+            )
+            stub.drop_connections()
+            results = send_bulk_email(
+                recipients, SENDER, "news", "t", "h", stub.relay, pool=pool
+            )
+            pool.close()
+        self.assertEqual(results, dict.fromkeys(recipients))
+        self.assertEqual(len(stub.messages), 4)
+        self.assertEqual(pool.stats()["reconnects"], 1)
+
+    def test_relay_down_fails_every_recipient(self):
+        with SMTPStub() as stub:
+            relay = stub.relay
+        results = send_bulk_email(
+            ["a@example.com", "b@example.com"],
+            SENDER,
+            "news",
+            "t",
+            "h",
+            relay,
+            pool=SMTPPool(),
+        )
+        self.assertEqual(sorted(results), ["a@example.com", "b@example.com"])
+        self.assertTrue(all(isinstance(e, OSError) for e in results.values()))
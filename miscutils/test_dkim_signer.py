@@ -0,0 +1,94 @@
+from .dkim_signer import DKIMSigner, get_signer
+
+from .mail import build_message, message_bytes, build_message_data
+
+from unittest import mock
+
+import nacl.signing
+
+import tempfile
+
+import base64
+
+import shutil
+
+import dkim
+
+import os
+
+import unittest
+
+SENDER = "no-reply@example.com"
+
+
+def _dns_record(signing_key):
+    public_key = base64.b64encode(bytes(signing_key.verify_key))
+    return b"v=DKIM1; k=ed25519; p=" + public_key
+
+
+class TestDKIMSigner(unittest.TestCase, object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.key_path = os.path.join(self.directory, "mail.key")
+        self.signing_key = self.write_key()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_key(self, mtime=None):
+        signing_key = nacl.signing.SigningKey.generate()
+        with open(self.key_path, "wb") as fh:
+            fh.write(base64.b64encode(bytes(signing_key)))
+        if mtime is not None:
+            os.utime(self.key_path, (mtime, mtime))
+        return signing_key
+
+    def verify(self, msg_data, signing_key):
+        def dnsfunc(name, timeout=5):
+            self.assertEqual(name, b"mail._domainkey.example.com.")
+            return _dns_record(signing_key)
+
+        return dkim.verify(msg_data, dnsfunc=dnsfunc)
+
+    def test_same_as_dkim_sign(self):
+        msg_data = message_bytes(
+            build_message("to@example.com", SENDER, "hi", "a", "b")
+        )
+        signer = DKIMSigner(self.key_path, "mail", "example.com")
+        with open(self.key_path, "rb") as fh:
+            privkey = fh.read()
+        with mock.patch("time.time", return_value=1600000000):
+            self.assertEqual(
+                signer.sign(msg_data),
+                dkim.sign(
+                    msg_data,
+                    b"mail",
+                    b"example.com",
+                    privkey,
+                    include_headers=[b"To", b"From", b"Subject"],
+                    signature_algorithm=b"ed25519-sha256",
+                ),
+            )
+
+    def test_signed_email_verifies(self):
+        msg, msg_data = build_message_data(
+            "to@example.com", SENDER, "hi", "text", "<p>html</p>", self.key_path, "mail"
+        )
+        self.assertTrue(self.verify(msg_data, self.signing_key))
+        self.assertTrue(self.verify(message_bytes(msg), self.signing_key))
+
+    def test_key_is_loaded_once_and_reloaded_on_change(self):
+        signer = get_signer(self.key_path, "mail", "example.com")
+        self.assertIs(signer, get_signer(self.key_path, b"mail", b"example.com"))
+        msg_data = message_bytes(
+            build_message("to@example.com", SENDER, "hi", "a", "b")
+        )
+        for i in range(3):
+            self.assertTrue(
+                self.verify(signer.sign(msg_data) + msg_data, self.signing_key)
+            )
+        self.assertEqual(signer.loads, 1)
+
+        rotated_key = self.write_key(mtime=os.stat(self.key_path).st_mtime + 60)
+        self.assertTrue(self.verify(signer.sign(msg_data) + msg_data, rotated_key))
+        self.assertEqual(signer.loads, 2)
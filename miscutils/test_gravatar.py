@@ -0,0 +1,61 @@
+from .gravatar import (
+    gravatar_cache,
+    email_hash,
+    gravatar_client,
+    gravatar_many,
+    normalize_email,
+)
+
+from hashlib import md5
+
+import unittest
+
+# the md5 of "jane@example.com".
+JANE = md5(b"jane@example.com").hexdigest()
+
+
+class TestGravatar(unittest.TestCase, object):
+    def setUp(self):
+        gravatar_cache.clear()
+
+    def test_gravatar_client(self):
+        self.assertEqual(
+            gravatar_client("jane@example.com"),
+            "https://secure.gravatar.com/avatar/{}?s=48&r=g&d=retro".format(JANE),
+        )
+        self.assertEqual(
+            gravatar_client("jane@example.com", 80, "pg", "identicon", True),
+            "https://secure.gravatar.com/avatar/{}?s=80&r=pg&d=identicon&f=y".format(
+                JANE
+            ),
+        )
+
+    def test_normalize_email(self):
+        self.assertEqual(normalize_email(" Jane@Example.COM\n"), "jane@example.com")
+        self.assertEqual(normalize_email(b"Jane@Example.com"), "jane@example.com")
+        for email in ("Jane@Example.com ", b"jane@example.com", "JANE@EXAMPLE.COM"):
+            self.assertEqual(email_hash(email), JANE)
+
+    def test_hashes_are_cached(self):
+        email_hash("jane@example.com")
+        email_hash("jane@example.com")
+        self.assertEqual(len(gravatar_cache), 1)
+        gravatar_cache.maxsize = 2
+        try:
+            for i in range(5):
+                email_hash("user{}@example.com".format(i))
+            self.assertEqual(len(gravatar_cache), 2)
+        finally:
+            gravatar_cache.maxsize = 4096
+
+    def test_gravatar_many(self):
+        emails = ["jane@example.com", "Bob@Example.com", "jane@example.com"]
+        self.assertEqual(
+            gravatar_many(emails, size=32, force_default=True),
+            [gravatar_client(e, size=32, force_default=True) for e in emails],
+        )
+        self.assertEqual(gravatar_many([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
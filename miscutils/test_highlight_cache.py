@@ -0,0 +1,76 @@
+from markdown import markdown
+
+from .sanitize_html import markdown_extensions, markdown_to_raw_html
+
+from .highlight_cache import HighlightCache, HighlightCacheExtension, warm_up
+
+import unittest
+
+CODE_BLOCKS = [
+    "```python\ndef f(x):\n    return x < 1\n```",
+    "```\nimport os\nprint(os.getcwd())\n```",
+    "```nosuchlang\nfoo = 1\n```",
+    '~~~ {.python hl_lines="1"}\na = 1\n~~~',
+    "    #!/usr/bin/env python\n    print(1)",
+    "    plain indented code",
+]
+
+EXTENSIONS = ["markdown.extensions.codehilite", "markdown.extensions.fenced_code"]
+
+
+class TestHighlightCache(unittest.TestCase, object):
+    def test_same_as_codehilite(self):
+        cache = HighlightCache()
+        extensions = EXTENSIONS + [HighlightCacheExtension(cache=cache)]
+        for data in CODE_BLOCKS:
+            expected = markdown(data, extensions=EXTENSIONS)
+            self.assertEqual(markdown(data, extensions=extensions), expected)
+            self.assertEqual(markdown(data, extensions=extensions), expected)
+        self.assertEqual(cache.hits, len(CODE_BLOCKS))
+        self.assertEqual(cache.misses, len(CODE_BLOCKS))
+
+    def test_attrs_same_as_codehilite(self):
+        extensions = EXTENSIONS + ["markdown.extensions.attr_list"]
+        for data in (
+            "```{.python .wide #first}\nx = 1\n```",
+            "```{ .python use_pygments=false }\n<b>&amp;\n```",
+            "```{.python\nnot a fence\n```",
+        ):
+            expected = markdown(data, extensions=extensions)
+            cached = extensions + [HighlightCacheExtension(cache=HighlightCache())]
+            self.assertEqual(markdown(data, extensions=cached), expected)
+
+    def test_extension_replaces_default(self):
+        def cache_extensions(extensions):
+            return [e for e in extensions if isinstance(e, HighlightCacheExtension)]
+
+        extension = HighlightCacheExtension(guess_max_chars=10)
+        self.assertEqual(cache_extensions(markdown_extensions([extension])), [extension])
+        self.assertEqual(len(cache_extensions(markdown_extensions())), 1)
+
+    def test_options_change_the_key(self):
+        cache = HighlightCache()
+        data = CODE_BLOCKS[0]
+        markdown(data, extensions=EXTENSIONS + [HighlightCacheExtension(cache=cache)])
+        markdown(
+            data,
+            extensions=EXTENSIONS + [HighlightCacheExtension(cache=cache)],
+            extension_configs={"markdown.extensions.codehilite": {"linenums": True}},
+        )
+        self.assertEqual(cache.misses, 2)
+
+    def test_guess_max_chars(self):
+        cache = HighlightCache()
+        code = "#!/usr/bin/env python\n" + "\n".join(
+            "def f{}(x):\n    return x".format(i) for i in range(500)
+        )
+        extension = HighlightCacheExtension(cache=cache, guess_max_chars=200)
+        html = markdown_to_raw_html("```\n{}\n```".format(code), [extension])
+        self.assertIn('<span class="k">def</span>', html)
+        (timing,) = cache.slowest()
+        self.assertEqual(timing.lang, "python")
+        self.assertEqual(timing.chars, len(code))
+        self.assertTrue(timing.guessed)
+
+    def test_warm_up(self):
+        self.assertEqual(warm_up(["python", "nosuchlang"]), ["python"])
@@ -0,0 +1,101 @@
+import importlib
+
+import os
+
+import subprocess
+
+import sys
+
+import unittest
+
+# the package under test, `miscutils` or `package.miscutils`.
+PACKAGE = __name__.rpartition(".")[0]
+
+# startup budget in microseconds for the light modules, measured cumulative
+# with `python -X importtime`, about 12ms on a laptop.
+BUDGET_US = 60000
+
+# dependencies which took 10 to 120ms each to import.
+HEAVY = frozenset(
+    [
+        "ago",
+        "bleach",
+        "bs4",
+        "dkim",
+        "markdown",
+        "miniuri",
+        "multiprocessing",
+        "numpy",
+        "pygments",
+    ]
+)
+
+
+def import_times(module):
+    """Returns {module name: cumulative microseconds} importing `module`."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        env=env,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+class TestImportTime(unittest.TestCase, object):
+    def check_imports(self, name, budget_us=None, heavy=HEAVY):
+        module = PACKAGE if name is None else "{}.{}".format(PACKAGE, name)
+        # best of 3, a busy machine only ever makes imports slower.
+        runs = [import_times(module) for i in range(3)]
+        for times in runs:
+            loaded = {top.split(".")[0] for top in times}
+            self.assertFalse(loaded & heavy, module)
+        if budget_us is not None:
+            self.assertLess(min(times[module] for times in runs), budget_us)
+
+    def test_light_modules(self):
+        for name in (None, "phone_numbers", "uuid_validation", "tokens"):
+            self.check_imports(name, BUDGET_US)
+
+    def test_deferred_dependencies(self):
+        self.check_imports("money", BUDGET_US)
+        self.check_imports("mail", heavy={"dkim"})
+        self.check_imports(
+            "sanitize_html", heavy={"bs4", "markdown", "miniuri", "pygments"}
+        )
+
+    def test_lazy_attributes(self):
+        package = importlib.import_module(PACKAGE)
+        from ago import human
+
+        self.assertIs(package.human, human)
+        self.assertIs(package.money, importlib.import_module(PACKAGE + ".money"))
+        self.assertIn("phone_numbers", dir(package))
+        with self.assertRaises(AttributeError):
+            package.missing
+
+        sanitize_html = importlib.import_module(PACKAGE + ".sanitize_html")
+        from bs4 import BeautifulSoup
+        from bs4.builder import HTMLTreeBuilder
+
+        self.assertIs(sanitize_html.BeautifulSoup, BeautifulSoup)
+        self.assertIs(
+            sanitize_html.MULTI_VALUED_ATTRS,
+            HTMLTreeBuilder.DEFAULT_CDATA_LIST_ATTRIBUTES,
+        )
+        self.assertTrue(callable(sanitize_html.markdown))
+        self.assertEqual(sanitize_html.miniuri.__name__, "miniuri")
+        with self.assertRaises(AttributeError):
+            sanitize_html.missing
+
+
+if __name__ == "__main__":
+    unittest.main()
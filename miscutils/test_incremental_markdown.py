@@ -0,0 +1,85 @@
+from .sanitize_html import SanitizePolicy, clean_raw_html, markdown_to_raw_html
+
+from .incremental_markdown import IncrementalRenderer, split_blocks
+
+import unittest
+
+BLOCKS = [
+    "# Title",
+    "Some *emph* text with a [link](http://example.com) and <b>raw</b> & stuff.",
+    "```python\ndef f(x):\n\n    return x < 1\n```",
+    "> quote\n> more",
+    "- item\n- item two\n    - nested",
+    "1. one\n2. two",
+    "<div>raw html</div>",
+    '<script type="math/tex">x^2</script>',
+    "    indented code",
+    "Visit https://example.com/?a=1&b=2 now",
+    "---",
+    "<table><tr><td>cell</td></tr></table>",
+]
+
+TAG_ACL = {"script": [("type", "math/tex", "allow")]}
+
+
+def _documents():
+    for i in range(len(BLOCKS)):
+        rotated = BLOCKS[i:] + BLOCKS[:i]
+        yield "\n\n".join(rotated)
+        yield "\n\n\n".join(reversed(rotated))
+
+
+class TestIncrementalMarkdown(unittest.TestCase, object):
+    def test_split_blocks(self):
+        self.assertEqual(split_blocks("a\nb\n\n# c"), ["a\nb", "# c"])
+        self.assertEqual(split_blocks("```\na\n\nb\n```"), ["```\na\n\nb\n```"])
+        self.assertEqual(split_blocks("- a\n\n- b\n\n    c"), ["- a\n\n- b\n\n    c"])
+
+    def test_split_blocks_cross_block_changes(self):
+        self.assertIsNone(split_blocks("a\n\n```\nunclosed fence"))
+        self.assertIsNone(split_blocks("[a][1]\n\n[1]: http://example.com"))
+        self.assertIsNone(split_blocks("<div>\n\nraw html</div>"))
+        self.assertIsNone(split_blocks("text <b>bold\n\nmore</b>"))
+        self.assertEqual(split_blocks("a <br> b\n\nc"), ["a <br> b", "c"])
+
+    def test_same_as_full_render(self):
+        for options in [{}, {"tag_acl": TAG_ACL}, {"single_pass": True}]:
+            policy = SanitizePolicy(**options)
+            renderer = IncrementalRenderer(policy)
+            for data in _documents():
+                self.assertEqual(
+                    renderer.render(data),
+                    clean_raw_html(markdown_to_raw_html(data), policy),
+                )
+            # only documents which start with a <head> only block.
+            self.assertLessEqual(renderer.full_renders, 2)
+
+    def test_only_changed_blocks_render(self):
+        renderer = IncrementalRenderer()
+        data = "\n\n".join(BLOCKS)
+        renderer.render(data)
+        misses = renderer.cache.misses
+        edited = data.replace("quote\n> more", "quote\n> edited")
+        self.assertEqual(
+            renderer.render(edited),
+            clean_raw_html(markdown_to_raw_html(edited), renderer.cleaner),
+        )
+        self.assertEqual(renderer.cache.misses, misses + 1)
+
+    def test_full_render_fallback(self):
+        renderer = IncrementalRenderer()
+        data = "[a][1]\n\n[1]: http://example.com"
+        self.assertIn('href="http://example.com"', renderer.render(data))
+        renderer.render("# Title\n\n```\nunclosed fence")
+        self.assertEqual(renderer.full_renders, 2)
+
+        for data in ["text <b>bold\n\n# Title\n\nmore", "a <span>b\n\n- c\n\n</span>"]:
+            self.assertEqual(
+                renderer.render(data),
+                clean_raw_html(markdown_to_raw_html(data), renderer.cleaner),
+            )
+        self.assertEqual(renderer.full_renders, 4)
+
+        renderer = IncrementalRenderer(extra_extensions=["markdown.extensions.toc"])
+        renderer.render("# a\n\n# a")
+        self.assertEqual(renderer.full_renders, 1)
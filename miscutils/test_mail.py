@@ -0,0 +1,209 @@
+from .mail import build_message, send_email
+
+from .smtp_pool import SMTPPool
+
+from collections import Counter
+
+import smtplib
+
+import socketserver
+
+import threading
+
+import unittest
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.sockets.append(self.request)
+        self.reply("220 stub ESMTP")
+        mail_from, rcpt_tos = None, []
+        for line in self.rfile:
+            command = line.decode("ascii").strip()
+            verb = command.split(" ")[0].split(":")[0].upper()
+            with server.lock:
+                server.commands[verb] += 1
+            if verb in ("EHLO", "HELO", "NOOP"):
+                self.reply("250 stub")
+            elif verb == "RSET":
+                mail_from, rcpt_tos = None, []
+                self.reply("250 OK")
+            elif verb == "MAIL":
+                mail_from = command.split(":", 1)[1].split()[0].strip("<>")
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_to = command.split(":", 1)[1].split()[0].strip("<>")
+                if rcpt_to in server.refuse:
+                    self.reply("550 no such user")
+                elif rcpt_to in server.shut_down:
+                    server.shut_down.discard(rcpt_to)
+                    self.reply("421 shutting down")
+                    return
+                else:
+                    rcpt_tos.append(rcpt_to)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end with .")
+                lines = []
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                    if data_line.startswith(b".."):
+                        data_line = data_line[1:]
+                    lines.append(data_line)
+                with server.lock:
+                    server.messages.append((mail_from, rcpt_tos, b"".join(lines)))
+                mail_from, rcpt_tos = None, []
+                self.reply("250 queued")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 unknown command")
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """An in-process SMTP relay which records connections and messages."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        socketserver.ThreadingTCPServer.__init__(
+            self, ("127.0.0.1", 0), SMTPStubHandler
+        )
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.commands = Counter()
+        self.messages = []
+        self.sockets = []
+        self.refuse = set()
+        # recipients which close the connection with 421 once.
+        self.shut_down = set()
+        self.relay = "127.0.0.1:{}".format(self.server_address[1])
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.drop_connections()
+        self.server_close()
+
+    def drop_connections(self):
+        """Close every client connection, like a relay restart."""
+        with self.lock:
+            sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            try:
+                sock.shutdown(2)
+            except OSError:
+                pass
+
+
+class TestMail(unittest.TestCase, object):
+    def test_build_message(self):
+        msg = build_message("to@example.com", "from@example.com", "hi", b"text", "html")
+        self.assertEqual(msg["To"], "to@example.com")
+        self.assertEqual(
+            [part.get_content_type() for part in msg.get_payload()],
+            ["text/plain", "text/html"],
+        )
+
+    def test_send_email_reuses_connection(self):
+        pool = SMTPPool()
+        with SMTPStub() as stub:
+            for i in range(5):
+                send_email(
+                    "to{}@example.com".format(i),
+                    "from@example.com",
+                    "subject {}".format(i),
+                    "text",
+                    "<p>html</p>",
+                    relay=stub.relay,
+                    pool=pool,
+                )
+            pool.close()
+        self.assertEqual(stub.connections, 1)
+        self.assertEqual(stub.commands["EHLO"], 1)
+        self.assertEqual(len(stub.messages), 5)
+        self.assertEqual(stub.messages[4][1], ["to4@example.com"])
+        self.assertIn(b"Subject: subject 4", stub.messages[4][2])
+
+
+class TestSMTPPool(unittest.TestCase, object):
+    def sendmail(self, pool, relay, to_email="to@example.com"):
+        return pool.sendmail(
+            relay, "from@example.com", [to_email], b"Subject: x\r\n\r\nx"
+        )
+
+    def test_pool_size_bounds_connections(self):
+        pool = SMTPPool(size=2)
+        with SMTPStub() as stub:
+            threads = [
+                threading.Thread(target=self.sendmail, args=(pool, stub.relay))
+                for i in range(20)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            pool.close()
+        self.assertLessEqual(stub.connections, 2)
+        self.assertEqual(len(stub.messages), 20)
+
+    def test_reconnect_after_relay_drops_connection(self):
+        pool = SMTPPool(check_interval=60)
+        with SMTPStub() as stub:
+            self.sendmail(pool, stub.relay)
+            stub.drop_connections()
+            self.sendmail(pool, stub.relay)
+            pool.close()
+        self.assertEqual(stub.connections, 2)
+        self.assertEqual(len(stub.messages), 2)
+        self.assertEqual(pool.stats()["reconnects"], 1)
+
+    def test_connection_checks_reused_connection(self):
+        pool = SMTPPool(check_interval=60)
+        with SMTPStub() as stub:
+            self.sendmail(pool, stub.relay)
+            stub.drop_connections()
+            with pool.connection(stub.relay) as connection:
+                connection.sendmail("from@example.com", ["to@example.com"], b"x")
+            with pool.checkout(stub.relay) as (connection, reused):
+                self.assertTrue(reused)
+            with pool.checkout(stub.relay, fresh=True) as (connection, reused):
+                self.assertFalse(reused)
+            pool.close()
+        self.assertEqual(stub.connections, 3)
+        self.assertEqual(len(stub.messages), 2)
+        self.assertEqual(pool.stats()["reconnects"], 1)
+
+    def test_health_check_and_idle_timeout(self):
+        pool = SMTPPool(check_interval=0)
+        with SMTPStub() as stub:
+            self.sendmail(pool, stub.relay)
+            self.sendmail(pool, stub.relay)
+            self.assertEqual(stub.commands["NOOP"], 1)
+            pool.idle_timeout = 0
+            self.sendmail(pool, stub.relay)
+            pool.close()
+        self.assertEqual(stub.connections, 2)
+
+    def test_refused_recipient_keeps_connection(self):
+        pool = SMTPPool()
+        with SMTPStub() as stub:
+            stub.refuse.add("nobody@example.com")
+            with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                self.sendmail(pool, stub.relay, "nobody@example.com")
+            self.sendmail(pool, stub.relay)
+            pool.close()
+        self.assertEqual(stub.connections, 1)
+        self.assertEqual(len(stub.messages), 1)
@@ -0,0 +1,109 @@
+from .mail_async import (
+    AsyncSMTPPool,
+    get_default_pool,
+    send_bulk_email_async,
+    send_email_async,
+    split_relay,
+)
+
+from .test_mail import SMTPStub
+
+import asyncio
+
+import smtplib
+
+import unittest
+
+SENDER = "from@example.com"
+
+
+class TestMailAsync(unittest.TestCase, object):
+    def test_split_relay(self):
+        self.assertEqual(split_relay("localhost"), ("localhost", 25))
+        self.assertEqual(split_relay("127.0.0.1:2525"), ("127.0.0.1", 2525))
+
+    def test_send_email_async_reuses_connection(self):
+        async def main(relay):
+            for i in range(5):
+                await send_email_async(
+                    "to{}@example.com".format(i),
+                    SENDER,
+                    "subject {}".format(i),
+                    "text\n.leading dot\n",
+                    "<p>html</p>",
+                    relay=relay,
+                )
+            self.assertIs(get_default_pool(), get_default_pool())
+            await get_default_pool().close()
+
+        with SMTPStub() as stub:
+            asyncio.run(main(stub.relay))
+        self.assertEqual(stub.connections, 1)
+        self.assertEqual(stub.commands["EHLO"], 1)
+        self.assertEqual(len(stub.messages), 5)
+        self.assertEqual(stub.messages[4][1], ["to4@example.com"])
+        self.assertIn(b"Subject: subject 4\r\n", stub.messages[4][2])
+        self.assertIn(b"\r\n.leading dot\r\n", stub.messages[4][2])
+
+    def test_pool_size_bounds_connections(self):
+        async def main(relay):
+            pool = AsyncSMTPPool(size=2)
+            await asyncio.gather(
+                *(
+                    pool.sendmail(relay, SENDER, ["to@example.com"], b"Subject: x\n\nx")
+                    for i in range(20)
+                )
+            )
+            await pool.close()
+
+        with SMTPStub() as stub:
+            asyncio.run(main(stub.relay))
+        self.assertEqual(stub.connections, 2)
+        self.assertEqual(len(stub.messages), 20)
+
+    def test_reconnect_and_refused(self):
+        async def main(stub):
+            pool = AsyncSMTPPool(check_interval=60)
+            await pool.sendmail(stub.relay, SENDER, ["a@example.com"], b"x")
+            stub.drop_connections()
+            await pool.sendmail(stub.relay, SENDER, ["a@example.com"], b"x")
+            with self.assertRaises(smtplib.SMTPRecipientsRefused):
+                await pool.sendmail(stub.relay, SENDER, ["nobody@example.com"], b"x")
+            await pool.sendmail(stub.relay, SENDER, ["a@example.com"], b"x")
+            await pool.close()
+            return pool.stats()
+
+        with SMTPStub() as stub:
+            stub.refuse.add("nobody@example.com")
+            stats = asyncio.run(main(stub))
+        self.assertEqual(stub.connections, 2)
+        self.assertEqual(len(stub.messages), 3)
+        self.assertEqual(stats["reconnects"], 1)
+
+    def test_send_bulk_email_async(self):
+        recipients = ["to{}@example.com".format(i) for i in range(30)]
+        recipients[7] = ("to7@example.com", {"X-Campaign": "7"})
+
+        async def main(relay):
+            pool = AsyncSMTPPool(size=3)
+            results = await send_bulk_email_async(
+                recipients, SENDER, "news", "text", "html", relay, pool=pool
+            )
+            await pool.close()
+            return results
+
+        with SMTPStub() as stub:
+            stub.refuse.add("to5@example.com")
+            results = asyncio.run(main(stub.relay))
+        self.assertEqual(stub.connections, 3)
+        self.assertEqual(len(stub.messages), 29)
+        self.assertEqual(len(results), 30)
+        self.assertEqual(
+            [to for to, error in results.items() if error], ["to5@example.com"]
+        )
+        campaign = [
+            data
+            for _, rcpt_tos, data in stub.messages
+            if rcpt_tos == ["to7@example.com"]
+        ]
+        self.assertIn(b"X-Campaign: 7\r\n", campaign[0])
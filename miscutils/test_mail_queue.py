@@ -0,0 +1,145 @@
+from .mail_queue import MailQueue
+
+from .smtp_pool import SMTPPool
+
+from .test_mail import SMTPStub
+
+import tempfile
+
+import shutil
+
+import os
+
+import unittest
+
+
+class FlakyPool(SMTPPool):
+    """A pool whose first `failures` connection attempts are refused."""
+
+    def __init__(self, failures, **kwargs):
+        SMTPPool.__init__(self, **kwargs)
+        self.failures = failures
+
+    def _connect(self, relay):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionRefusedError("relay is down")
+        return SMTPPool._connect(self, relay)
+
+
+class TestMailQueue(unittest.TestCase, object):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def send(self, queue, relay, count):
+        for i in range(count):
+            queue.send_email(
+                "to{}@example.com".format(i),
+                "from@example.com",
+                "subject {}".format(i),
+                "text",
+                "<p>html</p>",
+                relay=relay,
+            )
+
+    def test_batches_share_one_connection(self):
+        pool = SMTPPool()
+        queue = MailQueue(pool=pool, workers=1, batch_size=50)
+        with SMTPStub() as stub:
+            self.send(queue, stub.relay, 10)
+            self.assertEqual(queue.stats()["depth"], 10)
+            queue.start()
+            self.assertTrue(queue.join(timeout=10))
+            queue.stop()
+            pool.close()
+        self.assertEqual(stub.connections, 1)
+        self.assertEqual(len(stub.messages), 10)
+        stats = queue.stats()
+        self.assertEqual(stats["sent"], 10)
+        self.assertEqual(stats["depth"], 0)
+        self.assertGreater(stats["latency_max"], 0)
+
+    def test_retry_with_backoff_until_relay_is_up(self):
+        pool = FlakyPool(failures=2)
+        queue = MailQueue(pool=pool, backoff=0.01)
+        with SMTPStub() as stub:
+            queue.start()
+            self.send(queue, stub.relay, 3)
+            self.assertTrue(queue.join(timeout=10))
+            queue.stop()
+            pool.close()
+        self.assertEqual(len(stub.messages), 3)
+        self.assertEqual(queue.stats()["retries"], 2)
+        self.assertEqual(queue.stats()["sent"], 3)
+
+    def test_dropped_idle_connection_costs_no_attempt(self):
+        pool = SMTPPool(check_interval=60)
+        queue = MailQueue(pool=pool, workers=1, backoff=10)
+        with SMTPStub() as stub:
+            queue.start()
+            self.send(queue, stub.relay, 1)
+            self.assertTrue(queue.join(timeout=10))
+            stub.drop_connections()
+            self.send(queue, stub.relay, 3)
+            self.assertTrue(queue.join(timeout=10))
+            queue.stop()
+            pool.close()
+        self.assertEqual(len(stub.messages), 4)
+        self.assertEqual(stub.connections, 2)
+        self.assertEqual(queue.stats()["retries"], 0)
+        self.assertEqual(pool.stats()["reconnects"], 1)
+
+    def test_session_closed_mid_batch(self):
+        pool = SMTPPool()
+        queue = MailQueue(pool=pool, workers=1, backoff=0.01)
+        with SMTPStub() as stub:
+            stub.shut_down.add("to2@example.com")
+            self.send(queue, stub.relay, 5)
+            queue.start()
+            self.assertTrue(queue.join(timeout=10))
+            queue.stop()
+            pool.close()
+        self.assertEqual(len(stub.messages), 5)
+        self.assertEqual(stub.connections, 2)
+        stats = queue.stats()
+        self.assertEqual(stats["sent"], 5)
+        # only the message the relay closed the session on.
+        self.assertEqual(stats["retries"], 1)
+
+    def test_permanent_failure_is_dropped(self):
+        pool = SMTPPool()
+        queue = MailQueue(pool=pool, spool_dir=self.spool_dir)
+        with SMTPStub() as stub:
+            stub.refuse.add("to1@example.com")
+            queue.start()
+            self.send(queue, stub.relay, 3)
+            self.assertTrue(queue.join(timeout=10))
+            queue.stop()
+            pool.close()
+        self.assertEqual(len(stub.messages), 2)
+        self.assertEqual(queue.stats()["failed"], 1)
+        self.assertEqual(queue.stats()["retries"], 0)
+        self.assertEqual(os.listdir(os.path.join(self.spool_dir, "new")), [])
+        self.assertEqual(len(os.listdir(os.path.join(self.spool_dir, "failed"))), 1)
+
+    def test_spool_survives_restart(self):
+        with SMTPStub() as stub:
+            # queued but never delivered, like a process killed at start up.
+            self.send(MailQueue(spool_dir=self.spool_dir), stub.relay, 4)
+            self.assertEqual(len(os.listdir(os.path.join(self.spool_dir, "new"))), 4)
+
+            pool = SMTPPool()
+            queue = MailQueue(pool=pool, spool_dir=self.spool_dir)
+            self.assertEqual(queue.depth(), 4)
+            queue.start()
+            self.assertTrue(queue.join(timeout=10))
+            queue.stop()
+            pool.close()
+        self.assertEqual(
+            sorted(rcpt_tos[0] for _, rcpt_tos, _ in stub.messages),
+            ["to{}@example.com".format(i) for i in range(4)],
+        )
+        self.assertEqual(os.listdir(os.path.join(self.spool_dir, "new")), [])
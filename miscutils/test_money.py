@@ -0,0 +1,148 @@
+from .money import (
+    cents_to_decimal,
+    cents_to_dollars_csv,
+    cents_to_dollars_many,
+    dollars_to_cents,
+    dollars_to_cents_csv,
+    dollars_to_cents_many,
+    format_cents,
+    format_cents_many,
+)
+
+from decimal import ROUND_DOWN, ROUND_HALF_UP, Decimal
+
+from unittest import mock
+
+import io
+
+import random
+
+import sys
+
+import unittest
+
+import numpy as np
+
+# property checks run on this many random values, seeded to be repeatable.
+EXAMPLES = 5000
+
+
+def _random_cents(rnd):
+    digits = rnd.choice([1, 2, 3, 5, 8, 12, 15])
+    cents = rnd.randrange(10**digits)
+    return -cents if rnd.random() < 0.3 else cents
+
+
+def _spellings(cents):
+    """Returns ways of writing `cents` as dollars."""
+    dollars, rest = divmod(abs(cents), 100)
+    sign = "-" if cents < 0 else ""
+    spellings = [
+        "{}{}.{:02d}".format(sign, dollars, rest),
+        " {}{}.{:02d}0 ".format(sign or "+", dollars, rest),
+    ]
+    if dollars == 0:
+        spellings.append("{}.{:02d}".format(sign, rest))
+    if rest == 0:
+        spellings += ["{}{}".format(sign, dollars), "{}{}.".format(sign, dollars)]
+    if rest % 10 == 0:
+        spellings.append("{}{}.{}".format(sign, dollars, rest // 10))
+        spellings.append("{}{}.{} ".format(sign, dollars, rest // 10))
+        spellings.append("{}{}.{}\n".format(sign, dollars, rest // 10))
+        if dollars == 0:
+            spellings.append(" {}.{}".format(sign, rest // 10))
+            spellings.append("{}.{}\t".format(sign, rest // 10))
+    return spellings
+
+
+class TestMoney(unittest.TestCase, object):
+    def setUp(self):
+        rnd = random.Random(23)
+        self.cents = [_random_cents(rnd) for i in range(EXAMPLES)]
+        self.cents += [0, 1, -1, 29, 115, 10**17]
+
+    def test_strings_are_exact(self):
+        for cents in self.cents:
+            for dollars in _spellings(cents):
+                self.assertEqual(dollars_to_cents(dollars), cents, dollars)
+            self.assertEqual(dollars_to_cents(format_cents(cents)), cents)
+            self.assertEqual(cents_to_decimal(cents) * 100, cents)
+
+    def test_floats_are_exact(self):
+        for cents in self.cents:
+            if abs(cents) < 10**15:
+                dollars = float(format_cents(cents))
+                self.assertEqual(dollars_to_cents(dollars), cents, dollars)
+        self.assertEqual(dollars_to_cents(1.15), 115)
+        self.assertEqual(dollars_to_cents(0.29), 29)
+
+    def test_sub_cent_digits(self):
+        rnd = random.Random(5)
+        for i in range(EXAMPLES):
+            value = Decimal(rnd.randrange(-(10**9), 10**9)).scaleb(-rnd.randrange(6))
+            for rounding in (ROUND_DOWN, ROUND_HALF_UP):
+                expected = int((value * 100).to_integral_value(rounding=rounding))
+                self.assertEqual(dollars_to_cents(value, rounding), expected)
+                self.assertEqual(dollars_to_cents(str(value), rounding), expected)
+        self.assertEqual(dollars_to_cents("1.999"), 199)
+        self.assertEqual(dollars_to_cents("-1.999"), -199)
+        self.assertEqual(dollars_to_cents("1.995", ROUND_HALF_UP), 200)
+        self.assertEqual(dollars_to_cents("1e2"), 10000)
+
+    def test_invalid(self):
+        for dollars in ("", "-", "--5", "1.2.3", "abc", "nan", float("inf"), "1,00"):
+            with self.assertRaises(ValueError):
+                dollars_to_cents(dollars)
+
+    def test_many(self):
+        strings = [format_cents(c) for c in self.cents]
+        self.assertEqual(dollars_to_cents_many(strings), self.cents)
+        self.assertEqual(
+            dollars_to_cents_many([1, "2.5", Decimal("0.29")]), [100, 250, 29]
+        )
+        array = dollars_to_cents_many(np.array(strings))
+        self.assertEqual(array.dtype, np.int64)
+        self.assertEqual(array.tolist(), self.cents)
+
+        small = [c for c in self.cents if abs(c) < 10**15]
+        floats = np.array([float(format_cents(c)) for c in small])
+        floats = np.append(floats, [1.239, -0.005, 1e14 + 0.25])
+        self.assertEqual(
+            dollars_to_cents_many(floats).tolist(),
+            [dollars_to_cents(float(f)) for f in floats],
+        )
+        self.assertEqual(dollars_to_cents_many(np.array([3, -2])).tolist(), [300, -200])
+        with self.assertRaises(ValueError):
+            dollars_to_cents_many(np.array([1.0, float("nan")]))
+
+    def test_cents_to_dollars_many(self):
+        expected = [int(c) / 100.0 for c in self.cents]
+        self.assertEqual(cents_to_dollars_many(self.cents), expected)
+        array = np.array(self.cents, dtype=np.int64)
+        self.assertEqual(cents_to_dollars_many(array).tolist(), expected)
+        self.assertEqual(
+            format_cents_many(array), [format_cents(c) for c in self.cents]
+        )
+        self.assertEqual(format_cents_many([-5, 100]), ["-0.05", "1.00"])
+
+    def test_without_numpy(self):
+        with mock.patch.dict(sys.modules, {"numpy": None}):
+            self.assertEqual(dollars_to_cents_many(["0.29", 1.15]), [29, 115])
+            self.assertEqual(cents_to_dollars_many([29]), [0.29])
+
+    def test_csv(self):
+        src = io.StringIO("id,amount,fee\n1,0.29,1.15\n2,,3\n3,-12.5\n")
+        dst = io.StringIO()
+        self.assertEqual(dollars_to_cents_csv(src, dst, ["amount", 2]), 3)
+        self.assertEqual(
+            dst.getvalue().splitlines(),
+            ["id,amount,fee", "1,29,115", "2,,300", "3,-1250"],
+        )
+        src = io.StringIO("1,29\n2,-1250\n")
+        dst = io.StringIO()
+        self.assertEqual(cents_to_dollars_csv(src, dst, [1]), 2)
+        self.assertEqual(dst.getvalue().splitlines(), ["1,0.29", "2,-12.50"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+from . import hex_color, palette
+
+from .hex_color import color_scale, contrast_ratio, darken, lighten, mix
+
+from unittest import mock
+
+import doctest
+
+import random
+
+import unittest
+
+
+def _colors(rnd, count):
+    return ["#%06x" % rnd.randrange(1 << 24) for i in range(count)]
+
+
+class TestPalette(unittest.TestCase, object):
+    def setUp(self):
+        rnd = random.Random(17)
+        self.colors = _colors(rnd, 2000) + ["#000000", "#FFFFFF", "#808080"]
+        self.others = _colors(rnd, len(self.colors))
+        self.amounts = [rnd.random() for c in self.colors]
+
+    def test_hex_color_doctests(self):
+        self.assertEqual(doctest.testmod(hex_color).failed, 0)
+
+    def test_color_scale_many_doctests(self):
+        self.assertEqual(
+            palette.color_scale_many(["#DF3C3C", "#52D24F", "#4F75D2"], [0.5, 1.6, 1]),
+            [color_scale("#DF3C3C", 0.5), color_scale("#52D24F", 1.6), "#4f75d2"],
+        )
+        self.assertEqual(
+            palette.color_scale_many(["#abc", "DF3C3C"], [1, -1]), ["abc", "DF3C3C"]
+        )
+
+    def check_same_as_hex_color(self):
+        colors, others, amounts = self.colors, self.others, self.amounts
+        self.assertEqual(
+            palette.color_scale_many(colors, [a * 3 for a in amounts]),
+            [color_scale(c, a * 3) for c, a in zip(colors, amounts)],
+        )
+        self.assertEqual(
+            palette.lighten_many(colors, amounts),
+            [lighten(c, a) for c, a in zip(colors, amounts)],
+        )
+        self.assertEqual(
+            palette.darken_many(colors, 0.1), [darken(c, 0.1) for c in colors]
+        )
+        self.assertEqual(
+            palette.mix_many(colors, others, amounts),
+            [mix(a, b, w) for a, b, w in zip(colors, others, amounts)],
+        )
+        self.assertEqual(
+            palette.contrast_ratio_many(colors, "#ffffff"),
+            [contrast_ratio(c, "#ffffff") for c in colors],
+        )
+
+    def test_numpy_same_as_hex_color(self):
+        self.assertIsNotNone(palette.np)
+        self.check_same_as_hex_color()
+
+    def test_fallback_same_as_hex_color(self):
+        with mock.patch.object(palette, "np", None):
+            self.check_same_as_hex_color()
+
+    def test_invalid_colors(self):
+        for colors in (["#12345g"], ["#1234"], ["#12345é"]):
+            with self.assertRaises(ValueError):
+                palette.lighten_many(colors, 0.1)
+        with self.assertRaises(ValueError):
+            palette.mix_many(["#000000", "#ffffff"], ["#000000"])
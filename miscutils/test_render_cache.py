@@ -0,0 +1,52 @@
+from .sanitize_html import default_cleaner
+
+from .render_cache import LRUBackend, DiskBackend, RenderCache, render_cache_key
+
+import shutil
+
+import tempfile
+
+import unittest
+
+
+class TestRenderCache(unittest.TestCase, object):
+    def test_hits_and_misses(self):
+        cache = RenderCache()
+        cleaner = default_cleaner()
+        first = cache.render("hello *world*", cleaner)
+        second = cache.render("hello *world*", cleaner)
+        self.assertEqual(first, second)
+        self.assertIn("<em>world</em>", first)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "evictions": 0})
+
+    def test_key_changes_with_cleaner_config(self):
+        cleaner = default_cleaner()
+        key = render_cache_key("[a](http://a.com)", cleaner)
+        cleaner.link_protection = True
+        self.assertNotEqual(key, render_cache_key("[a](http://a.com)", cleaner))
+
+    def test_key_changes_with_tag_acl(self):
+        key = render_cache_key("x", default_cleaner())
+        cleaner = default_cleaner({"script": [("type", "math/tex", "allow")]})
+        self.assertNotEqual(key, render_cache_key("x", cleaner))
+
+    def test_lru_eviction(self):
+        backend = LRUBackend(maxsize=2)
+        backend.set("a", "1")
+        backend.set("b", "2")
+        backend.get("a")
+        backend.set("c", "3")
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), "1")
+        self.assertEqual(backend.evictions, 1)
+
+    def test_disk_backend(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cleaner = default_cleaner()
+            html = RenderCache(DiskBackend(directory)).render("shared", cleaner)
+            cache = RenderCache(DiskBackend(directory))
+            self.assertEqual(cache.render("shared", cleaner), html)
+            self.assertEqual(cache.hits, 1)
+        finally:
+            shutil.rmtree(directory)
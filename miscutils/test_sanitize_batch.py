@@ -0,0 +1,36 @@
+from .sanitize_html import SanitizePolicy, clean_raw_html, default_cleaner
+
+from .sanitize_batch import clean_many, render_markdown_many
+
+import unittest
+
+DOCUMENTS = ["<p>post {}</p><script>alert({})</script>".format(i, i) for i in range(40)]
+
+
+class TestSanitizeBatch(unittest.TestCase, object):
+    def test_clean_many_in_process(self):
+        results = list(clean_many(DOCUMENTS, default_cleaner(), workers=0))
+        self.assertEqual([r.index for r in results], list(range(40)))
+        self.assertEqual(
+            results[3].html, clean_raw_html(DOCUMENTS[3], default_cleaner())
+        )
+
+    def test_clean_many_workers_keep_order(self):
+        policy = SanitizePolicy()
+        results = list(clean_many(DOCUMENTS, policy, workers=2, chunksize=3))
+        self.assertEqual([r.index for r in results], list(range(40)))
+        self.assertEqual(
+            [r.html for r in results], [clean_raw_html(d, policy) for d in DOCUMENTS]
+        )
+
+    def test_failures_do_not_stop_the_batch(self):
+        results = list(clean_many(["<p>a</p>", None, "<p>b</p>"], workers=2))
+        self.assertIsNone(results[0].error)
+        self.assertIsNone(results[1].html)
+        self.assertIn("TypeError", results[1].error)
+        self.assertIn("<p>b</p>", results[2].html)
+
+    def test_render_markdown_many(self):
+        results = list(render_markdown_many(["*a*", "**b**"], workers=1))
+        self.assertIn("<em>a</em>", results[0].html)
+        self.assertIn("<strong>b</strong>", results[1].html)
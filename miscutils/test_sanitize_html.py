@@ -2,8 +2,17 @@ from .sanitize_html import (
     default_tag_acl,
     default_cleaner,
     clean_raw_html,
+    conditional_tag_filter,
+    log,
+    SanitizePolicy,
 )
 
+from bs4 import BeautifulSoup
+
+import pickle
+
+import random
+
 import unittest
 
 RAW_HTML = """
@@ -19,6 +28,46 @@ RAW_HTML = """
 </html>
 """
 
+# tags of the random fragments the single pass path is checked against.
+FUZZ_TAGS = (
+    ["a", "b", "blockquote", "br", "code", "dd", "div", "dl", "dt", "em", "h1"]
+    + ["h2", "hr", "i", "img", "li", "ol", "p", "pre", "span", "table", "td"]
+    + ["tr", "ul", "button", "caption", "form", "nobr", "option", "plaintext"]
+    + ["script", "section", "select", "style", "tbody", "template", "th"]
+    + ["textarea", "xmp"]
+)
+
+# allows the tags above which are not allowed by default.
+FUZZ_TAG_ACL = {
+    tag_name: [("class", "ok", "allow")]
+    for tag_name in FUZZ_TAGS
+    if tag_name not in default_cleaner().tags
+}
+
+# <a> start tags, without an href `absolute_domain` adds one.
+LINKS = [
+    '<a title="t">',
+    '<a href="/rel" title="t">',
+    '<a rel="x" title="t">',
+    '<a href="http://evil.com/">',
+]
+
+
+def random_fragment(rnd):
+    parts = []
+    for i in range(rnd.randrange(1, 10)):
+        tag_name = rnd.choice(FUZZ_TAGS)
+        roll = rnd.random()
+        if roll < 0.1:
+            parts.append(rnd.choice(LINKS))
+        elif roll < 0.45:
+            parts.append('<{} class="ok">'.format(tag_name))
+        elif roll < 0.75:
+            parts.append("</{}>".format(tag_name))
+        else:
+            parts.append(rnd.choice(["x", " ", "\n", "a<b", "&amp;"]))
+    return "".join(parts)
+
 
 class SanitizeHtml(unittest.TestCase, object):
     def test_default_tag_acl(self):
@@ -54,3 +103,152 @@ class SanitizeHtml(unittest.TestCase, object):
             '<script type="unknown-hacker">alert("This javascript tag/type was allowed.");</script>',
             clean_html,
         )
+
+    def test_repeated_calls_do_not_grow_cleaner(self):
+        cleaner = default_cleaner()
+        clean_raw_html("<p>one</p>", cleaner)
+        filters = len(cleaner.filters)
+        clean_raw_html("<p>two</p>", cleaner)
+        self.assertEqual(filters, len(cleaner.filters))
+        self.assertEqual(default_cleaner().attributes["img"].count("width"), 1)
+
+    def test_sanitize_policy_matches_cleaner(self):
+        tag_acl = {
+            "script": [
+                ("type", "not-a-hacker", "allow"),
+                ("type", "also-not-a-hacker", "allow"),
+            ],
+        }
+        policy = SanitizePolicy(tag_acl)
+        self.assertEqual(
+            clean_raw_html(RAW_HTML, default_cleaner(tag_acl)),
+            clean_raw_html(RAW_HTML, policy),
+        )
+        self.assertEqual(
+            policy.tag_acl_index["script"]["type"],
+            frozenset(["not-a-hacker", "also-not-a-hacker"]),
+        )
+
+    def test_sanitize_policy_is_immutable(self):
+        policy = SanitizePolicy()
+        with self.assertRaises(AttributeError):
+            policy.link_protection = True
+        with self.assertRaises(TypeError):
+            policy.tag_acl["script"] = []
+
+    def test_sanitize_policy_pickles(self):
+        policy = SanitizePolicy({"script": [("type", "math/tex", "allow")]})
+        clone = pickle.loads(pickle.dumps(policy))
+        self.assertEqual(clone.tags, policy.tags)
+        self.assertEqual(dict(clone.tag_acl_index), dict(policy.tag_acl_index))
+
+    def test_single_pass_matches_two_pass(self):
+        tag_acl = {
+            "script": [
+                ("type", "not-a-hacker", "allow"),
+                ("type", "also-not-a-hacker", "allow"),
+                ("type", "a-hacker", "deny"),
+            ],
+        }
+        cleaner = default_cleaner(tag_acl)
+        single_pass = default_cleaner(tag_acl)
+        single_pass.single_pass = True
+        self.assertEqual(
+            clean_raw_html(RAW_HTML, cleaner), clean_raw_html(RAW_HTML, single_pass)
+        )
+        policy = SanitizePolicy(tag_acl, single_pass=True)
+        self.assertEqual(
+            clean_raw_html(RAW_HTML, cleaner), clean_raw_html(RAW_HTML, policy)
+        )
+
+    def test_single_pass_links_and_tables(self):
+        raw_html = (
+            '<p><a href="/rel">rel</a> <a href="http://evil.com/">evil</a> '
+            "&nbsp;&copy; https://ok.com/?a=1&amp;b=2</p>"
+            "<table><tr><td>cell</td></tr></table><pre>\n\ncode</pre>"
+        )
+        for link_protection in (False, True):
+            policy = SanitizePolicy(
+                link_protection=link_protection,
+                whitelist_domains=[None, "ok.com"],
+                absolute_domain="example.com",
+            )
+            single_pass = SanitizePolicy(
+                link_protection=link_protection,
+                whitelist_domains=[None, "ok.com"],
+                absolute_domain="example.com",
+                single_pass=True,
+            )
+            self.assertEqual(
+                clean_raw_html(raw_html, policy), clean_raw_html(raw_html, single_pass)
+            )
+
+    def test_single_pass_implied_end_tags(self):
+        for raw_html in (
+            "<dt><table><dd>x</dd>",
+            "<dl><dt>a<dd>b</dl>",
+            "<li>a<li>b",
+            "<p>a<div>b</div>",
+        ):
+            self.assertEqual(
+                clean_raw_html(raw_html, SanitizePolicy()),
+                clean_raw_html(raw_html, SanitizePolicy(single_pass=True)),
+            )
+
+    def test_single_pass_fuzz(self):
+        rnd = random.Random(3)
+        for kwargs in (
+            {},
+            {"tag_acl": FUZZ_TAG_ACL},
+            {"absolute_domain": "example.com"},
+            {"absolute_domain": "example.com", "link_protection": True},
+        ):
+            policy = SanitizePolicy(**kwargs)
+            single_pass = SanitizePolicy(single_pass=True, **kwargs)
+            for i in range(1000):
+                raw_html = random_fragment(rnd)
+                self.assertEqual(
+                    clean_raw_html(raw_html, policy),
+                    clean_raw_html(raw_html, single_pass),
+                    raw_html,
+                )
+
+    def test_single_pass_cleaner_is_cached(self):
+        cleaner = default_cleaner()
+        cleaner.single_pass = True
+        clean_raw_html("<p>a</p>", cleaner)
+        cached = cleaner._single_pass_cache[1]
+        clean_raw_html("<p>b</p>", cleaner)
+        self.assertIs(cleaner._single_pass_cache[1], cached)
+        cleaner.link_protection = True
+        self.assertEqual(
+            clean_raw_html('<a href="http://evil.com/">x</a>', cleaner),
+            "<html><head></head><body>[link removed]</body></html>",
+        )
+        self.assertIsNot(cleaner._single_pass_cache[1], cached)
+
+    def test_conditional_tag_filter_many_rules(self):
+        tag_acl = {
+            "script": [("type", "math/tex-{}".format(i), "allow") for i in range(50)],
+            "div": [("id", "post-{}".format(i), "allow") for i in range(50)]
+            + [("id", "evil", "deny")],
+        }
+        soup = BeautifulSoup(
+            '<div id="post-7"><script type="math/tex-49">x</script></div>'
+            '<div id="evil">evil</div><div class="post-1">class</div>'
+            '<script type="math/tex-50">y</script>',
+            "html5lib",
+        )
+        html = conditional_tag_filter(soup, default_cleaner(tag_acl)).decode()
+        self.assertIn('<script type="math/tex-49">x</script>', html)
+        self.assertNotIn("evil", html)
+        self.assertNotIn("class", html)
+        self.assertNotIn("math/tex-50", html)
+
+    def test_conditional_tag_filter_logging_is_opt_in(self):
+        cleaner = default_cleaner({"script": [("type", "math/tex", "allow")]})
+        with self.assertNoLogs(log, level="INFO"):
+            clean_raw_html("<script>alert(1)</script>", cleaner)
+        cleaner.log_acl = True
+        with self.assertLogs(log, level="INFO"):
+            clean_raw_html("<script>alert(1)</script>", cleaner)
@@ -0,0 +1,146 @@
+from .sanitize_html import PARSER_BACKENDS, SanitizePolicy, clean_raw_html
+
+from bs4 import BeautifulSoup
+
+import unittest
+
+# adversarial inputs, mostly from the OWASP XSS filter evasion cheat sheet.
+XSS_CORPUS = [
+    "<script>alert(1)</script>",
+    "<SCRIPT SRC=//xss.example/xss.js></SCRIPT>",
+    '<script type="math/tex">x</script><script>alert(1)</script>',
+    '<script type="math/tex" src="//xss.example/xss.js"></script>',
+    '<script type="text/javascript">alert(1)</script>',
+    '<scr<script>ipt type="math/tex">alert(1)</script>',
+    '<script type="math/tex"><script>alert(1)</script></script>',
+    "<img src=x onerror=alert(1)>",
+    '<img src="javascript:alert(1)">',
+    "<img src=`javascript:alert(1)`>",
+    '<img """><script>alert(1)</script>">',
+    "<img src=x:alert(alt) onerror=eval(src) alt=0>",
+    '<a href="javascript:alert(1)">x</a>',
+    '<a href="jav&#x09;ascript:alert(1)">x</a>',
+    '<a href="&#106;&#97;&#118;&#97;&#115;&#99;&#114;&#105;&#112;&#116;&#58;alert(1)">x</a>',
+    '<a href=" javascript:alert(1)">x</a>',
+    '<a href="data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==">x</a>',
+    '<a href="http://ok.example" onclick="alert(1)">x</a>',
+    "<a href='http://evil.example'>evil</a>",
+    '<a href="//evil.example">protocol relative</a>',
+    "<svg/onload=alert(1)>",
+    "<svg><script>alert(1)</script></svg>",
+    "<math><mtext><table><mglyph><style><img src=x onerror=alert(1)>",
+    "<body onload=alert(1)>",
+    "<iframe src=javascript:alert(1)></iframe>",
+    '<iframe srcdoc="<script>alert(1)</script>"></iframe>',
+    '<object data="javascript:alert(1)"></object>',
+    '<embed src="javascript:alert(1)">',
+    '<form action="javascript:alert(1)"><input type=submit></form>',
+    "<div style=\"background:url('javascript:alert(1)')\">x</div>",
+    '<div id="post" onmouseover="alert(1)">x</div>',
+    "<style>@import 'javascript:alert(1)';</style>",
+    '<meta http-equiv="refresh" content="0;url=javascript:alert(1)">',
+    '<link rel="stylesheet" href="javascript:alert(1)">',
+    "<base href=javascript:alert(1)//>",
+    "<!--<script>alert(1)</script>-->",
+    "<![CDATA[<script>alert(1)</script>]]>",
+    '<noscript><p title="</noscript><img src=x onerror=alert(1)>">',
+    '<table><td><a href="javascript:alert(1)">x</a></td></table>',
+    "<table><script>alert(1)</script></table>",
+    "<pre><code>&lt;script&gt;alert(1)&lt;/script&gt;</code></pre>",
+    "<p>unclosed <b>bold <i>italic <script>alert(1)",
+    "<a><a href=javascript:alert(1)>nested</a></a>",
+    "<li><li><a href=//evil.example>list</a>",
+    "<textarea><script>alert(1)</script></textarea>",
+    "<title><script>alert(1)</script></title>",
+    "<xmp><script>alert(1)</script></xmp>",
+    "<plaintext><script>alert(1)</script>",
+    "<<script>alert(1)//<</script>",
+    "<img src=x onerror=&#x61;lert(1)>",
+    "\x00<script>alert(1)</script>",
+    "<scr\x00ipt>alert(1)</script>",
+    '<span class="x" onclick=alert(1)>span</span>',
+    '<a href="/relative" rel="noopener">relative</a>',
+    "visit http://evil.example/?a=<script>alert(1)</script>",
+]
+
+TAG_ACL = {
+    "script": [("type", "math/tex", "allow"), ("type", "text/javascript", "deny")],
+    "div": [("id", "post", "allow")],
+}
+
+POLICIES = [
+    {},
+    {"tag_acl": TAG_ACL},
+    {"tag_acl": TAG_ACL, "link_protection": True, "whitelist_domains": [None]},
+    {"absolute_domain": "example.com", "whitelist_domains": [None, "ok.example"]},
+]
+
+
+def _available_backends():
+    backends = []
+    for backend in PARSER_BACKENDS:
+        try:
+            BeautifulSoup("", backend)
+        except Exception:
+            continue
+        backends.append(backend)
+    return backends
+
+
+def _elements(html):
+    """
+    Returns the set of elements a browser would build from `html`.
+
+    html5lib parses like a browser does, so every backend's output is
+    reparsed with it before comparing.
+    """
+    soup = BeautifulSoup(html, "html5lib")
+    elements = set()
+    for tag in soup.find_all(True):
+        if tag.name in ("html", "head", "body", "tbody"):
+            continue
+        attrs = tuple(
+            sorted(
+                (name, " ".join(value) if isinstance(value, list) else value)
+                for name, value in tag.attrs.items()
+            )
+        )
+        elements.add((tag.name, attrs))
+    return elements
+
+
+class TestParserBackends(unittest.TestCase, object):
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            SanitizePolicy(parser_backend="regex")
+
+    def test_backends_allow_nothing_html5lib_blocks(self):
+        backends = _available_backends()
+        for options in POLICIES:
+            reference = SanitizePolicy(**options)
+            policies = [
+                SanitizePolicy(parser_backend=backend, **options)
+                for backend in backends
+            ]
+            for raw_html in XSS_CORPUS:
+                allowed = _elements(clean_raw_html(raw_html, reference))
+                for policy in policies:
+                    elements = _elements(clean_raw_html(raw_html, policy))
+                    self.assertFalse(
+                        elements - allowed,
+                        "{} let through {} for {!r}".format(
+                            policy.parser_backend, elements - allowed, raw_html
+                        ),
+                    )
+
+    def test_backends_strip_scripts_and_handlers(self):
+        for backend in _available_backends():
+            policy = SanitizePolicy(TAG_ACL, parser_backend=backend)
+            for raw_html in XSS_CORPUS:
+                for name, attrs in _elements(clean_raw_html(raw_html, policy)):
+                    attrs = dict(attrs)
+                    if name == "script":
+                        self.assertEqual(attrs, {"type": "math/tex"}, raw_html)
+                    for attr_name, value in attrs.items():
+                        self.assertFalse(attr_name.startswith("on"), raw_html)
+                        self.assertNotIn("javascript:", value.lower(), raw_html)
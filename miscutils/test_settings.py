@@ -0,0 +1,95 @@
+from . import get_children_settings
+
+from .settings import SettingsIndex
+
+from unittest import mock
+
+import unittest
+
+SETTINGS = {
+    "auth_tkt.hashalg": "md5",
+    "auth_tkt.timeout": "3600",
+    "auth_tkt.secure": "yes",
+    "auth_tkt.cookie.name": "tkt",
+    "mail.host": "${MAIL_HOST}",
+    "mail.port": "$MAIL_PORT",
+    "mail.debug": "none",
+    "mailer": "smtp",
+    "debug": "false",
+}
+
+
+class TestSettingsIndex(unittest.TestCase, object):
+    def setUp(self):
+        patcher = mock.patch.dict(
+            "os.environ", {"MAIL_HOST": "localhost", "MAIL_PORT": "25"}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_children_same_as_get_children_settings(self):
+        index = SettingsIndex(SETTINGS)
+        for parent_key in ("auth_tkt", "mail", "auth_tkt.cookie"):
+            self.assertEqual(
+                index.children(parent_key),
+                get_children_settings(
+                    {
+                        k: v
+                        for k, v in SETTINGS.items()
+                        if k.startswith(parent_key + ".")
+                    },
+                    parent_key,
+                ),
+            )
+        self.assertEqual(
+            index.children("auth_tkt"),
+            {
+                "hashalg": "md5",
+                "timeout": 3600,
+                "secure": True,
+                "cookie.name": "tkt",
+            },
+        )
+        self.assertEqual(
+            index.children("mail"), {"host": "localhost", "port": 25, "debug": None}
+        )
+        self.assertEqual(index.children("missing"), {})
+        self.assertEqual(index.children("auth_tkt.hashalg"), {})
+
+    def test_get(self):
+        index = SettingsIndex(SETTINGS)
+        self.assertEqual(index.get("auth_tkt.timeout"), 3600)
+        self.assertIs(index.get("debug"), False)
+        self.assertIsNone(index.get("auth_tkt"))
+        self.assertEqual(index.get("auth_tkt.missing", 1), 1)
+
+    def test_children_are_copies(self):
+        index = SettingsIndex(SETTINGS)
+        index.children("auth_tkt")["hashalg"] = "sha512"
+        self.assertEqual(index.children("auth_tkt")["hashalg"], "md5")
+
+    def test_refresh_after_env_change(self):
+        index = SettingsIndex(SETTINGS)
+        self.assertEqual(index.children("mail")["port"], 25)
+        self.assertFalse(index.is_stale())
+        self.assertFalse(index.refresh())
+        with mock.patch.dict("os.environ", {"MAIL_PORT": "587"}):
+            self.assertTrue(index.is_stale())
+            # lookups do not check the environment.
+            self.assertEqual(index.get("mail.port"), 25)
+            self.assertTrue(index.refresh())
+            self.assertEqual(index.children("mail")["port"], 587)
+            self.assertEqual(index.get("mail.port"), 587)
+            self.assertFalse(index.is_stale())
+
+    def test_invalidate(self):
+        settings = dict(SETTINGS)
+        index = SettingsIndex(settings)
+        self.assertNotIn("samesite", index.children("auth_tkt"))
+        settings["auth_tkt.samesite"] = "Lax"
+        index.invalidate()
+        self.assertEqual(index.children("auth_tkt")["samesite"], "Lax")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+from .svgtar import inline_svgtar, svgtar, svgtar_cache, svgtar_many
+
+from .svgtar.svg import TEMPLATE, defaults, make_svg, reduce_whitespace
+
+from urllib.parse import quote
+
+import unittest
+
+import base64
+
+
+def _old_svgtar(text, h, size=55):
+    """The svgtar output before the template was minified at import."""
+    return TEMPLATE.format(
+        text=text,
+        size=size,
+        color="#ffffff",
+        bg=_old_bg_color(h),
+        font_size=size * 0.6,
+        font_family="Arial",
+    )
+
+
+def _old_bg_color(h):
+    from .svgtar import _bg_color
+
+    return _bg_color(h=h)
+
+
+class TestSvgtar(unittest.TestCase, object):
+    def setUp(self):
+        svgtar_cache.clear()
+
+    def test_same_as_reduced_template(self):
+        for text, h, size in (("RB", "russell", 55), ("X", "salt", 100)):
+            old = _old_svgtar(text, h, size)
+            self.assertEqual(svgtar(text, h, size=size), reduce_whitespace(old))
+            self.assertEqual(
+                inline_svgtar(text, h, size=size),
+                "data:image/svg+xml;charset=utf-8," + quote(reduce_whitespace(old)),
+            )
+
+    def test_memoized(self):
+        first = svgtar("RB", "russell")
+        self.assertIs(svgtar("RB", "russell"), first)
+        self.assertIsNot(svgtar("RB", "russell", size=30), first)
+        self.assertIsNot(svgtar("RB", "other"), first)
+
+    def test_svgtar_many(self):
+        items = [("U{}".format(i % 3), "user-{}".format(i % 3)) for i in range(9)]
+        self.assertEqual(
+            svgtar_many(items, inline=True, size=30),
+            [inline_svgtar(text, h, size=30) for text, h in items],
+        )
+        # three distinct users, one data URI cached for each.
+        self.assertEqual(len(svgtar_cache), 3)
+
+    def test_data_uri_modes(self):
+        for text in ("RB", 'Ünï 100% <&> "x"', "a/b c"):
+            svg = svgtar(text, "h", font_family="Comic Sans")
+            self.assertEqual(
+                inline_svgtar(text, "h", font_family="Comic Sans"),
+                "data:image/svg+xml;charset=utf-8," + quote(svg),
+            )
+            uri = inline_svgtar(text, "h", font_family="Comic Sans", encoding="base64")
+            prefix, b64 = uri.split(",")
+            self.assertEqual(prefix, "data:image/svg+xml;base64")
+            self.assertEqual(base64.b64decode(b64).decode("utf-8"), svg)
+        with self.assertRaises(ValueError):
+            inline_svgtar("RB", "h", encoding="rot13")
+
+    def test_make_svg_defaults(self):
+        options = dict(defaults, size=40, font_size=24)
+        self.assertEqual(
+            make_svg(size=40), reduce_whitespace(TEMPLATE.format(**options))
+        )
@@ -0,0 +1,113 @@
+from .svgtar import svgtar
+
+from .svgtar.export import export_avatars, load_index, main
+
+from contextlib import redirect_stderr
+
+from xml.etree import ElementTree
+
+import io
+
+import tempfile
+
+import shutil
+
+import os
+
+import unittest
+
+RECORDS = [("U{}".format(i), "user-{}".format(i)) for i in range(10)]
+
+
+class TestExportAvatars(unittest.TestCase, object):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, path):
+        with open(os.path.join(self.directory, path)) as fh:
+            return fh.read()
+
+    def test_export_files_incrementally(self):
+        stats = export_avatars(RECORDS, self.directory, workers=2, chunksize=3)
+        self.assertEqual(stats, {"written": 10, "reused": 0, "skipped": 0})
+        index = load_index(self.directory)
+        for text, h in RECORDS:
+            self.assertEqual(self.read(index[h]["path"]), svgtar(text, h))
+
+        records = list(RECORDS)
+        records[4] = ("XX", "user-4")
+        stats = export_avatars(records, self.directory, workers=0)
+        self.assertEqual(stats, {"written": 1, "reused": 0, "skipped": 9})
+        self.assertEqual(
+            self.read(load_index(self.directory)["user-4"]["path"]),
+            svgtar("XX", "user-4"),
+        )
+
+        # identical avatars share their content addressed file.
+        os.unlink(os.path.join(self.directory, "index.json"))
+        stats = export_avatars(records, self.directory, workers=0)
+        self.assertEqual(stats, {"written": 0, "reused": 10, "skipped": 0})
+        self.assertEqual(
+            [name for name in os.listdir(self.directory) if name.startswith(".tmp")],
+            [],
+        )
+
+    def test_export_sprite(self):
+        stats = export_avatars(RECORDS, self.directory, sprite=True, size=30)
+        self.assertEqual(stats, {"written": 10, "reused": 0, "skipped": 0})
+        sprite = self.read("sprite.svg")
+        index = load_index(self.directory)
+        self.assertEqual(sprite.count("<symbol "), 10)
+        for text, h in RECORDS:
+            symbol_id = index[h]["path"].split("#")[1]
+            self.assertIn(
+                '<symbol id="{}" viewBox="0 0 30 30">'.format(symbol_id), sprite
+            )
+
+        stats = export_avatars(RECORDS, self.directory, sprite=True, size=30)
+        self.assertEqual(stats["skipped"], 10)
+        stats = export_avatars(RECORDS, self.directory, sprite=True, size=40)
+        self.assertEqual(stats["written"], 10)
+
+    def test_main(self):
+        input_path = os.path.join(self.directory, "users.tsv")
+        with open(input_path, "w") as fh:
+            for text, h in RECORDS:
+                fh.write("{}\t{}\n".format(text, h))
+        output = os.path.join(self.directory, "avatars")
+        main([output, "--input", input_path, "--workers", "0"])
+        self.assertEqual(sorted(load_index(output)), sorted(h for _, h in RECORDS))
+
+    def test_main_skips_malformed_rows(self):
+        input_path = os.path.join(self.directory, "users.tsv")
+        with open(input_path, "w") as fh:
+            fh.write("U1\tuser-1\nno hash\n\nU2\tuser-2\textra\n")
+        output = os.path.join(self.directory, "avatars")
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            main([output, "--input", input_path, "--workers", "0"])
+        self.assertEqual(sorted(load_index(output)), ["user-1", "user-2"])
+        self.assertIn("line 2", stderr.getvalue())
+
+    def test_main_reads_quotes_as_text(self):
+        input_path = os.path.join(self.directory, "users.tsv")
+        with open(input_path, "w") as fh:
+            fh.write('"U1\tuser-1\nU2\tuser-2\n')
+        output = os.path.join(self.directory, "avatars")
+        main([output, "--input", input_path, "--workers", "0"])
+        self.assertEqual(sorted(load_index(output)), ["user-1", "user-2"])
+
+    def test_values_are_escaped(self):
+        text = '<script>alert(1)</script>&"'
+        export_avatars(
+            [(text, "user-1")], self.directory, workers=0, font_family='x"><script>'
+        )
+        svg = self.read(load_index(self.directory)["user-1"]["path"])
+        self.assertNotIn("<script", svg)
+        root = ElementTree.fromstring(svg)
+        (element,) = root.iter("{http://www.w3.org/2000/svg}text")
+        self.assertEqual(element.text.strip(), text)
+        self.assertIn('x"><script>', element.get("style"))
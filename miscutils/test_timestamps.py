@@ -0,0 +1,117 @@
+from . import (
+    datetime_to_timestamp,
+    format_minute,
+    timestamp_to_datetime,
+    timestamp_to_date_string,
+)
+
+from . import timestamps
+
+from ago import human
+
+from datetime import datetime, timedelta
+
+from unittest import mock
+
+import os
+
+import random
+
+import time
+
+import unittest
+
+import numpy as np
+
+# zones with DST changes, half hour offsets and a half hour DST change.
+ZONES = ["UTC", "America/St_Johns", "Europe/London", "Australia/Lord_Howe"]
+
+NOW = datetime(2021, 11, 7, 12, 30, 15, 123456)
+
+
+def _timestamps(rnd, count):
+    # around the 2021 DST changes, and some far from them and from now.
+    centers = [1615700000000, 1636250000000, 1617500000000, 1633200000000]
+    values = [
+        rnd.choice(centers) + rnd.randrange(-3 * 86400000, 3 * 86400000)
+        for i in range(count)
+    ]
+    values += [0, 86399999, 1636288215123, 1636288215124, 1736288215000]
+    values += [int(datetime_to_timestamp(NOW)) + i for i in range(-1500, 1500, 7)]
+    return values
+
+
+class TestTimestamps(unittest.TestCase, object):
+    def setUp(self):
+        self.timestamps = _timestamps(random.Random(22), 3000)
+
+    def in_zones(self, check):
+        for zone in ZONES:
+            with mock.patch.dict(os.environ, {"TZ": zone}):
+                time.tzset()
+                format_minute.cache_clear()
+                try:
+                    check()
+                finally:
+                    format_minute.cache_clear()
+            time.tzset()
+
+    def check_same_as_single_value_helpers(self):
+        ts = self.timestamps
+        self.assertEqual(
+            timestamps.timestamps_to_datetimes(ts),
+            [timestamp_to_datetime(t) for t in ts],
+        )
+        self.assertEqual(
+            timestamps.timestamps_to_date_strings(ts),
+            [timestamp_to_datetime(t).strftime("%b %d, %Y %I:%M %P") for t in ts],
+        )
+        self.assertEqual(
+            [timestamp_to_date_string(t) for t in ts],
+            timestamps.timestamps_to_date_strings(ts),
+        )
+        self.assertEqual(
+            timestamps.timestamps_to_ago_strings(ts, now=NOW),
+            [human(NOW - timestamp_to_datetime(t), 2, abbreviate=True) for t in ts],
+        )
+        self.assertEqual(
+            timestamps.timestamps_to_ago_strings(
+                ts, now=NOW, precision=3, abbreviate=False
+            ),
+            [human(NOW - timestamp_to_datetime(t), 3) for t in ts],
+        )
+
+    def test_same_as_single_value_helpers(self):
+        self.in_zones(self.check_same_as_single_value_helpers)
+
+    def test_without_numpy(self):
+        with mock.patch.object(timestamps, "np", None):
+            self.in_zones(self.check_same_as_single_value_helpers)
+
+    def test_numpy_arrays(self):
+        ts = self.timestamps[:100]
+        expected = timestamps.timestamps_to_datetimes(ts)
+        array = np.array(ts, dtype=np.int64)
+        self.assertEqual(timestamps.timestamps_to_datetimes(array), expected)
+        self.assertEqual(
+            timestamps.timestamps_to_datetimes(array.astype("datetime64[ms]")),
+            expected,
+        )
+
+    def test_datetimes_to_timestamps(self):
+        rnd = random.Random(7)
+        dts = [
+            datetime(1970, 1, 1) + timedelta(microseconds=rnd.getrandbits(52))
+            for i in range(1000)
+        ]
+        dts += [datetime(1969, 12, 31, 23, 59, 59, 999999), datetime(1970, 1, 1)]
+        expected = [datetime_to_timestamp(dt) for dt in dts]
+        self.assertEqual(timestamps.datetimes_to_timestamps(dts), expected)
+        array = np.array(dts, dtype="datetime64[us]")
+        self.assertEqual(timestamps.datetimes_to_timestamps(array), expected)
+        with mock.patch.object(timestamps, "np", None):
+            self.assertEqual(timestamps.datetimes_to_timestamps(dts), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
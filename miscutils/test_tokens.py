@@ -0,0 +1,75 @@
+from . import generate_password as package_generate_password
+
+from .tokens import ALPHABET, generate_password, generate_passwords, random_chars
+
+from collections import Counter
+
+from unittest import mock
+
+import math
+
+import unittest
+
+
+def chi_square_limit(df, z=4.75):
+    """
+    The chi-square statistic a uniform sample exceeds with a probability
+    of about one in a million, by the Wilson-Hilferty approximation.
+    """
+    k = 2.0 / (9 * df)
+    return df * (1 - k + z * math.sqrt(k)) ** 3
+
+
+class TestTokens(unittest.TestCase, object):
+    def check_uniform(self, text, alphabet):
+        counts = Counter(text)
+        self.assertEqual(set(counts), set(alphabet))
+        expected = len(text) / float(len(alphabet))
+        chi_square = sum((counts[c] - expected) ** 2 / expected for c in alphabet)
+        self.assertLess(chi_square, chi_square_limit(len(alphabet) - 1))
+
+    def test_generate_password(self):
+        password = generate_password()
+        self.assertEqual(len(password), 32)
+        self.assertTrue(set(password) <= set(ALPHABET))
+        self.assertEqual(len(package_generate_password(12)), 12)
+        self.assertEqual(generate_password(0), "")
+        self.assertEqual(len(generate_password(5, alphabet="αβγ")), 5)
+        self.assertEqual(generate_password(5, alphabet="a"), "aaaaa")
+        self.assertEqual(generate_passwords(2, size=3, alphabet="a"), ["aaa"] * 2)
+        with self.assertRaises(ValueError):
+            generate_password(alphabet="aab")
+        with self.assertRaises(ValueError):
+            generate_password(alphabet="")
+
+    def test_generate_passwords(self):
+        passwords = generate_passwords(1000, size=20, alphabet="abcdef")
+        self.assertEqual(len(passwords), 1000)
+        self.assertEqual({len(p) for p in passwords}, {20})
+        self.assertTrue(set("".join(passwords)) <= set("abcdef"))
+        self.assertEqual(len(set(generate_passwords(1000))), 1000)
+        self.assertEqual(generate_passwords(2, size=0), ["", ""])
+        self.assertEqual(generate_passwords(0), [])
+
+    def test_uniform(self):
+        # 62, 3 and 200 characters leave 8, 1 and 56 byte values rejected.
+        for alphabet in (ALPHABET, "abc", "".join(map(chr, range(32, 232)))):
+            self.check_uniform(random_chars(400 * len(alphabet), alphabet), alphabet)
+        passwords = generate_passwords(20000, size=31)
+        self.check_uniform("".join(passwords), ALPHABET)
+        # each position of the passwords is uniform too.
+        self.check_uniform("".join(p[0] for p in passwords), ALPHABET)
+        self.check_uniform("".join(p[-1] for p in passwords), ALPHABET)
+
+    def test_every_byte_maps_evenly(self):
+        # with every byte value equally often, every character is.
+        with mock.patch(
+            "os.urandom", lambda size: bytes(range(256)) * (size // 256 + 1)
+        ):
+            for alphabet in (ALPHABET, "abc", "ab"):
+                counts = Counter(random_chars(256 * len(alphabet), alphabet))
+                self.assertEqual(len(set(counts.values())), 1, alphabet)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+from .uuid_validation import (
+    UUID_ALL_PATTERN,
+    UUID_V4_PATTERN,
+    find_uuids,
+    get_pattern,
+    is_uuid,
+    validate_many,
+)
+
+import io
+
+import os
+
+import re
+
+import random
+
+import tempfile
+
+import unittest
+
+import uuid
+
+# what find_uuids should find, the full pattern between non hex digits.
+REFERENCE = re.compile(
+    "(?<![0-9a-fA-F])(" + UUID_ALL_PATTERN.pattern + ")(?![0-9a-fA-F])", re.I
+)
+
+
+def _uuids(rnd, count):
+    return [
+        str(uuid.UUID(int=rnd.getrandbits(128), version=rnd.randint(1, 5)))
+        for i in range(count)
+    ]
+
+
+def _mutate(rnd, value):
+    """Returns `value` with a random character changed, added or removed."""
+    i = rnd.randrange(len(value))
+    c = rnd.choice("0aAfFgG9-_ x١")
+    action = rnd.randrange(3)
+    if action == 0:
+        return value[:i] + c + value[i + 1 :]
+    if action == 1:
+        return value[:i] + c + value[i:]
+    return value[:i] + value[i + 1 :]
+
+
+class TestUUIDValidation(unittest.TestCase, object):
+    def setUp(self):
+        rnd = random.Random(19)
+        self.uuids = _uuids(rnd, 500)
+        upper = [u.upper() for u in self.uuids[:50]]
+        self.values = self.uuids + upper + [_mutate(rnd, u) for u in self.uuids]
+        self.values += ["", "x", self.uuids[0] + "\n", " " + self.uuids[1]]
+        rnd.shuffle(self.values)
+
+    def test_is_uuid_same_as_fullmatch(self):
+        for version in (None, 1, 4, "5"):
+            pattern = get_pattern(version)
+            for value in self.values:
+                self.assertEqual(
+                    is_uuid(value, version),
+                    pattern.fullmatch(value) is not None,
+                    (value, version),
+                )
+        self.assertTrue(UUID_V4_PATTERN.fullmatch(str(uuid.uuid4())))
+
+    def test_get_pattern_is_cached(self):
+        self.assertIs(get_pattern(4), get_pattern(4))
+        self.assertEqual(get_pattern(4).pattern, get_pattern("4").pattern)
+        with self.assertRaises(ValueError):
+            get_pattern(10)
+
+    def test_validate_many(self):
+        expected = [is_uuid(value) for value in self.values]
+        self.assertEqual(list(validate_many(self.values)), expected)
+        self.assertEqual(list(validate_many(self.values, chunksize=7)), expected)
+        self.assertEqual(list(validate_many(self.uuids)), [True] * len(self.uuids))
+        self.assertEqual(
+            list(validate_many(self.uuids, version=4)),
+            [is_uuid(u, 4) for u in self.uuids],
+        )
+        self.assertEqual(list(validate_many([b"x" * 36, self.uuids[0]])), [False, True])
+
+    def test_find_uuids(self):
+        rnd = random.Random(23)
+        words = self.values + ["2024-01-01", "-", "abcdef", "x"]
+        separators = [" ", "\n", "=", "-", "", "a"]
+        text = "".join(rnd.choice(words) + rnd.choice(separators) for i in range(5000))
+        expected = [m.group(1) for m in REFERENCE.finditer(text)]
+        self.assertTrue(len(expected) > 100)
+        self.assertEqual(list(find_uuids(text)), expected)
+        data = text.encode("utf-8")
+        self.assertEqual(list(find_uuids(data)), expected)
+
+        for blocksize in (1, 37, 100, 4096):
+            found = find_uuids(io.BytesIO(data), blocksize=blocksize)
+            self.assertEqual(list(found), expected, blocksize)
+
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            with open(path, "rb") as fh:
+                self.assertEqual(list(find_uuids(fh)), expected)
+            with open(path, "rb") as fh:
+                v4 = [u for u in expected if u[14] == "4"]
+                self.assertEqual(list(find_uuids(fh, version=4)), v4)
+            # an empty file can not be memory mapped.
+            open(path, "wb").close()
+            with open(path, "rb") as fh:
+                self.assertEqual(list(find_uuids(fh)), [])
+        finally:
+            os.unlink(path)
+
+    def test_find_uuids_next_to_hex_digits(self):
+        u = self.uuids[0]
+        self.assertEqual(list(find_uuids("a" + u)), [])
+        self.assertEqual(list(find_uuids(u + "0")), [])
+        self.assertEqual(list(find_uuids("-" + u + "-")), [u])
+        self.assertEqual(list(find_uuids("id=" + u + "," + u)), [u, u])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Batch versions of the `miscutils` timestamp helpers for long listings.
+
+    strings = timestamps_to_date_strings(feed_timestamps)
+    agos = timestamps_to_ago_strings(feed_timestamps)
+
+Timestamps are integer milliseconds, like `timestamp_to_datetime` takes,
+as a list or a NumPy int64 or datetime64 array. With NumPy installed the
+local times, ages and their buckets are computed as arrays, otherwise
+each timestamp goes through the matching single value helper. Both give
+the same results as the single value helpers.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from datetime import datetime, timedelta
+
+from . import DATE_FORMAT, _EPOCH, format_minute, timestamp_to_datetime
+
+_MINUTE_US = 60 * 1000000
+
+_HOUR_US = 60 * _MINUTE_US
+
+# the microseconds of each `ago` unit, years down to microseconds.
+_AGO_UNITS_US = [
+    365 * 24 * _HOUR_US,
+    24 * _HOUR_US,
+    _HOUR_US,
+    _MINUTE_US,
+    1000000,
+    1000,
+    1,
+]
+
+
+def _utc_offset_us(seconds):
+    """Returns the local UTC offset at `seconds` since the epoch."""
+    local = datetime.fromtimestamp(seconds)
+    return (local - (_EPOCH + timedelta(seconds=seconds))) // timedelta(microseconds=1)
+
+
+def _to_microseconds(timestamps):
+    """Returns an int64 array of microseconds since the epoch."""
+    timestamps = np.asarray(timestamps)
+    if timestamps.dtype.kind == "M":
+        return timestamps.astype("datetime64[us]").astype(np.int64)
+    if timestamps.dtype.kind == "f":
+        return np.round(timestamps * 1000).astype(np.int64)
+    return timestamps.astype(np.int64) * 1000
+
+
+def _local_microseconds(utc_us):
+    """
+    Returns the local times of epoch microseconds, as naive microseconds.
+
+    The UTC offset is looked up once per hour of timestamps, at its first
+    and last second. Timestamps in an hour with a DST change are
+    looked up one at a time.
+    """
+    hours, inverse = np.unique(utc_us // _HOUR_US, return_inverse=True)
+    hours = hours.tolist()
+    starts = np.array([_utc_offset_us(h * 3600) for h in hours], dtype=np.int64)
+    ends = [_utc_offset_us(h * 3600 + 3599) for h in hours]
+    ends = np.array(ends, dtype=np.int64)
+    local_us = utc_us + starts[inverse]
+    changed = (starts != ends)[inverse]
+    if changed.any():
+        for i in np.flatnonzero(changed).tolist():
+            seconds = int(utc_us[i]) // 1000000
+            local_us[i] = utc_us[i] + _utc_offset_us(seconds)
+    return local_us
+
+
+def timestamps_to_datetimes(timestamps):
+    """Returns `timestamp_to_datetime` of each timestamp, as a list."""
+    if np is None:
+        return [timestamp_to_datetime(t) for t in timestamps]
+    local_us = _local_microseconds(_to_microseconds(timestamps))
+    return local_us.astype("datetime64[us]").tolist()
+
+
+def timestamps_to_date_strings(timestamps, fmt=DATE_FORMAT):
+    """
+    Returns `timestamp_to_date_string` of each timestamp, as a list.
+
+    Each distinct minute is formatted once, `fmt` must not use seconds.
+    """
+    if np is None:
+        return [format_minute(int(t // 60000), fmt) for t in timestamps]
+    minutes, inverse = np.unique(
+        _to_microseconds(timestamps) // _MINUTE_US, return_inverse=True
+    )
+    formatted = [format_minute(minute, fmt) for minute in minutes.tolist()]
+    return [formatted[i] for i in inverse.tolist()]
+
+
+def datetimes_to_timestamps(datetimes):
+    """
+    Returns `datetime_to_timestamp` of each naive datetime, as a list.
+
+    A datetime64 array is converted as an array. A list of datetimes is
+    not, building the array costs more than subtracting `_EPOCH` from each.
+    """
+    if np is not None and isinstance(datetimes, np.ndarray):
+        us = datetimes.astype("datetime64[us]").astype(np.int64)
+        # the same float operations as `timedelta.total_seconds() * 1000`.
+        return ((us / 1e6) * 1000).tolist()
+    return [(dt - _EPOCH).total_seconds() * 1000 for dt in datetimes]
+
+
+def timestamps_to_ago_strings(timestamps, now=None, precision=2, abbreviate=True):
+    """
+    Returns `timestamp_to_ago_string` of each timestamp, as a list.
+
+    `now`, a naive local datetime, is taken once for the whole list. Ages
+    are bucketed by the units `ago` shows, the `precision` largest non zero
+    units, and each bucket is rendered once.
+    """
+    from ago import human
+
+    if now is None:
+        now = datetime.now()
+    if np is None:
+        return [
+            human(now - timestamp_to_datetime(t), precision, abbreviate=abbreviate)
+            for t in timestamps
+        ]
+
+    now_us = (now - _EPOCH) // timedelta(microseconds=1)
+    ages = now_us - _local_microseconds(_to_microseconds(timestamps))
+    # split each age into the ago units, then drop all but the largest
+    # `precision` non zero units.
+    remaining = np.abs(ages)
+    units = []
+    for unit_us in _AGO_UNITS_US:
+        units.append(remaining // unit_us)
+        remaining = remaining % unit_us
+    units = np.stack(units, axis=1)
+    shown = np.cumsum(units > 0, axis=1) <= precision
+    buckets = (units * shown * np.array(_AGO_UNITS_US, dtype=np.int64)).sum(axis=1)
+    buckets = np.where(ages < 0, -buckets, buckets)
+
+    buckets, inverse = np.unique(buckets, return_inverse=True)
+    rendered = [
+        human(timedelta(microseconds=bucket), precision, abbreviate=abbreviate)
+        for bucket in buckets.tolist()
+    ]
+    return [rendered[i] for i in inverse.tolist()]
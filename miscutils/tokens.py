@@ -0,0 +1,78 @@
+"""
+Cryptographically secure passwords and tokens, one at a time or in bulk.
+
+    password = generate_password()
+    tokens = generate_passwords(100000, size=40)
+
+Random bytes are read from `os.urandom` in large blocks and mapped onto
+the alphabet with `bytes.translate`. Bytes which would make some
+characters more likely than others are dropped, rejection sampling, so
+every character of the alphabet is equally likely.
+"""
+
+import os
+
+import secrets
+
+from functools import lru_cache
+
+from string import ascii_letters, digits
+
+# the characters of `generate_password`.
+ALPHABET = ascii_letters + digits
+
+# the most random bytes read by one `os.urandom` call.
+MAX_BLOCK_SIZE = 1 << 20
+
+
+@lru_cache(maxsize=32)
+def _translation(alphabet):
+    """
+    Returns the (table, rejected) `bytes.translate` arguments mapping
+    random bytes onto the single byte characters of `alphabet`.
+    """
+    chars = alphabet.encode("latin-1")
+    if not chars or len(set(chars)) != len(chars):
+        raise ValueError("alphabet should have 1 or more distinct characters")
+    # the largest multiple of the alphabet size, bytes from it up to 255
+    # would favour the first characters and are rejected.
+    limit = 256 - 256 % len(chars)
+    table = bytes(chars[byte % len(chars)] for byte in range(256))
+    return table, bytes(range(limit, 256))
+
+
+def random_chars(count, alphabet=ALPHABET):
+    """Returns a string of `count` random characters of `alphabet`."""
+    try:
+        table, rejected = _translation(alphabet)
+    except UnicodeEncodeError:
+        # not single byte characters, choose them one at a time.
+        return "".join([secrets.choice(alphabet) for i in range(count)])
+
+    # enough bytes for the expected rejections, with a little to spare.
+    ratio = 256.0 / (256 - len(rejected))
+    blocks = []
+    remaining = count
+    while remaining > 0:
+        size = min(int(remaining * ratio * 1.02) + 64, MAX_BLOCK_SIZE)
+        block = os.urandom(size).translate(table, rejected)
+        blocks.append(block)
+        remaining -= len(block)
+    return b"".join(blocks)[:count].decode("latin-1")
+
+
+def generate_password(size=32, alphabet=ALPHABET):
+    """Return a system generated password"""
+    return random_chars(size, alphabet)
+
+
+def generate_passwords(n, size=32, alphabet=ALPHABET):
+    """
+    Return a list of `n` system generated passwords.
+
+    The random bytes for all of them are read in a few large blocks.
+    """
+    if size <= 0:
+        return [""] * n
+    chars = random_chars(n * size, alphabet)
+    return [chars[i : i + size] for i in range(0, n * size, size)]
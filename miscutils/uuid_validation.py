@@ -1,9 +1,27 @@
 # Reference:
 # https://gist.github.com/kgriffs/c20084db6686fee2b363fdc1a8998792#file-uuid_regex-py-L7-L17
 
+"""
+UUID validation, one at a time or in bulk, and UUID extraction from logs.
+
+    is_uuid("1b4e28ba-2fa1-4d3b-a3f5-ef19b5a7633c")
+    valid = list(validate_many(request_ids, version=4))
+
+    with open("access.log", "rb") as fh:
+        for uuid in find_uuids(fh):
+            ...
+"""
+
+import io
 
 import re
 
+import mmap
+
+from functools import lru_cache
+
+from itertools import islice, repeat
+
 # RFC 4122 states that the characters should be output as lowercase, but
 #   that input is case-insensitive. When validating input strings,
 #   include re.I or re.IGNORECASE per below:
@@ -25,3 +43,197 @@ def _create_pattern(version="[1-5]"):
 
 UUID_ALL_PATTERN = _create_pattern()
 UUID_V4_PATTERN = _create_pattern("4")
+
+HEX_DIGITS = "0123456789abcdefABCDEF"
+
+_HEX_BYTES = HEX_DIGITS.encode("ascii")
+
+# the default version accepted, like UUID_ALL_PATTERN.
+_ALL_VERSIONS = "12345"
+
+
+def _versions(version):
+    """Returns the version characters accepted for `version`."""
+    if version is None:
+        return _ALL_VERSIONS
+    version = str(version)
+    if len(version) != 1 or version not in "0123456789":
+        raise ValueError("version should be a single digit: {!r}".format(version))
+    return version
+
+
+@lru_cache(maxsize=32)
+def get_pattern(version=None):
+    """
+    Returns the compiled pattern of a UUID `version`, like UUID_V4_PATTERN.
+
+    None matches versions 1 to 5, like UUID_ALL_PATTERN. The patterns are
+    not anchored, use `fullmatch` or `is_uuid` to validate a string.
+    """
+    versions = _versions(version)
+    return _create_pattern("[{}]".format(versions))
+
+
+@lru_cache(maxsize=32)
+def _find_pattern(version, binary):
+    # starts at the first dash, a literal the regex engine can skip to
+    # quickly, the 8 digits before it are checked by `_finditer`.
+    pattern = (
+        "-[0-9a-fA-F]{4}-"
+        + "[{}]".format(_versions(version))
+        + "[0-9a-fA-F]{3}-[89abAB][0-9a-fA-F]{3}-[0-9a-fA-F]{12}"
+    )
+    if binary:
+        pattern = pattern.encode("ascii")
+    return re.compile(pattern)
+
+
+def _is_uuid(value, versions):
+    # a canonical UUID is 36 characters with dashes at fixed positions,
+    # checked with string methods instead of the regex.
+    if len(value) != 36 or value[8:24:5] != "----":
+        return False
+    if value[14] not in versions or value[19] not in "89abAB":
+        return False
+    try:
+        # extra dashes leave fewer digits, whitespace is skipped.
+        return len(bytes.fromhex(value.replace("-", ""))) == 16
+    except ValueError:
+        return False
+
+
+def _all_uuids(chunk, versions):
+    """Test if every string in `chunk` is a UUID, all at once."""
+    count = len(chunk)
+    try:
+        if set(map(len, chunk)) != {36}:
+            return False
+        joined = "".join(chunk)
+    except TypeError:
+        return False
+    # the joined UUIDs have their dashes, versions and variants every
+    # 36 characters, each checked with one slice.
+    dashes = "-" * count
+    if not joined[8::36] == joined[13::36] == joined[18::36] == joined[23::36]:
+        return False
+    if joined[8::36] != dashes:
+        return False
+    if joined[14::36].strip(versions) or joined[19::36].strip("89abAB"):
+        return False
+    try:
+        return len(bytes.fromhex(joined.replace("-", ""))) == 16 * count
+    except ValueError:
+        return False
+
+
+def is_uuid(value, version=None):
+    """
+    Test if the whole string `value` is a UUID of `version`.
+
+    Same as `get_pattern(version).fullmatch(value)`, without the regex.
+    """
+    return _is_uuid(value, _versions(version))
+
+
+def validate_many(values, version=None, chunksize=4096):
+    """
+    Yields `is_uuid` of each string in `values`.
+
+    The strings are checked `chunksize` at a time, a chunk of only UUIDs
+    costs a few string operations instead of a check per string.
+    """
+    versions = _versions(version)
+    iterator = iter(values)
+    while True:
+        chunk = list(islice(iterator, chunksize))
+        if not chunk:
+            return
+        if _all_uuids(chunk, versions):
+            yield from repeat(True, len(chunk))
+        else:
+            yield from [_is_uuid(value, versions) for value in chunk]
+
+
+def _finditer(pattern, data, pos, final):
+    """
+    Yields the (start, end) of the UUIDs in `data` starting from `pos`.
+
+    A UUID next to another hex digit is part of something longer and is
+    skipped. Unless `final`, the search stops at a UUID which ends with
+    `data`, the byte after it is not known yet.
+    """
+    hex_digits = _HEX_BYTES if isinstance(pattern.pattern, bytes) else HEX_DIGITS
+    for match in pattern.finditer(data, pos):
+        start = match.start() - 8
+        end = match.end()
+        if start < pos or data[start : start + 8].strip(hex_digits):
+            continue
+        if start > 0 and data[start - 1 : start] in hex_digits:
+            continue
+        if end == len(data):
+            if final:
+                yield start, end
+            return
+        if data[end : end + 1] not in hex_digits:
+            yield start, end
+
+
+def _find_in_stream(fh, pattern, blocksize):
+    # data is the unsearched end of the last block, after one byte of
+    # context, followed by the next block.
+    data = b""
+    pos = 0
+    while True:
+        block = fh.read(blocksize)
+        final = not block
+        data += block
+        last = pos
+        for start, end in _finditer(pattern, data, pos, final):
+            yield data[start:end].decode("ascii")
+            last = end
+        if final:
+            return
+        # a UUID starting in the last 36 bytes may end in the next block.
+        keep = max(len(data) - 36, last)
+        if keep > 0:
+            data = data[keep - 1 :]
+            pos = 1
+
+
+def find_uuids(source, version=None, blocksize=1 << 20):
+    """
+    Yields the UUIDs of `version` in a string, bytes or binary file.
+
+    Files are memory mapped and searched in place, so a multi gigabyte log
+    is never read into memory. Streams which can not be mapped, like pipes,
+    are read `blocksize` bytes at a time. UUIDs are yielded as strings,
+    as they are written.
+    """
+    if isinstance(source, str):
+        pattern = _find_pattern(version, False)
+        for start, end in _finditer(pattern, source, 0, True):
+            yield source[start:end]
+        return
+
+    pattern = _find_pattern(version, True)
+    if isinstance(source, (bytes, bytearray)):
+        for start, end in _finditer(pattern, source, 0, True):
+            yield source[start:end].decode("ascii")
+        return
+
+    try:
+        mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    except (io.UnsupportedOperation, OSError, ValueError):
+        # not a real file, or an empty one, which can not be mapped.
+        for uuid in _find_in_stream(source, pattern, blocksize):
+            yield uuid
+        return
+
+    matches = _finditer(pattern, mapped, 0, True)
+    try:
+        for start, end in matches:
+            yield mapped[start:end].decode("ascii")
+    finally:
+        # the regex scanner holds a buffer of the map until it is freed.
+        matches.close()
+        mapped.close()